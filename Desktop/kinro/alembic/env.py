@@ -2,20 +2,19 @@ from logging.config import fileConfig
 from backend.models import Base
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
-import os
-from dotenv import load_dotenv
 from alembic import context
-
-load_dotenv()  # Carga las variables desde el archivo .env
+from backend import config as settings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Misma URL que la aplicación (config.py / .env), con el driver síncrono; sin
+# importar backend.database, que crea los engines de la aplicación
+DATABASE_URL = settings.DATABASE_URL or config.get_main_option("sqlalchemy.url")
 if DATABASE_URL.startswith("postgresql+asyncpg"):
     DATABASE_URL = DATABASE_URL.replace("postgresql+asyncpg", "postgresql+psycopg2")
-    
+
 config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
 # Interpret the config file for Python logging.
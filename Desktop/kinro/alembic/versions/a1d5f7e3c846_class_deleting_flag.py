@@ -0,0 +1,27 @@
+"""Marca de clases en eliminación
+
+Revision ID: a1d5f7e3c846
+Revises: f3a8d1c6b294
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d5f7e3c846'
+down_revision: Union[str, None] = 'f3a8d1c6b294'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE class_models ADD COLUMN IF NOT EXISTS deleting boolean NOT NULL DEFAULT false")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE class_models DROP COLUMN IF EXISTS deleting")
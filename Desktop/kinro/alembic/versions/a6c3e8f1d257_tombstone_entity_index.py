@@ -0,0 +1,32 @@
+"""Índice de lápidas por entidad (versión del modelo en /graph)
+
+Revision ID: a6c3e8f1d257
+Revises: e91c5d7f3a28
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e8f1d257'
+down_revision: Union[str, None] = 'e91c5d7f3a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sync_tombstones_entity_version "
+            "ON sync_tombstones (entity, row_version)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_sync_tombstones_entity_version")
@@ -0,0 +1,157 @@
+"""Versiones de fila y lápidas para la sincronización incremental
+
+Revision ID: b7e2c41d9a05
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c41d9a05'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNC_LOCK_KEY = 0x6B696E726F
+
+# (tabla, entidad, origen del class_id de la lápida)
+TABLES = [
+    ("class_models", "class", "id"),
+    ("attributes", "attribute", "class_id"),
+    ("properties", "property", ""),
+    ("connections", "connection", ""),
+    ("data", "data", "class_id"),
+]
+
+VERSION_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION kinro_set_row_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock_shared({SYNC_LOCK_KEY});
+    NEW.row_version := nextval('kinro_row_version_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+TOMBSTONE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION kinro_record_tombstone() RETURNS trigger AS $$
+DECLARE
+    cls uuid;
+BEGIN
+    IF current_setting('kinro.skip_tombstones', true) = 'on' THEN
+        RETURN OLD;
+    END IF;
+    IF TG_ARGV[1] = 'class_id' THEN
+        cls := OLD.class_id;
+    ELSIF TG_ARGV[1] = 'id' THEN
+        cls := OLD.id;
+    ELSIF TG_ARGV[1] <> '' THEN
+        cls := TG_ARGV[1]::uuid;
+    END IF;
+    PERFORM pg_advisory_xact_lock_shared({SYNC_LOCK_KEY});
+    INSERT INTO sync_tombstones (row_version, entity, entity_id, class_id)
+    VALUES (nextval('kinro_row_version_seq'), TG_ARGV[0], OLD.id, cls);
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def create_triggers(table: str, entity: str, class_source: str) -> None:
+    op.execute(
+        f"CREATE TRIGGER kinro_version_i BEFORE INSERT ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION kinro_set_row_version()"
+    )
+    op.execute(
+        f"CREATE TRIGGER kinro_version_u BEFORE UPDATE ON {table} "
+        f"FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION kinro_set_row_version()"
+    )
+    op.execute(
+        f"CREATE TRIGGER kinro_tombstone AFTER DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION kinro_record_tombstone('{entity}', '{class_source}')"
+    )
+
+
+def drop_triggers(table: str) -> None:
+    for name in ("kinro_version_i", "kinro_version_u", "kinro_tombstone"):
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+
+
+def materialized_tables() -> list:
+    """ Tablas de clases materializadas que ya existen (materialize.py) """
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT to_regclass('materialized_classes')")).scalar() is None:
+        return []
+    rows = bind.execute(sa.text("SELECT class_id, table_name FROM materialized_classes")).all()
+    return [
+        (str(class_id), table) for class_id, table in rows
+        if bind.execute(sa.text("SELECT to_regclass(:t)"), {"t": table}).scalar() is not None
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE IF NOT EXISTS kinro_row_version_seq")
+    # Con un DEFAULT constante añadir la columna no reescribe la tabla; las
+    # filas existentes quedan en la versión 0 y llegan con since=0.
+    for table, _, _ in TABLES:
+        op.add_column(table, sa.Column("row_version", sa.BigInteger(), nullable=False, server_default="0"))
+
+    op.create_table(
+        "sync_tombstones",
+        sa.Column("row_version", sa.BigInteger(), primary_key=True),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("class_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_table(
+        "sync_state",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("pruned_through", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+    op.execute(VERSION_FUNCTION)
+    op.execute(TOMBSTONE_FUNCTION)
+    for table, entity, class_source in TABLES:
+        create_triggers(table, entity, class_source)
+    materialized = materialized_tables()
+    for class_id, table in materialized:
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS row_version bigint NOT NULL DEFAULT 0")
+        create_triggers(table, "data", class_id)
+
+    # Índices por versión fuera de la transacción, sin bloquear escrituras en tablas grandes
+    with op.get_context().autocommit_block():
+        for table, _, _ in TABLES:
+            op.create_index(
+                f"ix_{table}_row_version", table, ["row_version"],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        for class_id, table in materialized:
+            op.create_index(
+                f"ix_mat_{class_id.replace('-', '')}_row_version", table, ["row_version"],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    materialized = materialized_tables()
+    for _, table in materialized:
+        drop_triggers(table)
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS row_version")
+    for table, _, _ in TABLES:
+        drop_triggers(table)
+        op.drop_index(f"ix_{table}_row_version", table_name=table, if_exists=True)
+        op.drop_column(table, "row_version")
+    op.execute("DROP FUNCTION IF EXISTS kinro_record_tombstone()")
+    op.execute("DROP FUNCTION IF EXISTS kinro_set_row_version()")
+    op.drop_table("sync_state")
+    op.drop_table("sync_tombstones")
+    op.execute("DROP SEQUENCE IF EXISTS kinro_row_version_seq")
@@ -0,0 +1,114 @@
+"""Versión segura de /sync sin lock global: un advisory lock por transacción escritora
+
+Revision ID: b9e1f5c3a742
+Revises: c2d7e4a9f618
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e1f5c3a742'
+down_revision: Union[str, None] = 'c2d7e4a9f618'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+WRITER_FUNCTION = """
+CREATE OR REPLACE FUNCTION kinro_mark_sync_writer() RETURNS void AS $$
+DECLARE
+    latest bigint;
+BEGIN
+    IF current_setting('kinro.sync_writer', true) = 'on' THEN
+        RETURN;
+    END IF;
+    SELECT CASE WHEN is_called THEN last_value ELSE 0 END INTO latest FROM kinro_row_version_seq;
+    PERFORM pg_advisory_xact_lock_shared(1802071666, (latest % 4294967296 - 2147483648)::int);
+    PERFORM set_config('kinro.sync_writer', 'on', true);
+END
+$$ LANGUAGE plpgsql
+"""
+
+VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION kinro_set_row_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM kinro_mark_sync_writer();
+    NEW.row_version := nextval('kinro_row_version_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+TOMBSTONE_FUNCTION = """
+CREATE OR REPLACE FUNCTION kinro_record_tombstone() RETURNS trigger AS $$
+DECLARE
+    cls uuid;
+BEGIN
+    -- Borrados que no son eliminaciones para el cliente (p. ej. fin de una materialización)
+    IF current_setting('kinro.skip_tombstones', true) = 'on' THEN
+        RETURN OLD;
+    END IF;
+    IF TG_ARGV[1] = 'class_id' THEN
+        cls := OLD.class_id;
+    ELSIF TG_ARGV[1] = 'id' THEN
+        cls := OLD.id;
+    ELSIF TG_ARGV[1] <> '' THEN
+        cls := TG_ARGV[1]::uuid;
+    END IF;
+    PERFORM kinro_mark_sync_writer();
+    INSERT INTO sync_tombstones (row_version, entity, entity_id, class_id)
+    VALUES (nextval('kinro_row_version_seq'), TG_ARGV[0], OLD.id, cls);
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# Versiones anteriores (b7e2c41d9a05): lock compartido global en cada fila
+OLD_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION kinro_set_row_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock_shared(461330346607);
+    NEW.row_version := nextval('kinro_row_version_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+OLD_TOMBSTONE_FUNCTION = """
+CREATE OR REPLACE FUNCTION kinro_record_tombstone() RETURNS trigger AS $$
+DECLARE
+    cls uuid;
+BEGIN
+    IF current_setting('kinro.skip_tombstones', true) = 'on' THEN
+        RETURN OLD;
+    END IF;
+    IF TG_ARGV[1] = 'class_id' THEN
+        cls := OLD.class_id;
+    ELSIF TG_ARGV[1] = 'id' THEN
+        cls := OLD.id;
+    ELSIF TG_ARGV[1] <> '' THEN
+        cls := TG_ARGV[1]::uuid;
+    END IF;
+    PERFORM pg_advisory_xact_lock_shared(461330346607);
+    INSERT INTO sync_tombstones (row_version, entity, entity_id, class_id)
+    VALUES (nextval('kinro_row_version_seq'), TG_ARGV[0], OLD.id, cls);
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(WRITER_FUNCTION)
+    op.execute(VERSION_FUNCTION)
+    op.execute(TOMBSTONE_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(OLD_VERSION_FUNCTION)
+    op.execute(OLD_TOMBSTONE_FUNCTION)
+    op.execute("DROP FUNCTION IF EXISTS kinro_mark_sync_writer()")
@@ -0,0 +1,30 @@
+"""Índice (class_id, id) de data para la paginación por cursor
+
+Revision ID: c2d7e4a9f618
+Revises: a6c3e8f1d257
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7e4a9f618'
+down_revision: Union[str, None] = 'a6c3e8f1d257'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_all no añade índices a tablas que ya existen
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_class_id_id ON data (class_id, id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_data_class_id_id")
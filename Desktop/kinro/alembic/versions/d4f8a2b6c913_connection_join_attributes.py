@@ -0,0 +1,38 @@
+"""Atributos de unión en las conexiones
+
+Revision ID: d4f8a2b6c913
+Revises: b7e2c41d9a05
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8a2b6c913'
+down_revision: Union[str, None] = 'b7e2c41d9a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("source_attribute", "target_attribute")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Columnas nulas sin DEFAULT: añadirlas no reescribe la tabla
+    for name in COLUMNS:
+        op.add_column("connections", sa.Column(name, postgresql.UUID(as_uuid=True), nullable=True))
+        op.create_foreign_key(
+            f"connections_{name}_fkey", "connections", "attributes", [name], ["id"], ondelete="SET NULL",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in COLUMNS:
+        op.drop_constraint(f"connections_{name}_fkey", "connections", type_="foreignkey")
+        op.drop_column("connections", name)
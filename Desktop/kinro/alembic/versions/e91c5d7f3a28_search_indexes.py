@@ -0,0 +1,48 @@
+"""Función e índices de búsqueda sobre data.content
+
+Revision ID: e91c5d7f3a28
+Revises: d4f8a2b6c913
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91c5d7f3a28'
+down_revision: Union[str, None] = 'd4f8a2b6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_FUNCTION = """
+CREATE OR REPLACE FUNCTION kinro_search_text(content jsonb) RETURNS text AS $$
+    SELECT coalesce(string_agg(value, ' '), '') FROM jsonb_each_text(content)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+"""
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_search_tsv "
+    "ON data USING GIN (to_tsvector('simple'::regconfig, kinro_search_text(content)))",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_search_trgm "
+    "ON data USING GIN (kinro_search_text(content) gin_trgm_ops)",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(SEARCH_FUNCTION)
+    # Fuera de la transacción, sin bloquear escrituras mientras se construyen
+    with op.get_context().autocommit_block():
+        for statement in INDEXES:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_data_search_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_data_search_tsv")
+    op.execute("DROP FUNCTION IF EXISTS kinro_search_text(jsonb)")
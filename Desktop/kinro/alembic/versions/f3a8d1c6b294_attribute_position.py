@@ -0,0 +1,28 @@
+"""Posición de los atributos (orden estable de las columnas)
+
+Revision ID: f3a8d1c6b294
+Revises: b9e1f5c3a742
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8d1c6b294'
+down_revision: Union[str, None] = 'b9e1f5c3a742'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # La identidad numera las filas existentes al añadir la columna
+    op.execute("ALTER TABLE attributes ADD COLUMN IF NOT EXISTS position bigint GENERATED BY DEFAULT AS IDENTITY")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE attributes DROP COLUMN IF EXISTS position")
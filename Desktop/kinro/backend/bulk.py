@@ -0,0 +1,92 @@
+# backend/bulk.py
+import json
+import logging
+import time
+import uuid
+from typing import Iterable
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import config
+
+logger = logging.getLogger(__name__)
+
+DATA_COLUMNS = ["id", "class_id", "content"]
+
+# ✅ Carga masiva con COPY (asyncpg copy_records_to_table)
+
+async def _raw_connection(db: AsyncSession):
+    """ Conexión asyncpg subyacente a la transacción actual de la sesión """
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+def _records(rows: Iterable[tuple]) -> list[tuple]:
+    """
+    (class_id, content) -> (id, class_id, content JSON). El codec jsonb que
+    registra SQLAlchemy en la conexión espera el documento ya serializado.
+    """
+    return [
+        (uuid.uuid4(), class_id if isinstance(class_id, uuid.UUID) else uuid.UUID(str(class_id)),
+         json.dumps(content, ensure_ascii=False, default=str))
+        for class_id, content in rows
+    ]
+
+async def copy_records(db: AsyncSession, table_name: str, records: list[tuple], columns: list[str]):
+    """ COPY binario de registros ya convertidos en la transacción de la sesión """
+    connection = await _raw_connection(db)
+    await connection.copy_records_to_table(table_name, records=records, columns=columns)
+
+async def copy_staging_rows(db: AsyncSession, table_name: str, rows: list[tuple]) -> int:
+    """
+    COPY de filas (class_id, content) a una tabla temporal con las columnas
+    (ord, id, class_id, content); ord conserva el orden de llegada.
+    """
+    records = [(ord, *record) for ord, record in enumerate(_records(rows))]
+    await copy_records(db, table_name, records, ["ord", *DATA_COLUMNS])
+    return len(records)
+
+async def copy_data_rows(
+    db: AsyncSession,
+    rows: list[tuple],
+    chunk_size: int | None = None,
+    atomic: bool = True,
+) -> dict:
+    """
+    Inserta filas (class_id, content) en data con COPY binario, por bloques.
+    - atomic=True: todos los bloques en una transacción (todo o nada).
+    - atomic=False: commit por bloque; ante un error quedan los bloques previos.
+    Devuelve filas insertadas, tiempo y filas por segundo.
+    """
+    chunk_size = chunk_size or config.BULK_CHUNK_SIZE
+    started = time.perf_counter()
+    inserted = 0
+    chunks = 0
+    try:
+        for i in range(0, len(rows), chunk_size):
+            records = _records(rows[i:i + chunk_size])
+            await copy_records(db, "data", records, DATA_COLUMNS)
+            inserted += len(records)
+            chunks += 1
+            if not atomic:
+                await db.commit()
+        if atomic:
+            await db.commit()
+    except Exception as e:
+        await db.rollback()
+        committed = 0 if atomic else inserted
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al crear datos ({committed} registros confirmados): {str(e)}",
+        )
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "inserted": inserted,
+        "chunks": chunks,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(inserted / elapsed) if elapsed > 0 else inserted,
+    }
+    logger.info(f"COPY data: {inserted} filas en {stats['elapsed_seconds']}s ({stats['rows_per_second']} filas/s)")
+    return stats
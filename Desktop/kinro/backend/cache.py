@@ -0,0 +1,114 @@
+# backend/cache.py
+import logging
+import time
+from collections import OrderedDict
+
+from backend import config, notifications
+from backend.versioning import model_version
+
+logger = logging.getLogger(__name__)
+
+# ✅ Caché de metadatos (clases, atributos, propiedades y conexiones)
+
+class MetadataCache:
+    """
+    Caché en memoria con TTL y desalojo LRU. Las claves son tuplas cuyo primer
+    elemento es el espacio ("classes", "attributes", "properties", "connections",
+    "aggregates"). Las escrituras invalidan claves concretas después del commit.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        # Cambia con cada invalidación: una carga que empezó antes no se guarda
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: tuple, loader, ttl_seconds: float | None = None):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self._store(key, value, ttl_seconds)
+        return value
+
+    def _store(self, key: tuple, value, ttl_seconds: float | None = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys: tuple):
+        """
+        Elimina las entradas cuya clave empieza por cada una de las claves:
+        ("classes",) borra todo el espacio y ("aggregates", class_id) todas
+        las agregaciones de esa clase.
+        """
+        self._generation += 1
+        for key in keys:
+            for existing in [k for k in self._entries if k[:len(key)] == key]:
+                del self._entries[existing]
+            self.invalidations += 1
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+metadata_cache = MetadataCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS)
+
+# ✅ Coherencia entre procesos (LISTEN/NOTIFY)
+
+CACHE_CHANNEL = "kinro_cache"
+
+def _keys_to_payload(keys) -> list:
+    return [[str(part) for part in key] for key in keys]
+
+def publish_invalidation(keys, version: int):
+    """ Avisa al resto de procesos de uvicorn (si CACHE_NOTIFY está activo) """
+    if not config.CACHE_NOTIFY:
+        return
+    notifications.publish(CACHE_CHANNEL, {"keys": _keys_to_payload(keys), "version": version})
+
+def _on_remote_invalidation(payload: dict):
+    metadata_cache.invalidate(*[tuple(key) for key in payload.get("keys", [])])
+    if "version" in payload:
+        model_version.observe(payload["version"])
+
+def _on_reconnect():
+    # Pudieron perderse invalidaciones mientras no había conexión
+    metadata_cache.clear()
+    model_version.bump()
+
+def register_listener():
+    """ Se suscribe al canal de invalidación; al reconectar se vacía la caché entera """
+    if not config.CACHE_NOTIFY:
+        return
+    notifications.subscribe(CACHE_CHANNEL, _on_remote_invalidation, on_reconnect=_on_reconnect)
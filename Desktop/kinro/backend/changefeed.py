@@ -0,0 +1,140 @@
+# backend/changefeed.py
+import asyncio
+import json
+import logging
+import time
+
+from backend import config, notifications
+
+logger = logging.getLogger(__name__)
+
+CHANGES_CHANNEL = "kinro_changes"
+# NOTIFY admite hasta 8000 bytes por mensaje (con el sobre de notifications.publish)
+MAX_NOTIFY_BYTES = 7500
+
+# ✅ Eventos
+#
+# {"entity": "class" | "attribute" | "property" | "connection" | "data",
+#  "op": "create" | "update" | "replace" | "delete" | "resync",
+#  "id": ..., "class_id": ..., "diff": {...}, "ids": [...], "count": n, "ts": ms}
+#
+# "diff" lleva los campos nuevos o modificados: content completo al crear o
+# reemplazar ("replace") una fila, el merge-patch en "update". Las operaciones
+# masivas llevan "count" y, si no son demasiadas, "ids". Un evento de datos
+# sin "id" ni "ids", con "truncated" o el op "resync" indica al cliente que
+# vuelva a pedir los datos afectados.
+
+def _event(entity: str, op: str, id=None, class_id=None, diff=None, ids=None, count=None) -> dict:
+    event = {"entity": entity, "op": op, "ts": int(time.time() * 1000)}
+    if id is not None:
+        event["id"] = str(id)
+    if class_id is not None:
+        event["class_id"] = str(class_id)
+    if diff is not None:
+        event["diff"] = diff
+    if ids is not None:
+        if len(ids) <= config.CHANGEFEED_MAX_IDS:
+            event["ids"] = [str(i) for i in ids]
+        else:
+            event["truncated"] = True
+    if count is not None:
+        event["count"] = count
+    return event
+
+def _fit_notify(event: dict) -> dict:
+    """ Sin diff ni ids si el evento no cabe en un NOTIFY """
+    if len(json.dumps(event, default=str)) <= MAX_NOTIFY_BYTES:
+        return event
+    slim = {key: value for key, value in event.items() if key not in ("diff", "ids")}
+    slim["truncated"] = True
+    return slim
+
+# ✅ Reparto a los clientes del proceso
+
+class Subscriber:
+    """ Cola acotada de un cliente; si se llena se sustituye por un único "resync" """
+
+    def __init__(self, class_id: str | None, entities: set | None):
+        self.class_id = class_id
+        self.entities = entities
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=config.CHANGEFEED_QUEUE_SIZE)
+
+    def wants(self, event: dict) -> bool:
+        if event["op"] == "resync":
+            return True
+        if self.entities and event["entity"] not in self.entities:
+            return False
+        # Los cambios de una clase sin class_id (conexiones) llegan a todos
+        return self.class_id is None or event.get("class_id") in (None, self.class_id)
+
+    def deliver(self, event: dict):
+        if not self.wants(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_event("model", "resync"))
+
+    async def next(self, timeout: float) -> dict | None:
+        """ Siguiente evento, o None si no hay ninguno en timeout segundos (latido) """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class ChangeFeed:
+
+    def __init__(self):
+        self.subscribers: set[Subscriber] = set()
+        self.delivered = 0
+
+    def subscribe(self, class_id: str | None = None, entities: set | None = None) -> Subscriber:
+        subscriber = Subscriber(class_id, entities)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def dispatch(self, event: dict):
+        for subscriber in list(self.subscribers):
+            subscriber.deliver(event)
+        self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "delivered": self.delivered,
+            "queued": sum(s.queue.qsize() for s in self.subscribers),
+        }
+
+change_feed = ChangeFeed()
+
+# ✅ Publicación (desde crud, después del commit)
+
+def emit(entity: str, op: str, id=None, class_id=None, diff=None, ids=None, count=None):
+    """
+    Entrega el evento a los clientes de este proceso y, por NOTIFY, a los del
+    resto de procesos de uvicorn (cada uno lo reparte desde su conexión LISTEN).
+    """
+    if not config.CHANGEFEED_ENABLED:
+        return
+    event = _event(entity, op, id, class_id, diff, ids, count)
+    change_feed.dispatch(event)
+    # Sin conexión LISTEN los demás procesos reciben un "resync" al reconectar
+    if notifications.connected():
+        notifications.publish(CHANGES_CHANNEL, _fit_notify(event))
+
+def _on_remote_change(payload: dict):
+    change_feed.dispatch(payload)
+
+def _on_reconnect():
+    # Los eventos publicados mientras no había conexión se han perdido
+    change_feed.dispatch(_event("model", "resync"))
+
+def register_listener():
+    if not config.CHANGEFEED_ENABLED:
+        return
+    notifications.subscribe(CHANGES_CHANNEL, _on_remote_change, on_reconnect=_on_reconnect)
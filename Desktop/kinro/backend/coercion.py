@@ -0,0 +1,269 @@
+# backend/coercion.py
+# Conversión y validación por columnas de los content que llegan en la
+# ingesta (/data/batch, archivos y trabajos de importación), según el
+# data_type de cada atributo y sus propiedades (required, min_length,
+# max_length, no_special_chars). Como parsing.py, se ejecuta en el pool de
+# procesos de ingest.py y no importa nada de backend.
+import json
+import math
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from backend import parsing
+
+NUMERIC_RE = re.compile(r"-?[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?")
+# Decimal con coma, como lo exporta Excel en español
+COMMA_DECIMAL_RE = re.compile(r"-?[0-9]+,[0-9]+")
+DMY_DATE_RE = re.compile(r"([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})")
+SPECIAL_CHARS_RE = re.compile(r"[^\w\s]")
+TRUE_VALUES = {"true", "t", "1", "yes", "on", "sí", "si", "verdadero"}
+FALSE_VALUES = {"false", "f", "0", "no", "off", "falso"}
+
+# Máximo de errores que se devuelven por lote o archivo (el total siempre se cuenta)
+MAX_REPORTED_ERRORS = 100
+
+class CoercionError(ValueError):
+    pass
+
+# ✅ Conversores (un valor no vacío -> valor JSON tipado)
+
+def _number_text(value) -> str:
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise CoercionError("No es un número")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise CoercionError("Número no finito")
+    # Espacios alrededor admitidos, como en query.NUMERIC_PATTERN (filtros e índices)
+    text = str(value).strip()
+    if COMMA_DECIMAL_RE.fullmatch(text):
+        text = text.replace(",", ".")
+    if not isinstance(value, (int, float)) and not NUMERIC_RE.fullmatch(text):
+        raise CoercionError("No es un número")
+    return text
+
+def to_integer(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    number = float(_number_text(value))
+    if not math.isfinite(number) or not number.is_integer():
+        raise CoercionError("No es un número entero")
+    # Sin pasar por float si el texto ya es entero (no pierde precisión)
+    text = str(value).strip()
+    return int(text) if text.lstrip("-").isdigit() else int(number)
+
+def to_float(value):
+    number = float(_number_text(value))
+    if not math.isfinite(number):
+        raise CoercionError("Número fuera de rango")
+    return number
+
+def to_boolean(value):
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).strip().lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+    raise CoercionError("No es un valor booleano")
+
+def to_date(value):
+    """ Fecha ISO (YYYY-MM-DD); admite también fecha y hora ISO a medianoche y DD/MM/YYYY """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    match = DMY_DATE_RE.fullmatch(text)
+    try:
+        if match:
+            day, month, year = (int(part) for part in match.groups())
+            return date(year, month, day).isoformat()
+        if len(text) > 10:
+            moment = datetime.fromisoformat(text)
+            if moment.time() != datetime.min.time():
+                raise CoercionError("La fecha incluye una hora")
+            return moment.date().isoformat()
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise CoercionError("No es una fecha válida")
+
+def to_uuid(value):
+    try:
+        return str(uuid.UUID(str(value).strip()))
+    except ValueError:
+        raise CoercionError("No es un identificador único válido")
+
+def to_json(value):
+    # Un texto que no es JSON se guarda como cadena JSON
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def to_text(value):
+    if isinstance(value, (dict, list)):
+        raise CoercionError("Se esperaba un texto")
+    return value if isinstance(value, str) else str(value)
+
+CONVERTERS = {
+    "integer": to_integer,
+    "float": to_float,
+    "boolean": to_boolean,
+    "date": to_date,
+    "uuid": to_uuid,
+    "json": to_json,
+    "text": to_text,
+}
+
+# ✅ Esquema de una clase
+
+@dataclass
+class ColumnSpec:
+    name: str
+    data_type: str
+    required: bool = False
+    min_length: int | None = None
+    max_length: int | None = None
+    no_special_chars: bool = False
+
+def _flag(value) -> bool:
+    return str(value).strip().lower() in TRUE_VALUES
+
+def _length(value) -> int | None:
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+def class_schema(attributes) -> list[ColumnSpec]:
+    """ Columnas a partir de los atributos (con sus propiedades) de crud.get_attributes_by_class """
+    schema = []
+    for attribute in attributes:
+        spec = ColumnSpec(attribute.name, attribute.data_type)
+        for prop in attribute.properties or []:
+            if prop.name == "required":
+                spec.required = spec.required or _flag(prop.value)
+            elif prop.name == "min_length":
+                spec.min_length = _length(prop.value)
+            elif prop.name == "max_length":
+                spec.max_length = _length(prop.value)
+            elif prop.name == "no_special_chars":
+                spec.no_special_chars = _flag(prop.value)
+            elif prop.name == "natural_key" and _flag(prop.value):
+                # Una fila sin su clave natural no se puede identificar al reimportar
+                spec.required = True
+        schema.append(spec)
+    return schema
+
+# ✅ Conversión por columnas
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, str) and value.strip() == "")
+
+def coerce_column(values: list, spec: ColumnSpec) -> tuple[list, list[tuple[int, str]]]:
+    """
+    Convierte los valores de una columna. Las celdas vacías de las columnas no
+    textuales pasan a null. Devuelve los valores y los errores (posición, motivo).
+    """
+    convert = CONVERTERS.get(spec.data_type, to_text)
+    textual = convert is to_text
+    converted = []
+    errors = []
+    for i, value in enumerate(values):
+        if _is_empty(value):
+            if spec.required:
+                errors.append((i, "Valor requerido"))
+            converted.append(value if textual and value is not None else None)
+            continue
+        try:
+            value = convert(value)
+        except CoercionError as e:
+            errors.append((i, str(e)))
+            converted.append(value)
+            continue
+        if textual:
+            if spec.min_length is not None and len(value) < spec.min_length:
+                errors.append((i, f"Menos de {spec.min_length} caracteres"))
+            elif spec.max_length is not None and len(value) > spec.max_length:
+                errors.append((i, f"Más de {spec.max_length} caracteres"))
+            elif spec.no_special_chars and SPECIAL_CHARS_RE.search(value):
+                errors.append((i, "Contiene caracteres especiales"))
+        converted.append(value)
+    return converted, errors
+
+def coerce_contents(contents: list[dict], schema: list[ColumnSpec], row_offset: int = 0) -> tuple[list[dict], list[dict], int]:
+    """
+    Convierte y valida un lote columna a columna. Las filas con algún error se
+    descartan y se informan; las claves que no son atributos se conservan.
+    Devuelve (contents válidos, errores, filas descartadas).
+    """
+    rejected = set()
+    errors = []
+    columns = {}
+    for spec in schema:
+        present = [spec.name in content for content in contents]
+        if not spec.required and not any(present):
+            continue
+        values, column_errors = coerce_column([content.get(spec.name) for content in contents], spec)
+        columns[spec.name] = (values, present)
+        for i, message in column_errors:
+            rejected.add(i)
+            errors.append({
+                "row": row_offset + i,
+                "column": spec.name,
+                "value": contents[i].get(spec.name),
+                "error": message,
+            })
+
+    valid = []
+    for i, content in enumerate(contents):
+        if i in rejected:
+            continue
+        typed = dict(content)
+        for name, (values, present) in columns.items():
+            if present[i]:
+                typed[name] = values[i]
+        valid.append(typed)
+    errors.sort(key=lambda error: error["row"])
+    return valid, errors, len(rejected)
+
+def coerce_chunk(contents: list[dict], schema: list[ColumnSpec], row_offset: int = 0):
+    """ Tarea del pool para los lotes grandes de /data/batch """
+    return coerce_contents(contents, schema, row_offset)
+
+def parse_csv_range_typed(
+    path: str,
+    start: int,
+    end: int,
+    header_map: list[tuple[int, str]],
+    encoding: str,
+    schema: list[ColumnSpec],
+) -> tuple[list[dict], list[dict], int]:
+    """
+    Tarea del pool: parsea un rango CSV y lo convierte en el mismo proceso.
+    Devuelve (contents válidos, errores con la fila relativa al rango, filas leídas).
+    """
+    contents = parsing.parse_csv_range(path, start, end, header_map, encoding)
+    valid, errors, _ = coerce_contents(contents, schema)
+    return valid, errors, len(contents)
+
+# ✅ Informe de errores
+
+@dataclass
+class ErrorReport:
+    """ Filas descartadas y los primeros MAX_REPORTED_ERRORS errores """
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def add(self, errors: list[dict], rejected: int):
+        self.rejected += rejected
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def summary(self) -> dict:
+        return {"rejected": self.rejected, "errors": self.errors}
@@ -5,12 +5,113 @@ import toml
 # Cargar variables de entorno desde .env
 load_dotenv()
 
-# Cargar configuraciones desde pyproject.toml
-config = toml.load("pyproject.toml")
+# Cargar configuraciones desde pyproject.toml (junto a backend/, no en el directorio actual)
+config = toml.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pyproject.toml"))
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Réplica de sólo lectura opcional: get_db le envía las peticiones GET
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 SECRET_KEY = os.getenv("SECRET_KEY")
 DEBUG = os.getenv("DEBUG") == "True"
+
+# Pool de conexiones (por engine y por proceso de uvicorn)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+# Caché de sentencias preparadas de asyncpg (0 detrás de PgBouncer en modo transaction)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# Límites en el servidor, en milisegundos (0 = sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 60000))
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", 0))
+# Límite de las operaciones que pueden ser una única sentencia larga y de los
+# trabajos en segundo plano (database.allow_long_statements / long_session)
+DB_LONG_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_LONG_STATEMENT_TIMEOUT_MS", 0))
+
+# Ingesta de archivos (Excel/CSV)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 2))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 5000))
+INGEST_RANGE_BYTES = int(os.getenv("INGEST_RANGE_BYTES", 4 * 1024 * 1024))
+# Ingesta en streaming (POST /data/batch/stream): tamaño máximo del cuerpo
+# (0 = sin límite) y de cada línea NDJSON o registro msgpack, en bytes
+STREAM_MAX_BODY_BYTES = int(os.getenv("STREAM_MAX_BODY_BYTES", 2 * 1024 * 1024 * 1024))
+STREAM_MAX_RECORD_BYTES = int(os.getenv("STREAM_MAX_RECORD_BYTES", 1024 * 1024))
+# Conversión de los valores al tipo de cada atributo al importar (coercion.py);
+# las filas no válidas se descartan y se informan sin abortar el lote
+DATA_COERCION = os.getenv("DATA_COERCION", "True") == "True"
+# A partir de estas filas por clase, la conversión de /data/batch va al pool de procesos
+COERCE_POOL_MIN_ROWS = int(os.getenv("COERCE_POOL_MIN_ROWS", 20000))
+
+# Carga masiva con COPY
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 10000))
+# Filas por UPDATE ... FROM (VALUES ...) en PATCH /data/batch (2 parámetros por fila)
+PATCH_CHUNK_SIZE = int(os.getenv("PATCH_CHUNK_SIZE", 5000))
+
+# Filas por DELETE al purgar una clase (un commit por bloque, bloqueos cortos)
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", 10000))
+
+# Serialización por defecto de las páginas de datos: model | orjson | db (ver serialization.py)
+DATA_RENDER = os.getenv("DATA_RENDER", "model")
+
+# Reescritura de content al renombrar o eliminar un atributo (un commit por bloque)
+REWRITE_CHUNK_SIZE = int(os.getenv("REWRITE_CHUNK_SIZE", 5000))
+# Pausa entre bloques: deja trabajar al autovacuum y a la réplica
+REWRITE_PAUSE_SECONDS = float(os.getenv("REWRITE_PAUSE_SECONDS", 0.05))
+
+# Trabajos de importación en segundo plano
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", 2))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 100))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", 200))
+
+# Caché de metadatos
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 60))
+# Invalidación entre procesos de uvicorn con LISTEN/NOTIFY
+CACHE_NOTIFY = os.getenv("CACHE_NOTIFY") == "True"
+
+# Feed de cambios en tiempo real (GET /changes/stream)
+CHANGEFEED_ENABLED = os.getenv("CHANGEFEED_ENABLED", "True") == "True"
+CHANGEFEED_QUEUE_SIZE = int(os.getenv("CHANGEFEED_QUEUE_SIZE", 1000))
+CHANGEFEED_HEARTBEAT_SECONDS = float(os.getenv("CHANGEFEED_HEARTBEAT_SECONDS", 15))
+# Ids por evento en las operaciones masivas; con más sólo se envía el total
+CHANGEFEED_MAX_IDS = int(os.getenv("CHANGEFEED_MAX_IDS", 200))
+
+# Sincronización incremental (GET /sync/)
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+# Materialización de clases en tablas tipadas
+MATERIALIZE_CHUNK_SIZE = int(os.getenv("MATERIALIZE_CHUNK_SIZE", 5000))
+# Espera tras el cambio de almacenamiento para que todos los procesos lo vean (caché con TTL)
+MATERIALIZE_GRACE_SECONDS = float(os.getenv("MATERIALIZE_GRACE_SECONDS", CACHE_TTL_SECONDS + 5))
+
+# Métricas (GET /metrics) e instrumentación de peticiones y SQL
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+# Sentencias a partir de esta duración se registran como lentas (log y /monitoring/slow-queries)
+METRICS_SLOW_QUERY_MS = float(os.getenv("METRICS_SLOW_QUERY_MS", 200))
+METRICS_SLOW_QUERY_LOG_SIZE = int(os.getenv("METRICS_SLOW_QUERY_LOG_SIZE", 50))
+# Desglose de tiempos por petición con la cabecera X-Kinro-Profile (desactivado por defecto)
+METRICS_PROFILING = os.getenv("METRICS_PROFILING") == "True"
+
+# Agregaciones (POST /data/{class_id}/aggregate)
+# Se guardan en caché las de clases con al menos estas filas (estimación del planner)
+AGGREGATE_CACHE_MIN_ROWS = int(os.getenv("AGGREGATE_CACHE_MIN_ROWS", 50000))
+# Las escrituras de la clase las invalidan; el TTL sólo acota lo que ven otros procesos sin CACHE_NOTIFY
+AGGREGATE_CACHE_TTL_SECONDS = float(os.getenv("AGGREGATE_CACHE_TTL_SECONDS", 300))
+
+# Búsqueda (GET /search, ver search.py)
+# Candidatos por índice que se reordenan con RapidFuzz (la ventana crece con la página pedida)
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", 100))
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", 1000))
+# Coincidencias que se ordenan por relevancia en PostgreSQL antes de cortar la ventana
+SEARCH_SCAN_LIMIT = int(os.getenv("SEARCH_SCAN_LIMIT", 5000))
+# Búsqueda aproximada por trigramas cuando las palabras exactas no llenan la ventana
+SEARCH_FUZZY = os.getenv("SEARCH_FUZZY", "True") == "True"
+SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", 0.5))
+# Puntuación mínima de RapidFuzz (0-100) para resaltar un atributo
+SEARCH_MIN_SCORE = float(os.getenv("SEARCH_MIN_SCORE", 60))
+SEARCH_MAX_HIGHLIGHTS = int(os.getenv("SEARCH_MAX_HIGHLIGHTS", 3))
+
 PROJECT_NAME = config["tool"]["poetry"]["name"]
 VERSION = config["tool"]["poetry"]["version"]
 
@@ -4,16 +4,50 @@ import os
 # 🔹 Agregar la raíz del proyecto al `sys.path`
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from backend import search, sync
 from backend.models import Base
 from backend.database import DATABASE_URL
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 import asyncio
 
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def alembic_heads() -> tuple:
+    alembic_config = Config(os.path.join(ROOT, "alembic.ini"))
+    alembic_config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    return ScriptDirectory.from_config(alembic_config).get_heads()
+
+async def stamp_heads(conn):
+    """
+    Una base de datos nueva ya tiene el esquema de la última migración:
+    se marca como tal para que `alembic upgrade head` no vuelva a aplicarlas.
+    """
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS alembic_version ("
+        "version_num VARCHAR(32) NOT NULL, CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))"
+    ))
+    await conn.execute(text("DELETE FROM alembic_version"))
+    for head in alembic_heads():
+        await conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:head)"), {"head": head})
+
 async def create_tables():
     engine = create_async_engine(DATABASE_URL, echo=True)
     async with engine.begin() as conn:
         print("🔹 Creando tablas manualmente...")
+        fresh = (await conn.execute(text("SELECT to_regclass('data')"))).scalar() is None
         await conn.run_sync(Base.metadata.create_all)
+        # Triggers de versión de fila y lápidas (GET /sync/)
+        for statement in sync.schema_ddl():
+            await conn.execute(text(statement))
+        # Función e índices de la búsqueda (GET /search)
+        for statement in search.schema_ddl():
+            await conn.execute(text(statement))
+        # Sobre tablas que ya existían create_all no cambia nada: ahí manda Alembic
+        if fresh:
+            await stamp_heads(conn)
         print("✅ ¡Tablas creadas con éxito!")
 
 if __name__ == "__main__":
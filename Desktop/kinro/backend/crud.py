@@ -1,18 +1,132 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import (
+    Text, any_, cast, column, delete, func, literal, literal_column, not_, or_, table, true, union_all, update, values,
+)
 from sqlalchemy.orm import selectinload
-from sqlalchemy import Table, Column, ForeignKey, MetaData
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID, array, insert as pg_insert
 from fastapi import HTTPException
-from backend.models import ClassModel, Connection, Attribute, Data, Property
+from backend import bulk, changefeed, coercion, config, indexes, materialize, query, sync
+from backend.versioning import model_version
+from backend.cache import metadata_cache, publish_invalidation
+from backend.database import AsyncSessionLocal, allow_long_statements, is_replica
+from backend.models import ClassModel, Connection, Attribute, Data, Property, MaterializedClass, SyncState, Tombstone
 from backend.schemas import (
     ClassModelCreate, ConnectionCreate, ClassUpdate, AttributeCreate, AttributeUpdate,
-    DataCreate, DataUpdate, PropertyCreate, PropertyUpdate
+    DataCreate, DataUpdate, DataPatch, DataAggregate, DataTraversal, PropertyCreate, PropertyUpdate, ConnectionUpdate,
+    ClassDiagramSchema, AttributeSchema, PropertySchema, ConnectionSchema
 )
+from datetime import date
+from decimal import Decimal
+import json
 import uuid
 
+# ✅ Perfiles de carga (las relaciones del modelo son lazy="raise")
+
+# Diagrama: atributos con sus propiedades, sin filas de datos
+CLASS_DIAGRAM_LOAD = (selectinload(ClassModel.attributes).selectinload(Attribute.properties),)
+# Clase completa: además todas sus filas de datos (sólo bajo demanda)
+CLASS_FULL_LOAD = CLASS_DIAGRAM_LOAD + (selectinload(ClassModel.data_entries),)
+# Clases visibles: las marcadas por delete_class se están eliminando
+LIVE_CLASS = ClassModel.deleting.is_(False)
+ATTRIBUTE_LOAD = (selectinload(Attribute.properties),)
+
+# ✅ Caché de metadatos (ver cache.py)
+
+# Se guardan esquemas Pydantic, no objetos ORM ligados a una sesión
+CLASSES_KEY = ("classes",)
+CONNECTIONS_KEY = ("connections",)
+STORAGE_KEY = ("storage",)
+
+def attributes_key(class_id) -> tuple:
+    return ("attributes", str(class_id))
+
+def properties_key(attribute_id) -> tuple:
+    return ("properties", str(attribute_id))
+
+def aggregates_key(class_id=None) -> tuple:
+    """ Agregaciones de una clase; sin clase, las de todas """
+    return ("aggregates",) if class_id is None else ("aggregates", str(class_id))
+
+def metadata_changed(*keys: tuple):
+    """ Tras el commit: nueva versión del modelo e invalidación local y en el resto de procesos """
+    version = model_version.bump()
+    metadata_cache.invalidate(*keys)
+    publish_invalidation(keys, version)
+
+def data_changed(*class_ids):
+    """ Altas y bajas de filas: data_count del listado de clases y agregaciones de esas clases """
+    keys = (CLASSES_KEY, *[aggregates_key(class_id) for class_id in class_ids or (None,)])
+    metadata_cache.invalidate(*keys)
+    publish_invalidation(keys, model_version.value)
+
+def rows_changed(*class_ids):
+    """ Actualizaciones de filas: no cambian el data_count, sólo las agregaciones """
+    keys = [aggregates_key(class_id) for class_id in class_ids or (None,)]
+    metadata_cache.invalidate(*keys)
+    publish_invalidation(keys, model_version.value)
+
+def _field(row, key):
+    """ Campo de una fila de data: objeto ORM o dict (tablas materializadas) """
+    return row[key] if isinstance(row, dict) else getattr(row, key)
+
+def _emit_row(op: str, row, diff=None):
+    changefeed.emit("data", op, id=_field(row, "id"), class_id=_field(row, "class_id"), diff=diff)
+
+async def _cached(db: AsyncSession, key: tuple, load, ttl_seconds: float | None = None):
+    """
+    Los metadatos se cargan siempre del primario: una réplica con retraso
+    dejaría en caché datos que ya se invalidaron.
+    """
+    async def loader():
+        if not is_replica(db):
+            return await load(db)
+        async with AsyncSessionLocal() as primary:
+            return await load(primary)
+    return await metadata_cache.get_or_load(key, loader, ttl_seconds)
+
+async def _attribute_class_id(db: AsyncSession, attribute_id):
+    result = await db.execute(select(Attribute.class_id).where(Attribute.id == attribute_id))
+    return result.scalar_one_or_none()
+
+# ✅ Almacenamiento de las filas: data.content o tabla materializada (ver materialize.py)
+
+async def get_storage_states(db: AsyncSession) -> dict:
+    """ Clases materializadas o en migración: {class_id: estado} """
+    async def load(db):
+        result = await db.execute(select(MaterializedClass.class_id, MaterializedClass.state))
+        return {str(class_id): state for class_id, state in result.all()}
+    return await _cached(db, STORAGE_KEY, load)
+
+async def get_storage_state(db: AsyncSession, class_id) -> str | None:
+    try:
+        key = str(uuid.UUID(str(class_id)))
+    except ValueError:
+        return None
+    return (await get_storage_states(db)).get(key)
+
+async def get_materialized_table(db: AsyncSession, class_id):
+    """ Tabla de la clase si ya está materializada; None si sus filas están en data """
+    if await get_storage_state(db, class_id) != materialize.READY:
+        return None
+    return materialize.table_for(class_id, await get_attributes_by_class(db, class_id))
+
+async def _materialized_tables(db: AsyncSession) -> list:
+    """ Para las operaciones por id, que no conocen la clase de la fila """
+    states = await get_storage_states(db)
+    return [
+        await get_materialized_table(db, class_id)
+        for class_id, state in states.items() if state == materialize.READY
+    ]
+
+async def _writable_storage(db: AsyncSession, class_id) -> str | None:
+    """ Durante la migración no se admiten cambios de atributos """
+    state = await get_storage_state(db, class_id)
+    if state == materialize.MIGRATING:
+        raise HTTPException(status_code=409, detail="La clase se está materializando, intente más tarde")
+    return state
+
 # ✅ CRUD para ClassModel
 
 async def create_class(db: AsyncSession, class_data: ClassModelCreate):
@@ -20,25 +134,118 @@ async def create_class(db: AsyncSession, class_data: ClassModelCreate):
     new_class = ClassModel(name=class_data.name)
     db.add(new_class)
     await db.commit()
-    await db.refresh(new_class)
-    return new_class
+    metadata_changed(CLASSES_KEY)
+    changefeed.emit("class", "create", id=new_class.id, class_id=new_class.id, diff={"name": new_class.name})
+    return await get_class_diagram(db, new_class.id)
+
+async def count_data_per_class(db: AsyncSession, class_id=None) -> dict:
+    """ Número de filas por clase en una sola consulta agregada (más las tablas materializadas) """
+    stmt = select(Data.class_id, func.count()).group_by(Data.class_id)
+    if class_id is not None:
+        stmt = stmt.where(Data.class_id == class_id)
+    result = await db.execute(stmt)
+    counts = {row[0]: row[1] for row in result.all()}
+    for mt in await _materialized_tables(db):
+        if class_id is None or str(mt.class_id) == str(class_id):
+            counts[mt.class_id] = (await db.execute(select(func.count()).select_from(mt.table))).scalar_one()
+    return counts
+
+def _with_data_count(class_instance, counts: dict, states: dict) -> dict:
+    return {
+        "id": class_instance.id,
+        "name": class_instance.name,
+        "position_x": class_instance.position_x,
+        "position_y": class_instance.position_y,
+        "attributes": class_instance.attributes,
+        "data_count": counts.get(class_instance.id, 0),
+        "storage": states.get(str(class_instance.id), "jsonb"),
+    }
 
 async def get_classes(db: AsyncSession):
-    """ Obtiene todas las clases con sus atributos y datos """
+    """ Obtiene todas las clases con sus atributos, propiedades y número de filas """
+    async def load(db):
+        result = await db.execute(select(ClassModel).where(LIVE_CLASS).options(*CLASS_DIAGRAM_LOAD))
+        counts = await count_data_per_class(db)
+        states = await get_storage_states(db)
+        return [
+            ClassDiagramSchema.model_validate(_with_data_count(c, counts, states))
+            for c in result.scalars().all()
+        ]
+    return await _cached(db, CLASSES_KEY, load)
+
+MODEL_TABLES = (ClassModel, Attribute, Property, Connection)
+MODEL_ENTITIES = ("class", "attribute", "property", "connection")
+
+async def get_model_version(db: AsyncSession) -> int:
+    """
+    Versión del modelo según la base de datos, igual en todos los procesos:
+    la mayor row_version de clases, atributos, propiedades y conexiones, de
+    sus lápidas y de la purga de lápidas (para que una eliminación cuya
+    lápida ya se purgó no devuelva una versión anterior). Sólo máximos por índice.
+    """
+    latest = [select(func.max(table.row_version)).scalar_subquery() for table in MODEL_TABLES]
+    latest += [
+        select(func.max(Tombstone.row_version)).where(Tombstone.entity == entity).scalar_subquery()
+        for entity in MODEL_ENTITIES
+    ]
+    latest.append(select(func.max(SyncState.pruned_through)).scalar_subquery())
+    result = await db.execute(select(func.coalesce(func.greatest(*latest), 0)))
+    return result.scalar_one()
+
+async def get_graph(db: AsyncSession):
+    """ Clases (con atributos y propiedades) y conexiones en una sola instantánea """
+    result = await db.execute(select(ClassModel).where(LIVE_CLASS).options(*CLASS_DIAGRAM_LOAD))
+    classes = result.scalars().all()
+    connections = (await db.execute(select(Connection))).scalars().all()
+    return {"classes": classes, "connections": connections}
+
+async def get_class_diagram(db: AsyncSession, class_id):
+    """ Una clase con el perfil del diagrama (atributos, propiedades, número de filas) """
     result = await db.execute(
         select(ClassModel)
-        .options(selectinload(ClassModel.attributes), selectinload(ClassModel.data_entries))
+        .where(ClassModel.id == class_id, LIVE_CLASS)
+        .options(*CLASS_DIAGRAM_LOAD)
+        .execution_options(populate_existing=True)
     )
-    return result.scalars().all()
+    class_instance = result.scalars().first()
+    if not class_instance:
+        raise HTTPException(status_code=404, detail="Clase no encontrada")
+    counts = await count_data_per_class(db, class_instance.id)
+    return _with_data_count(class_instance, counts, await get_storage_states(db))
+
+async def get_class_full(db: AsyncSession, class_id: str):
+    """ Una clase con todas sus filas de datos """
+    mt = await get_materialized_table(db, class_id)
+    if mt is None:
+        result = await db.execute(
+            select(ClassModel).where(ClassModel.id == query.class_uuid(class_id), LIVE_CLASS).options(*CLASS_FULL_LOAD)
+        )
+        return result.scalars().first()
+    result = await db.execute(
+        select(ClassModel).where(ClassModel.id == mt.class_id, LIVE_CLASS).options(*CLASS_DIAGRAM_LOAD)
+    )
+    class_instance = result.scalars().first()
+    if not class_instance:
+        return None
+    rows = (await db.execute(materialize.select_rows(mt))).all()
+    return {
+        **ClassDiagramSchema.model_validate(_with_data_count(class_instance, {}, {})).model_dump(),
+        "data_entries": [dict(row._mapping) for row in rows],
+    }
 
 async def get_class_by_id(db: AsyncSession, class_id: str):
     """ Obtiene una clase por su ID """
-    result = await db.execute(select(ClassModel).where(ClassModel.id == class_id))
+    result = await db.execute(select(ClassModel).where(ClassModel.id == class_id, LIVE_CLASS))
     return result.scalars().first()
 
+async def get_class_name(db: AsyncSession, class_id: str):
+    """ Obtiene sólo el nombre de una clase (sin cargar relaciones) """
+    result = await db.execute(select(ClassModel.name).where(ClassModel.id == query.class_uuid(class_id), LIVE_CLASS))
+    return result.scalar_one_or_none()
+
 async def update_class(db: AsyncSession, class_id: str, update_data: ClassUpdate):
     db_class = await db.get(ClassModel, class_id)
-    if not db_class:
+    if not db_class or db_class.deleting:
         raise HTTPException(status_code=404, detail="Class not found")
     
     # Solo actualizar los campos que se envían
@@ -47,31 +254,97 @@ async def update_class(db: AsyncSession, class_id: str, update_data: ClassUpdate
         setattr(db_class, key, value)
     
     await db.commit()
-    await db.refresh(db_class)
-    return db_class
+    metadata_changed(CLASSES_KEY)
+    changefeed.emit("class", "update", id=db_class.id, class_id=db_class.id, diff=update_dict)
+    return await get_class_diagram(db, db_class.id)
 
 async def delete_class(db: AsyncSession, class_id: str):
-    """ Elimina una clase y sus dependencias automáticamente con CASCADE """
+    """
+    Elimina una clase sin cargarla. En una primera transacción se marca
+    (deleting), con lo que deja de verse, y se eliminan sus conexiones y su
+    tabla materializada. Después se purgan sus filas de data por bloques y se
+    elimina la clase con un único DELETE; atributos y propiedades los borra la
+    base de datos con ON DELETE CASCADE. Si algo falla a medias, la clase
+    sigue marcada y se termina al volver a eliminarla o al arrancar
+    (resume_class_deletions).
+    """
+    class_uuid = query.class_uuid(class_id)
     try:
-        result = await db.execute(select(ClassModel).where(ClassModel.id == class_id))
-        class_instance = result.scalars().first()
-        if not class_instance:
+        marked = await db.execute(
+            update(ClassModel).where(ClassModel.id == class_uuid)
+            .values(deleting=True).returning(ClassModel.id)
+        )
+        if marked.scalar_one_or_none() is None:
             raise HTTPException(status_code=404, detail="Clase no encontrada")
-        
-        await db.delete(class_instance)
+        if await get_storage_state(db, class_uuid) is not None:
+            # La tabla materializada se elimina entera, sin purgarla
+            await materialize.drop_storage(db, class_uuid)
+        # Las conexiones de tablas creadas sin ON DELETE CASCADE se borran explícitamente
+        await db.execute(delete(Connection).where(
+            or_(Connection.source_class == class_uuid, Connection.target_class == class_uuid)
+        ))
         await db.commit()
-        return {"message": "Clase eliminada correctamente"}
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al eliminar la clase: {str(e)}")
+    metadata_changed(CLASSES_KEY, CONNECTIONS_KEY, STORAGE_KEY)
+    changefeed.emit("class", "delete", id=class_id, class_id=class_id)
+    await _finish_class_deletion(db, class_uuid)
+    return {"message": "Clase eliminada correctamente"}
 
+async def _finish_class_deletion(db: AsyncSession, class_uuid):
+    """ Purga por bloques las filas de una clase marcada y elimina la clase """
+    attribute_ids = (await db.execute(
+        select(Attribute.id).where(Attribute.class_id == class_uuid)
+    )).scalars().all()
+    deleted = await _purge_rows(db, Data.id, [query.class_scope(class_uuid)])
+    if deleted:
+        data_changed(class_uuid)
+    try:
+        await db.execute(delete(ClassModel).where(ClassModel.id == class_uuid))
+        await db.commit()
     except Exception as e:
         await db.rollback()
-        return {"error": str(e)}
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al eliminar la clase tras purgar {deleted} registros: {str(e)}",
+        )
+    metadata_changed(
+        attributes_key(class_uuid), *[properties_key(attribute_id) for attribute_id in attribute_ids],
+    )
+    indexes.schedule(indexes.drop_class_indexes(class_uuid, attribute_ids))
+
+async def resume_class_deletions():
+    """ Termina las eliminaciones de clases interrumpidas (clases con deleting) """
+    async with AsyncSessionLocal() as db:
+        class_ids = (await db.execute(select(ClassModel.id).where(ClassModel.deleting))).scalars().all()
+        for class_id in class_ids:
+            await _finish_class_deletion(db, class_id)
 
 # ✅ CRUD para Attribute
 
 async def get_attributes_by_class(db: AsyncSession, class_id: str):
-    """ Obtiene los atributos de una clase """
-    result = await db.execute(select(Attribute).where(Attribute.class_id == class_id))
-    return result.scalars().all()
+    """ Obtiene los atributos de una clase, en el orden en que se crearon """
+    async def load(db):
+        result = await db.execute(
+            select(Attribute).where(Attribute.class_id == class_id)
+            .order_by(Attribute.position).options(*ATTRIBUTE_LOAD)
+        )
+        return [AttributeSchema.model_validate(attr) for attr in result.scalars().all()]
+    return await _cached(db, attributes_key(class_id), load)
+
+async def get_attribute(db: AsyncSession, attribute_id):
+    """ Obtiene un atributo con sus propiedades """
+    result = await db.execute(
+        select(Attribute)
+        .where(Attribute.id == attribute_id)
+        .options(*ATTRIBUTE_LOAD)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
 
 async def create_attribute(db: AsyncSession, attr_data: AttributeCreate):
     """ Crea un nuevo atributo """
@@ -80,34 +353,88 @@ async def create_attribute(db: AsyncSession, attr_data: AttributeCreate):
         name=attr_data.name,
         data_type=attr_data.data_type
     )
+    storage = await _writable_storage(db, attr_data.class_id)
     db.add(new_attr)
+    renormalize = False
+    if storage == materialize.READY:
+        await db.flush()
+        renormalize = await materialize.alter_for_attribute(db, new_attr.class_id, None, new_attr)
     await db.commit()
-    await db.refresh(new_attr)
+    metadata_changed(CLASSES_KEY, attributes_key(new_attr.class_id))
+    new_attr = await get_attribute(db, new_attr.id)
+    changefeed.emit(
+        "attribute", "create", id=new_attr.id, class_id=new_attr.class_id,
+        diff={"name": new_attr.name, "data_type": new_attr.data_type},
+    )
+    if storage == materialize.READY:
+        indexes.schedule(materialize.finish_attribute_change(new_attr.class_id, new_attr.id, renormalize))
+    else:
+        indexes.schedule(indexes.create_attribute_indexes(new_attr))
     return new_attr
 
 async def update_attribute(db: AsyncSession, attribute_id: str, update_data: AttributeUpdate):
     """ Actualiza un atributo """
-    result = await db.execute(select(Attribute).where(Attribute.id == attribute_id))
-    attr_instance = result.scalars().first()
+    attr_instance = await get_attribute(db, attribute_id)
     if not attr_instance:
         raise HTTPException(status_code=404, detail="Atributo no encontrado")
+    storage = await _writable_storage(db, attr_instance.class_id)
+    snapshot = AttributeSchema.model_validate(attr_instance)
+    previous = (attr_instance.name, attr_instance.data_type)
     if update_data.name:
         attr_instance.name = update_data.name
     if update_data.data_type:
         attr_instance.data_type = update_data.data_type
+    changed = previous != (attr_instance.name, attr_instance.data_type)
+    renormalize = False
+    if storage == materialize.READY and changed:
+        renormalize = await materialize.alter_for_attribute(db, attr_instance.class_id, snapshot, attr_instance)
     await db.commit()
-    await db.refresh(attr_instance)
+    metadata_changed(CLASSES_KEY, attributes_key(attr_instance.class_id))
+    attr_instance = await get_attribute(db, attr_instance.id)
+    if changed:
+        changefeed.emit(
+            "attribute", "update", id=attr_instance.id, class_id=attr_instance.class_id,
+            diff={"name": attr_instance.name, "data_type": attr_instance.data_type},
+        )
+    if changed and storage == materialize.READY:
+        indexes.schedule(materialize.finish_attribute_change(attr_instance.class_id, attr_instance.id, renormalize))
+    elif changed:
+        indexes.schedule(_rebuild_attribute_indexes(attr_instance))
+    if previous[0] != attr_instance.name and natural_key_names([snapshot]):
+        # La expresión del índice de la clave natural usa el nombre del atributo.
+        # Con las filas en data se quita hasta que termine de reescribirlas
+        # jobs.submit_content_rewrite (mientras, el upsert responde 409).
+        names = await get_natural_key(db, attr_instance.class_id) if storage is not None else []
+        indexes.schedule(indexes.rebuild_natural_key_index(attr_instance.class_id, names))
     return attr_instance
 
+async def _rebuild_attribute_indexes(attr_instance):
+    """ El índice depende del nombre y del tipo: se reconstruye si cambian """
+    await indexes.drop_attribute_indexes(attr_instance.id)
+    await indexes.create_attribute_indexes(attr_instance)
+
 async def delete_attribute(db: AsyncSession, attribute_id: str):
     """ Elimina un atributo y sus propiedades """
     try:
-        result = await db.execute(select(Attribute).where(Attribute.id == attribute_id))
-        attr_instance = result.scalars().first()
+        attr_instance = await get_attribute(db, attribute_id)
         if not attr_instance:
             raise HTTPException(status_code=404, detail="Atributo no encontrado")
-        await db.delete(attr_instance)
+        class_id = attr_instance.class_id
+        if await _writable_storage(db, class_id) == materialize.READY:
+            await materialize.alter_for_attribute(db, class_id, attr_instance, None)
+        # Las propiedades las borra la base de datos (ON DELETE CASCADE)
+        await db.execute(delete(Attribute).where(Attribute.id == attr_instance.id))
         await db.commit()
+        # Las conexiones que lo usaban como atributo de unión quedan sin él (ON DELETE SET NULL)
+        metadata_changed(CLASSES_KEY, CONNECTIONS_KEY, attributes_key(class_id), properties_key(attribute_id))
+        changefeed.emit("attribute", "delete", id=attribute_id, class_id=class_id)
+        remaining = await db.execute(
+            select(func.count()).select_from(Attribute).where(Attribute.class_id == class_id)
+        )
+        indexes.schedule(indexes.drop_attribute_indexes(attribute_id, class_id, remaining.scalar_one()))
+        if natural_key_names([attr_instance]):
+            names = await get_natural_key(db, class_id)
+            indexes.schedule(indexes.rebuild_natural_key_index(class_id, names))
         return attr_instance
     except Exception as e:
         await db.rollback()
@@ -117,10 +444,19 @@ async def delete_attribute(db: AsyncSession, attribute_id: str):
 
 async def create_data(db: AsyncSession, data: DataCreate):
     """ Crea una nueva entrada de datos """
+    mt = await get_materialized_table(db, data.class_id)
+    if mt is not None:
+        row = await materialize.insert_row(db, mt, data.content)
+        await db.commit()
+        data_changed(data.class_id)
+        _emit_row("create", row, row["content"])
+        return row
     new_data = Data(class_id=data.class_id, content=data.content)
     db.add(new_data)
     await db.commit()
+    data_changed(data.class_id)
     await db.refresh(new_data)
+    _emit_row("create", new_data, new_data.content)
     return new_data
 
 async def update_data(db: AsyncSession, data_id: str, update_data: DataUpdate):
@@ -128,28 +464,623 @@ async def update_data(db: AsyncSession, data_id: str, update_data: DataUpdate):
     result = await db.execute(select(Data).where(Data.id == data_id))
     data_instance = result.scalars().first()
     if not data_instance:
-        raise HTTPException(status_code=404, detail="Entrada de datos no encontrada")
+        return await _update_materialized_data(db, data_id, update_data)
     if update_data.content:
         data_instance.content = update_data.content
     await db.commit()
     await db.refresh(data_instance)
+    if update_data.content:
+        rows_changed(data_instance.class_id)
+        _emit_row("replace", data_instance, data_instance.content)
     return data_instance
 
-async def get_data_by_class(db: AsyncSession, class_id: str):
-    """ Obtiene datos relacionados a una clase """
-    result = await db.execute(select(Data).where(Data.class_id == class_id))
-    return result.scalars().all()
+async def _update_materialized_data(db: AsyncSession, data_id: str, update_data: DataUpdate):
+    mt, row = await materialize.find_row(db, await _materialized_tables(db), data_id)
+    if mt is None:
+        raise HTTPException(status_code=404, detail="Entrada de datos no encontrada")
+    if update_data.content:
+        row = await materialize.replace_row(db, mt, row["id"], update_data.content)
+        await db.commit()
+        rows_changed(mt.class_id)
+        _emit_row("replace", row, row["content"])
+    return row
+
+async def patch_data_batch(db: AsyncSession, patches: list[DataPatch], chunk_size: int | None = None) -> dict:
+    """
+    Aplica merge-patches a muchas filas: un UPDATE ... FROM (VALUES ...) por
+    bloque, en una sola transacción. Devuelve los ids que no existen.
+    """
+    # Varios parches al mismo id se combinan en orden (en un mismo UPDATE sólo se aplicaría uno)
+    merged: dict = {}
+    for patch in patches:
+        merged.setdefault(patch.id, {}).update(patch.content)
+    chunk_size = chunk_size or config.PATCH_CHUNK_SIZE
+    items = list(merged.items())
+    updated = set()
+    try:
+        for i in range(0, len(items), chunk_size):
+            rows = values(
+                column("id", UUID(as_uuid=True)), column("patch", JSONB), name="patch_rows"
+            ).data(items[i:i + chunk_size])
+            result = await db.execute(
+                update(Data)
+                .where(Data.id == rows.c.id)
+                .values(content=query.merge_patch(Data.content, rows.c.patch))
+                .returning(Data.id)
+                .execution_options(synchronize_session=False)
+            )
+            updated.update(result.scalars().all())
+        missing = {data_id: patch for data_id, patch in merged.items() if data_id not in updated}
+        if missing:
+            for mt in await _materialized_tables(db):
+                updated |= await materialize.patch_rows(db, mt, missing)
+                missing = {data_id: patch for data_id, patch in missing.items() if data_id not in updated}
+                if not missing:
+                    break
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al actualizar datos: {str(e)}")
+    if updated:
+        # Los parches no indican la clase: se invalidan las agregaciones de todas
+        rows_changed()
+    if len(updated) <= config.CHANGEFEED_MAX_IDS:
+        for data_id in updated:
+            changefeed.emit("data", "update", id=data_id, diff=merged[data_id])
+    elif updated:
+        changefeed.emit("data", "update", ids=updated, count=len(updated))
+    return {
+        "updated": len(updated),
+        "missing": [str(data_id) for data_id in merged if data_id not in updated],
+    }
+
+async def update_data_where(db: AsyncSession, class_id: str, changes: dict, filters: list | None = None) -> int:
+    """
+    Asigna valores a atributos en todas las filas de la clase que cumplen los
+    filtros, con un único UPDATE (las filas no pasan por Python). Las filas
+    que ya tienen esos valores no se reescriben.
+    """
+    await allow_long_statements(db)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No hay atributos que actualizar")
+    attributes = await get_attributes_by_class(db, class_id)
+    types = {a.name: a.data_type for a in attributes}
+    unknown = [key for key in changes if key not in types]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Atributos no válidos: {', '.join(unknown)}")
+
+    mt = await get_materialized_table(db, class_id)
+    if mt is not None:
+        try:
+            updated = await materialize.update_where(db, mt, changes, data_filter_conditions(filters, types, mt))
+            await db.commit()
+        except HTTPException:
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error al actualizar datos: {str(e)}")
+        if updated:
+            rows_changed(class_id)
+            changefeed.emit("data", "update", class_id=class_id, diff=changes, count=updated)
+        return updated
+
+    assigned = {key: value for key, value in changes.items() if value is not None}
+    removed = [key for key, value in changes.items() if value is None]
+    would_change = ~Data.content.contains(assigned)
+    if removed:
+        would_change = would_change | Data.content.has_any(array(removed))
+
+    stmt = (
+        update(Data)
+        .where(query.class_scope(class_id), would_change, *data_filter_conditions(filters, types))
+        .values(content=query.merge_patch(Data.content, literal(changes, JSONB)))
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        result = await db.execute(stmt)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al actualizar datos: {str(e)}")
+    if result.rowcount:
+        rows_changed(class_id)
+        # Sin ids: el cliente vuelve a pedir las filas de la clase que tenga cargadas
+        changefeed.emit("data", "update", class_id=class_id, diff=changes, count=result.rowcount)
+    return result.rowcount
+
+async def get_data_by_class(
+    db: AsyncSession,
+    class_id: str,
+    limit: int = 100,
+    cursor: str | None = None,
+    sort: str | None = None,
+    order: str = "asc",
+    count: str = "none",
+    filters: list | None = None,
+    render: str = "model",
+):
+    """
+    Obtiene una página de datos de una clase (paginación por cursor y filtros).
+    Con render="db" cada item es el texto JSON de la fila, construido en PostgreSQL.
+    """
+    descending = order == "desc"
+    sort_expr = None
+    data_type = None
+    types = {}
+    mt = await get_materialized_table(db, class_id)
+    if sort or filters:
+        attributes = await get_attributes_by_class(db, class_id)
+        types = {a.name: a.data_type for a in attributes}
+    if sort:
+        data_type = types.get(sort)
+        if data_type is None:
+            raise HTTPException(status_code=400, detail=f"Atributo de orden no válido: {sort}")
+        sort_expr = mt.column(sort) if mt is not None else query.typed_value(sort, data_type)
+
+    if mt is not None:
+        id_column = mt.id
+        stmt = select(*mt.row_columns())
+    else:
+        id_column = Data.id
+        stmt = select(Data.id, Data.class_id, Data.content).where(query.class_scope(class_id))
+    if render == "db":
+        stmt = stmt.with_only_columns(id_column.label("id"), query.row_json(*stmt.selected_columns))
+    if sort_expr is not None:
+        stmt = stmt.add_columns(sort_expr.label("sort_value"))
+    conditions = data_filter_conditions(filters, types, mt)
+    for condition in conditions:
+        stmt = stmt.where(condition)
+    if cursor:
+        sort_value, last_id = query.decode_cursor(cursor)
+        if data_type is not None and sort_value is not None:
+            sort_value = mt.coerce(sort, sort_value) if mt is not None else query.coerce_value(sort_value, data_type)
+        stmt = stmt.where(query.keyset_condition(sort_expr, sort_value, last_id, descending, id_column))
+    # Se pide una fila extra para saber si hay página siguiente sin un COUNT
+    stmt = stmt.order_by(*query.order_by_clause(sort_expr, descending, id_column)).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if render == "db":
+        items = [row.json for row in rows]
+    else:
+        items = [{"id": row.id, "class_id": row.class_id, "content": row.content} for row in rows]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = query.encode_cursor(last.sort_value if sort_expr is not None else None, last.id)
+
+    # Con los mismos filtros que la página
+    total = None
+    if count == "exact":
+        total = await count_data_by_class(db, class_id, conditions)
+    elif count == "estimate":
+        total = await estimate_data_by_class(db, class_id, conditions)
+
+    return {"items": items, "next_cursor": next_cursor, "total_estimate": total}
+
+def data_filter_conditions(filters: list | None, types: dict, mt=None) -> list:
+    """ Convierte los DataFilter recibidos en condiciones SQL según Attribute.data_type """
+    conditions = []
+    for f in filters or []:
+        data_type = types.get(f.key)
+        if data_type is None:
+            raise HTTPException(status_code=400, detail=f"Atributo de filtro no válido: {f.key}")
+        if mt is not None:
+            conditions.append(mt.filter_condition(f.key, f.op, f.value))
+        else:
+            conditions.append(query.filter_condition(f.key, f.op, f.value, data_type))
+    return conditions
+
+def _class_rows(class_id, mt, conditions: list | None = None):
+    """ SELECT 1 sobre las filas de una clase que cumplen las condiciones """
+    if mt is not None:
+        stmt = select(literal_column("1")).select_from(mt.table)
+    else:
+        stmt = select(literal_column("1")).select_from(Data).where(query.class_scope(class_id))
+    return stmt.where(*conditions) if conditions else stmt
+
+async def count_data_by_class(db: AsyncSession, class_id: str, conditions: list | None = None):
+    """ Cuenta exacta de filas de una clase (o de las que cumplen data_filter_conditions) """
+    mt = await get_materialized_table(db, class_id)
+    rows = _class_rows(class_id, mt, conditions).subquery()
+    return (await db.execute(select(func.count()).select_from(rows))).scalar_one()
+
+async def estimate_data_by_class(db: AsyncSession, class_id: str, conditions: list | None = None):
+    """ Estimación del planner (EXPLAIN) del número de filas de una clase, sin recorrerlas """
+    mt = await get_materialized_table(db, class_id)
+    plan = (await db.execute(query.Explain(_class_rows(class_id, mt, conditions)))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+async def rewrite_content_key(
+    db: AsyncSession,
+    class_id,
+    old_name: str,
+    new_name: str | None = None,
+    after_id=None,
+    chunk_size: int | None = None,
+) -> tuple[int, int, uuid.UUID | None]:
+    """
+    Un bloque de la reescritura de content tras renombrar (new_name) o
+    eliminar (new_name=None) un atributo: recorre las siguientes chunk_size
+    filas de la clase en orden de id y reescribe sólo las que tienen la clave.
+    No confirma la transacción. Devuelve (filas recorridas, filas reescritas, último id).
+    """
+    chunk_size = chunk_size or config.REWRITE_CHUNK_SIZE
+    old_key = query.inline(old_name)
+    content = Data.content.op("-", return_type=JSONB)(old_key)
+    if new_name is not None:
+        # A la derecha lo que ya hay: un valor escrito con el nombre nuevo tras renombrar no se pisa
+        content = func.jsonb_build_object(
+            query.inline(new_name), Data.content.op("->", return_type=JSONB)(old_key)
+        ).op("||", return_type=JSONB)(content)
+    batch = select(Data.id).where(query.class_scope(class_id))
+    if after_id is not None:
+        batch = batch.where(Data.id > after_id)
+    batch = batch.order_by(Data.id).limit(chunk_size).cte("batch")
+    rewritten = (
+        update(Data)
+        .where(Data.id == batch.c.id, Data.content.has_key(old_key))
+        .values(content=content)
+        .returning(Data.id)
+        .cte("rewritten")
+    )
+    scanned, last_id, count = (await db.execute(select(
+        select(func.count()).select_from(batch).scalar_subquery(),
+        select(batch.c.id).order_by(batch.c.id.desc()).limit(1).scalar_subquery(),
+        select(func.count()).select_from(rewritten).scalar_subquery(),
+    ))).one()
+    return scanned, count, last_id
+
+# ✅ Agregaciones sobre los datos de una clase
+
+# Funciones que sólo tienen sentido sobre valores numéricos u ordenables
+SUM_FUNCTIONS = {"sum": func.sum, "avg": func.avg}
+ORDER_FUNCTIONS = {"min": func.min, "max": func.max}
+UNORDERED_TYPES = {"boolean", "json", "uuid"}
+# Longitud del prefijo ISO (fechas en content) y formato (columnas date) de cada bucket
+DATE_BUCKETS = {"year": (4, "YYYY"), "month": (7, "YYYY-MM"), "day": (10, "YYYY-MM-DD")}
+
+def _plain(value):
+    """ Valor de una agregación apto para JSON (y para guardarlo en caché) """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (date, uuid.UUID)):
+        return str(value)
+    return value
+
+def _aggregate_value(key: str, types: dict, mt):
+    data_type = types.get(key)
+    if data_type is None:
+        raise HTTPException(status_code=400, detail=f"Atributo de agregación no válido: {key}")
+    expr = mt.column(key) if mt is not None else query.typed_value(key, data_type)
+    return expr, data_type
+
+def _aggregate_group(group, types: dict, mt):
+    expr, data_type = _aggregate_value(group.key, types, mt)
+    if group.bucket is None:
+        return expr
+    if data_type != "date":
+        raise HTTPException(status_code=400, detail=f"El bucket {group.bucket} requiere un atributo date ({group.key})")
+    length, pattern = DATE_BUCKETS[group.bucket]
+    if mt is not None:
+        return func.to_char(expr, query.inline(pattern))
+    return func.left(expr, literal_column(str(length)))
+
+def _aggregate_metric(metric, types: dict, mt):
+    if metric.key is None:
+        if metric.fn != "count":
+            raise HTTPException(status_code=400, detail=f"La función {metric.fn} requiere un atributo")
+        return func.count()
+    expr, data_type = _aggregate_value(metric.key, types, mt)
+    if metric.fn == "count":
+        return func.count(expr)
+    if metric.fn == "count_distinct":
+        return func.count(expr.distinct())
+    if metric.fn in SUM_FUNCTIONS:
+        if data_type not in query.NUMERIC_TYPES:
+            raise HTTPException(status_code=400, detail=f"{metric.fn} requiere un atributo numérico ({metric.key})")
+        return SUM_FUNCTIONS[metric.fn](expr)
+    if data_type in UNORDERED_TYPES:
+        raise HTTPException(status_code=400, detail=f"{metric.fn} no admite atributos {data_type} ({metric.key})")
+    return ORDER_FUNCTIONS[metric.fn](expr)
+
+async def aggregate_data(db: AsyncSession, class_id: str, spec: DataAggregate) -> dict:
+    """
+    Agrupa y resume las filas de una clase en PostgreSQL (GROUP BY sobre los
+    valores convertidos según Attribute.data_type). Las de clases grandes se
+    guardan en caché hasta la siguiente escritura de la clase.
+    """
+    await allow_long_statements(db)
+    mt = await get_materialized_table(db, class_id)
+    types = {a.name: a.data_type for a in await get_attributes_by_class(db, class_id)}
+    groups = [(group.key, _aggregate_group(group, types, mt)) for group in spec.group_by]
+    metrics = [
+        (metric.name or (metric.fn if metric.key is None else f"{metric.fn}_{metric.key}"), _aggregate_metric(metric, types, mt))
+        for metric in spec.metrics
+    ]
+    names = [name for name, _ in groups + metrics]
+    if len(set(names)) < len(names):
+        raise HTTPException(status_code=400, detail="Los grupos y métricas deben tener nombres distintos")
+    if not metrics:
+        raise HTTPException(status_code=400, detail="Se requiere al menos una métrica")
+
+    # Etiquetas posicionales: los nombres de atributo pueden ser cualquier texto
+    group_labels = [expr.label(f"g{i}") for i, (_, expr) in enumerate(groups)]
+    metric_labels = [expr.label(f"m{i}") for i, (_, expr) in enumerate(metrics)]
+    stmt = select(*group_labels, *metric_labels)
+    if mt is not None:
+        stmt = stmt.select_from(mt.table)
+    else:
+        stmt = stmt.select_from(Data).where(query.class_scope(class_id))
+    for condition in data_filter_conditions(spec.filters, types, mt):
+        stmt = stmt.where(condition)
+    descending = spec.order == "desc"
+    order = []
+    if spec.sort is not None:
+        metric_names = [name for name, _ in metrics]
+        if spec.sort not in metric_names:
+            raise HTTPException(status_code=400, detail=f"Métrica de orden no válida: {spec.sort}")
+        label = metric_labels[metric_names.index(spec.sort)]
+        order.append((label.desc() if descending else label.asc()).nulls_last())
+    order += [(label.desc() if descending else label.asc()).nulls_last() for label in group_labels]
+    if group_labels:
+        # Un grupo extra para saber si la respuesta está truncada
+        stmt = stmt.group_by(*group_labels).order_by(*order).limit(spec.limit + 1)
+
+    async def load(db):
+        rows = (await db.execute(stmt)).all()
+        return {
+            "groups": [dict(zip(names, map(_plain, row))) for row in rows[:spec.limit]],
+            "truncated": len(rows) > spec.limit,
+        }
+
+    if await estimate_data_by_class(db, class_id) < config.AGGREGATE_CACHE_MIN_ROWS:
+        return await load(db)
+    # Con la versión del modelo: un cambio de atributos deja obsoletas las anteriores
+    key = (*aggregates_key(class_id), str(model_version.value), spec.model_dump_json())
+    return await _cached(db, key, load, config.AGGREGATE_CACHE_TTL_SECONDS)
+
+# ✅ Recorrido de las filas a lo largo de las conexiones
+
+def _traversal_edges(connections: list, direction: str) -> list:
+    """ (clase origen, atributo origen, clase destino, atributo destino, conexión) de las conexiones con unión """
+    edges = []
+    for c in connections:
+        if c.source_attribute is None or c.target_attribute is None:
+            continue
+        if direction in ("out", "both"):
+            edges.append((c.source_class, c.source_attribute, c.target_class, c.target_attribute, c.id))
+        if direction in ("in", "both") and (c.source_class, c.source_attribute) != (c.target_class, c.target_attribute):
+            edges.append((c.target_class, c.target_attribute, c.source_class, c.source_attribute, c.id))
+    return edges
+
+def _reachable_edges(edges: list, start, max_depth: int) -> list:
+    """ Sólo las aristas que se pueden recorrer a menos de max_depth saltos de la clase de partida """
+    depth = {start: 0}
+    frontier = [start]
+    for level in range(max_depth):
+        frontier = [edge[2] for edge in edges if edge[0] in frontier and edge[2] not in depth]
+        for class_id in frontier:
+            depth[class_id] = level + 1
+    return [edge for edge in edges if edge[0] in depth and depth[edge[0]] < max_depth]
+
+def _join_condition(walk, source: tuple, target: tuple, mt=None):
+    """
+    content[origen] = content[destino]. Si ambos atributos son del mismo tipo
+    indexado se comparan los valores convertidos (typed_value, con su índice
+    por atributo); si no, como texto (content->>'key', índice text_pattern_ops).
+    """
+    (source_key, source_type), (target_key, target_type) = source, target
+    typed = source_type == target_type and source_type in query.TYPED_INDEX_TYPES
+    if typed:
+        value = query.typed_value(source_key, source_type, walk.c.content)
+    else:
+        value = query.content_text(source_key, walk.c.content)
+    if mt is not None:
+        column = mt.column(target_key)
+        # En content las fechas son texto ISO
+        return (column if typed and source_type != "date" else cast(column, Text)) == value
+    if typed:
+        return query.typed_value(target_key, target_type) == value
+    return query.content_text(target_key) == value
+
+async def traverse_data(db: AsyncSession, class_id: str, spec: DataTraversal) -> dict:
+    """
+    Filas de las clases conectadas con las filas de partida (las de class_id
+    que cumplen los filtros), siguiendo las conexiones con atributos de unión
+    hasta max_depth saltos. Una sola sentencia: un CTE recursivo sobre las
+    filas en el que cada arista es una rama LATERAL con la clase y la clave
+    como literales, para que el planner use los índices parciales de la clase.
+    Cada fila aparece una vez, a la menor profundidad a la que se alcanza.
+    """
+    await allow_long_statements(db)
+    try:
+        start = uuid.UUID(str(class_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Identificador de clase no válido")
+    edges = _reachable_edges(_traversal_edges(await get_connections(db), spec.direction), start, spec.max_depth)
+    tables = {}
+    attributes = {}
+    for class_uuid in {start} | {edge[2] for edge in edges}:
+        tables[class_uuid] = await get_materialized_table(db, class_uuid)
+        attributes.update({
+            attribute.id: (attribute.name, attribute.data_type)
+            for attribute in await get_attributes_by_class(db, class_uuid)
+        })
+
+    uuid_type = UUID(as_uuid=True)
+    mt = tables[start]
+    types = {a.name: a.data_type for a in await get_attributes_by_class(db, start)}
+    conditions = data_filter_conditions(spec.filters, types, mt)
+    if mt is not None:
+        rows = select(*mt.row_columns()).where(*conditions)
+    else:
+        rows = select(Data.id, Data.class_id, Data.content).where(query.class_scope(start), *conditions)
+    rows = rows.order_by(rows.selected_columns.id).limit(spec.start_limit).subquery("start_rows")
+    walk = select(
+        rows.c.id,
+        rows.c.class_id,
+        rows.c.content,
+        literal_column("0").label("depth"),
+        array([rows.c.id]).label("path"),
+        cast(None, uuid_type).label("parent_id"),
+        cast(None, uuid_type).label("connection_id"),
+    ).cte("walk", recursive=bool(edges))
+
+    if edges:
+        w = walk.alias("w")
+        branches = []
+        for source_class, source_attribute, target_class, target_attribute, connection_id in edges:
+            target_mt = tables[target_class]
+            condition = _join_condition(w, attributes[source_attribute], attributes[target_attribute], target_mt)
+            branch = select(*target_mt.row_columns()) if target_mt is not None else (
+                select(Data.id, Data.class_id, Data.content).where(query.class_scope(target_class))
+            )
+            branches.append(
+                branch.add_columns(literal(connection_id, uuid_type).label("connection_id"))
+                .where(w.c.class_id == literal(source_class, uuid_type), condition)
+            )
+        step = union_all(*branches).lateral("step")
+        walk = walk.union_all(
+            select(
+                step.c.id, step.c.class_id, step.c.content, w.c.depth + literal_column("1"),
+                func.array_append(w.c.path, step.c.id), w.c.id, step.c.connection_id,
+            )
+            .select_from(w.join(step, true()))
+            .where(w.c.depth < spec.max_depth, not_(step.c.id == any_(w.c.path)))
+        )
+
+    first = (
+        select(walk.c.id, walk.c.class_id, walk.c.content, walk.c.depth, walk.c.parent_id, walk.c.connection_id)
+        .distinct(walk.c.id)
+        .order_by(walk.c.id, walk.c.depth)
+        .subquery("first_visit")
+    )
+    stmt = select(first)
+    if spec.classes:
+        stmt = stmt.where(first.c.class_id.in_(spec.classes))
+    # Una fila extra para saber si la respuesta está truncada
+    stmt = stmt.order_by(first.c.depth, first.c.class_id, first.c.id).limit(spec.limit + 1)
+    result = (await db.execute(stmt)).mappings().all()
+    return {"items": result[:spec.limit], "truncated": len(result) > spec.limit}
 
 async def delete_data(db: AsyncSession, data_id: str):
-    """ Elimina una entrada de datos """
-    result = await db.execute(select(Data).where(Data.id == data_id))
+    """ Elimina una entrada de datos (DELETE ... RETURNING, sin cargarla antes) """
+    result = await db.execute(
+        delete(Data).where(Data.id == data_id).returning(Data)
+        .execution_options(synchronize_session=False)
+    )
     data_instance = result.scalars().first()
     if not data_instance:
-        raise HTTPException(status_code=404, detail="Entrada de datos no encontrada")
-    await db.delete(data_instance)
+        for mt in await _materialized_tables(db):
+            data_instance = await materialize.delete_row(db, mt, data_id)
+            if data_instance:
+                break
+        else:
+            raise HTTPException(status_code=404, detail="Entrada de datos no encontrada")
     await db.commit()
+    data_changed(_field(data_instance, "class_id"))
+    _emit_row("delete", data_instance)
     return data_instance
 
+async def delete_data_batch(db: AsyncSession, ids: list) -> int:
+    """ Elimina varias entradas con un único DELETE ... WHERE id = ANY(:ids) y devuelve las borradas """
+    try:
+        data_ids = [uuid.UUID(str(data_id)) for data_id in ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Identificador de datos no válido")
+    if not data_ids:
+        return 0
+    try:
+        result = await db.execute(
+            delete(Data)
+            .where(Data.id == any_(literal(data_ids, ARRAY(UUID(as_uuid=True)))))
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.rowcount
+        if deleted < len(data_ids):
+            for mt in await _materialized_tables(db):
+                deleted += await materialize.delete_rows(db, mt, data_ids)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    data_changed()
+    if deleted:
+        changefeed.emit("data", "delete", ids=data_ids, count=deleted)
+    return deleted
+
+async def purge_class_data(
+    db: AsyncSession,
+    class_id: str,
+    filters: list | None = None,
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Borra las filas de una clase (o sólo las que cumplen los filtros) en bloques
+    de DELETE_CHUNK_SIZE, con un commit por bloque para no retener bloqueos
+    largos. Ante un error quedan borrados los bloques ya confirmados.
+    """
+    await allow_long_statements(db)
+    types = {}
+    if filters:
+        types = {a.name: a.data_type for a in await get_attributes_by_class(db, class_id)}
+    mt = await get_materialized_table(db, class_id)
+    if mt is not None:
+        id_column = mt.id
+        conditions = data_filter_conditions(filters, types, mt)
+    else:
+        id_column = Data.id
+        conditions = [query.class_scope(class_id), *data_filter_conditions(filters, types)]
+    deleted = await _purge_rows(db, id_column, conditions, chunk_size)
+    if deleted:
+        data_changed(class_id)
+        changefeed.emit("data", "delete", class_id=class_id, count=deleted)
+    return deleted
+
+async def purge_jsonb_rows(db: AsyncSession, class_id) -> int:
+    """
+    Borra por bloques las filas de la clase que quedan en data (fin de una
+    materialización). Las filas siguen existiendo en la tabla: sin lápidas.
+    """
+    return await _purge_rows(db, Data.id, [query.class_scope(class_id)], skip_tombstones=True)
+
+async def _purge_rows(
+    db: AsyncSession,
+    id_column,
+    conditions: list,
+    chunk_size: int | None = None,
+    skip_tombstones: bool = False,
+) -> int:
+    chunk_size = chunk_size or config.DELETE_CHUNK_SIZE
+    table = id_column.table
+    deleted = 0
+    try:
+        while True:
+            if skip_tombstones:
+                await db.execute(text(sync.SKIP_TOMBSTONES))
+            # Recorre el índice por id en orden: cada bloque es un rango contiguo
+            chunk = select(id_column).where(*conditions).order_by(id_column).limit(chunk_size)
+            result = await db.execute(
+                delete(table).where(id_column.in_(chunk.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < chunk_size:
+                break
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al eliminar datos tras {deleted} registros: {str(e)}",
+        )
+    return deleted
+
 # ✅ CRUD para Property
 
 async def create_property(db: AsyncSession, property_data: PropertyCreate):
@@ -159,8 +1090,12 @@ async def create_property(db: AsyncSession, property_data: PropertyCreate):
         value=property_data.value,
         attribute_id=property_data.attribute_id
     )
+    key_change = None
+    if _is_natural_key(new_property):
+        key_change = await _natural_key_change(db, new_property.attribute_id, True)
     db.add(new_property)
     await db.commit()
+    await _property_changed(db, new_property, "create", key_change)
     await db.refresh(new_property)
     return new_property
 
@@ -170,18 +1105,40 @@ async def update_property(db: AsyncSession, property_id: str, update_data: Prope
     property_instance = result.scalars().first()
     if not property_instance:
         raise HTTPException(status_code=404, detail="Propiedad no encontrada")
+    was_key = _is_natural_key(property_instance)
     if update_data.name:
         property_instance.name = update_data.name
     if update_data.value:
         property_instance.value = update_data.value
+    key_change = None
+    if was_key != _is_natural_key(property_instance):
+        key_change = await _natural_key_change(db, property_instance.attribute_id, not was_key)
     await db.commit()
+    await _property_changed(db, property_instance, "update", key_change)
     await db.refresh(property_instance)
     return property_instance
 
 async def get_properties_by_attribute(db: AsyncSession, attribute_id: str):
     """ Obtiene las propiedades de un atributo """
-    result = await db.execute(select(Property).where(Property.attribute_id == attribute_id))
-    return result.scalars().all()
+    async def load(db):
+        result = await db.execute(select(Property).where(Property.attribute_id == attribute_id))
+        return [PropertySchema.model_validate(prop) for prop in result.scalars().all()]
+    return await _cached(db, properties_key(attribute_id), load)
+
+async def _property_changed(db: AsyncSession, property_instance, op: str, key_change: tuple | None = None):
+    """ Las propiedades también van anidadas en los atributos y en el listado de clases """
+    if key_change is not None:
+        indexes.schedule(indexes.rebuild_natural_key_index(*key_change))
+    attribute_id = property_instance.attribute_id
+    keys = [CLASSES_KEY, properties_key(attribute_id)]
+    class_id = await _attribute_class_id(db, attribute_id)
+    if class_id is not None:
+        keys.append(attributes_key(class_id))
+    metadata_changed(*keys)
+    diff = None
+    if op != "delete":
+        diff = {"attribute_id": str(attribute_id), "name": property_instance.name, "value": property_instance.value}
+    changefeed.emit("property", op, id=property_instance.id, class_id=class_id, diff=diff)
 
 async def delete_property(db: AsyncSession, property_id: str):
     """ Elimina una propiedad """
@@ -189,25 +1146,65 @@ async def delete_property(db: AsyncSession, property_id: str):
     property_instance = result.scalars().first()
     if not property_instance:
         raise HTTPException(status_code=404, detail="Propiedad no encontrada")
+    key_change = None
+    if _is_natural_key(property_instance):
+        key_change = await _natural_key_change(db, property_instance.attribute_id, False)
     await db.delete(property_instance)
     await db.commit()
+    await _property_changed(db, property_instance, "delete", key_change)
     return property_instance
 
 
 # ✅ CRUD para Connetion
 
 async def get_connections(db: AsyncSession):
-    result = await db.execute(text("SELECT * FROM connections"))
-    return result.fetchall()
+    async def load(db):
+        result = await db.execute(text("SELECT * FROM connections"))
+        return [ConnectionSchema.model_validate(dict(row._mapping)) for row in result.fetchall()]
+    return await _cached(db, CONNECTIONS_KEY, load)
 
 async def get_class(db: AsyncSession, class_id: str):
-    return await db.get(ClassModel, class_id)
+    class_instance = await db.get(ClassModel, class_id)
+    return None if class_instance is None or class_instance.deleting else class_instance
+
+async def _check_join_attributes(db: AsyncSession, source_class, target_class, source_attribute, target_attribute):
+    """ Los atributos de unión van por parejas y cada uno pertenece a su clase """
+    if (source_attribute is None) != (target_attribute is None):
+        raise HTTPException(status_code=400, detail="Indique el atributo de unión de ambas clases o de ninguna")
+    if source_attribute is None:
+        return
+    for attribute_id, class_id in ((source_attribute, source_class), (target_attribute, target_class)):
+        if await _attribute_class_id(db, attribute_id) != class_id:
+            raise HTTPException(status_code=400, detail=f"El atributo {attribute_id} no pertenece a la clase {class_id}")
 
 async def create_connection(db: AsyncSession, connection_data: ConnectionCreate):
+    await _check_join_attributes(
+        db, connection_data.source_class, connection_data.target_class,
+        connection_data.source_attribute, connection_data.target_attribute,
+    )
     db_connection = Connection(**connection_data.dict())
     db.add(db_connection)
     await db.commit()
+    metadata_changed(CONNECTIONS_KEY)
     await db.refresh(db_connection)
+    changefeed.emit("connection", "create", id=db_connection.id, diff=connection_data.model_dump(mode="json"))
+    return db_connection
+
+async def update_connection(db: AsyncSession, connection_id: str, update_data: ConnectionUpdate):
+    """ Asigna (o quita, con null) los atributos de unión de una conexión """
+    db_connection = await db.get(Connection, connection_id)
+    if not db_connection:
+        raise HTTPException(status_code=404, detail="Conexión no encontrada")
+    await _check_join_attributes(
+        db, db_connection.source_class, db_connection.target_class,
+        update_data.source_attribute, update_data.target_attribute,
+    )
+    db_connection.source_attribute = update_data.source_attribute
+    db_connection.target_attribute = update_data.target_attribute
+    await db.commit()
+    metadata_changed(CONNECTIONS_KEY)
+    await db.refresh(db_connection)
+    changefeed.emit("connection", "update", id=db_connection.id, diff=update_data.model_dump(mode="json"))
     return db_connection
 
 async def delete_connection(db: AsyncSession, connection_id: str):
@@ -216,16 +1213,205 @@ async def delete_connection(db: AsyncSession, connection_id: str):
         return {"error": "Connection not found"}
     await db.delete(db_connection)
     await db.commit()
+    metadata_changed(CONNECTIONS_KEY)
+    changefeed.emit("connection", "delete", id=connection_id)
     return {"message": "Connection deleted"}
 
-    # Ejecutar la consulta en el contexto asíncrono
-    await db.execute(text(create_table_query))
-    await db.commit()
-    return table_name
+async def insert_data_rows(db: AsyncSession, class_id, contents: list[dict]):
+    """ Inserta varios content de una misma clase con COPY y confirma la transacción """
+    if not contents:
+        return 0
+    mt = await get_materialized_table(db, class_id)
+    if mt is not None:
+        try:
+            inserted = await materialize.copy_rows(db, mt, contents)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error al crear datos (0 registros confirmados): {str(e)}")
+        data_changed(class_id)
+        changefeed.emit("data", "create", class_id=class_id, count=inserted)
+        return inserted
+    stats = await bulk.copy_data_rows(db, [(class_id, content) for content in contents])
+    data_changed(class_id)
+    changefeed.emit("data", "create", class_id=class_id, count=stats["inserted"])
+    return stats["inserted"]
+
+async def create_data_batch(
+    db: AsyncSession,
+    data_list: list[DataCreate],
+    chunk_size: int | None = None,
+    atomic: bool = True,
+):
+    """
+    Crea múltiples entradas de datos con COPY binario, por bloques. Con
+    atomic=True las filas de clases materializadas se copian a su tabla dentro
+    de la misma transacción que data; con atomic=False se confirman antes.
+    """
+    rows = []
+    materialized = {}
+    tables = {}
+    for data in data_list:
+        if data.class_id not in tables:
+            tables[data.class_id] = await get_materialized_table(db, data.class_id)
+        mt = tables[data.class_id]
+        if mt is None:
+            rows.append((data.class_id, data.content))
+        else:
+            materialized.setdefault(mt, []).append(data.content)
+    copied = 0
+    try:
+        for mt, contents in materialized.items():
+            copied += await materialize.copy_rows(db, mt, contents)
+        if copied and not atomic:
+            # Puede que no haya filas de data: copy_data_rows no haría ningún commit
+            await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al crear datos (0 registros confirmados): {str(e)}")
+    try:
+        stats = await bulk.copy_data_rows(db, rows, chunk_size=chunk_size, atomic=atomic)
+    except HTTPException:
+        # Con atomic=False quedan confirmados los bloques anteriores al error
+        if not atomic:
+            data_changed(*tables)
+        raise
+    stats["inserted"] += copied
+    data_changed(*tables)
+    for class_id in tables:
+        changefeed.emit("data", "create", class_id=class_id)
+    return stats
+
+# ✅ Clave natural e importación con upsert
+
+NATURAL_KEY_PROPERTY = "natural_key"
+UPSERT_TABLE = "kinro_upsert"
+
+def _is_natural_key(prop) -> bool:
+    return prop.name == NATURAL_KEY_PROPERTY and str(prop.value).strip().lower() in coercion.TRUE_VALUES
+
+def natural_key_names(attributes) -> list[str]:
+    """ Nombres de los atributos marcados con la propiedad natural_key, en orden estable """
+    return sorted(
+        attribute.name for attribute in attributes
+        if any(_is_natural_key(prop) for prop in attribute.properties or [])
+    )
 
-async def create_data_batch(db: AsyncSession, data_list: list[DataCreate]):
-    """ Crea múltiples entradas de datos en una sola operación """
-    # Preparar los datos para la inserción masiva
+async def get_natural_key(db: AsyncSession, class_id) -> list[str]:
+    return natural_key_names(await get_attributes_by_class(db, str(class_id)))
+
+async def _natural_key_change(db: AsyncSession, attribute_id, is_key: bool) -> tuple | None:
+    """
+    Clave natural que resulta de marcar (o desmarcar) el atributo. Se valida
+    antes de confirmar: el índice único no se podría crear con filas repetidas.
+    Devuelve (class_id, nombres) si la clave cambia.
+    """
+    attribute = await get_attribute(db, attribute_id)
+    if attribute is None:
+        raise HTTPException(status_code=404, detail="Atributo no encontrado")
+    current = await get_natural_key(db, attribute.class_id)
+    names = set(current) - {attribute.name}
+    if is_key:
+        names.add(attribute.name)
+    names = sorted(names)
+    if names == current:
+        return None
+    if names:
+        key = [query.content_text(name) for name in names]
+        duplicate = (await db.execute(
+            select(*key)
+            .where(query.class_scope(attribute.class_id), *[expr.is_not(None) for expr in key])
+            .group_by(*key)
+            .having(func.count() > 1)
+            .limit(1)
+        )).first()
+        if duplicate is not None:
+            values = ", ".join(f"{name}={value!r}" for name, value in zip(names, duplicate))
+            raise HTTPException(
+                status_code=409,
+                detail=f"Hay filas repetidas para la clave natural ({values})",
+            )
+    return attribute.class_id, names
+
+def _staging_table():
+    return table(
+        UPSERT_TABLE,
+        column("ord"), column("id"), column("class_id"), column("content", JSONB),
+    )
+
+async def upsert_data_rows(db: AsyncSession, class_id, contents: list[dict], merge: bool = False) -> dict:
+    """
+    Inserta o actualiza las filas de una clase según su clave natural, en una
+    transacción: COPY a una tabla temporal y un único INSERT ... ON CONFLICT
+    DO UPDATE sobre el índice único de indexes.natural_key_index_ddl. Las
+    filas cuyo content no cambia no se reescriben (ni cambian de versión).
+    Con merge=True el content nuevo se aplica como merge-patch sobre el actual.
+    Si la clave se repite en el lote gana la última fila.
+    """
+    await allow_long_statements(db)
+    storage = await _writable_storage(db, class_id)
+    if storage == materialize.READY:
+        raise HTTPException(status_code=409, detail="La importación con clave natural no está disponible en clases materializadas")
+    names = await get_natural_key(db, class_id)
+    if not names:
+        raise HTTPException(status_code=400, detail="La clase no tiene atributos marcados como clave natural")
+    if not await indexes.natural_key_index_ready(db, class_id):
+        raise HTTPException(status_code=409, detail="El índice de la clave natural aún se está construyendo o no se pudo crear")
+
+    report = coercion.ErrorReport()
+    rows = []
+    for position, content in enumerate(contents):
+        missing = [name for name in names if content.get(name) in (None, "")]
+        if missing:
+            report.add([{"row": position, "column": missing[0], "value": content.get(missing[0]),
+                         "error": "Falta el valor de la clave natural"}], 1)
+        else:
+            rows.append((class_id, content))
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, **report.summary()}
+    if not rows:
+        return stats
+
+    staging = _staging_table()
+    key = [staging.c.content.op("->>", return_type=Text)(query.inline(name)) for name in names]
+    source = select(staging.c.id, staging.c.class_id, staging.c.content).distinct(*key).order_by(*key, staging.c.ord.desc())
+    statement = pg_insert(Data).from_select(["id", "class_id", "content"], source)
+    new_content = query.merge_patch(Data.content, statement.excluded.content) if merge else statement.excluded.content
+    upserted = statement.on_conflict_do_update(
+        # Entre paréntesis, como exige ON CONFLICT para las expresiones
+        index_elements=[query.content_text(name).self_group() for name in names],
+        index_where=query.class_scope(class_id),
+        set_={"content": new_content},
+        where=Data.content.is_distinct_from(new_content),
+    ).returning(literal_column("xmax = 0").label("inserted")).cte("upserted")
+    try:
+        await db.execute(text(
+            f"CREATE TEMP TABLE {UPSERT_TABLE} (ord bigint, id uuid, class_id uuid, content jsonb) ON COMMIT DROP"
+        ))
+        await bulk.copy_staging_rows(db, UPSERT_TABLE, rows)
+        distinct = (await db.execute(select(func.count()).select_from(source.subquery()))).scalar_one()
+        inserted, updated = (await db.execute(
+            select(func.count().filter(upserted.c.inserted), func.count().filter(not_(upserted.c.inserted)))
+        )).one()
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al importar datos (0 registros confirmados): {str(e)}")
+
+    data_changed(class_id)
+    if inserted:
+        changefeed.emit("data", "create", class_id=class_id, count=inserted)
+    if updated:
+        changefeed.emit("data", "update", class_id=class_id, count=updated)
+    stats.update(
+        inserted=inserted,
+        updated=updated,
+        unchanged=distinct - inserted - updated,
+        duplicates=len(rows) - distinct,
+    )
+    return stats
+
+async def create_data_batch_executemany(db: AsyncSession, data_list: list[DataCreate]):
+    """ Inserción con executemany (ruta anterior, se conserva para el benchmark) """
     mappings = [
         {
             "id": str(uuid.uuid4()),
@@ -234,9 +1420,7 @@ async def create_data_batch(db: AsyncSession, data_list: list[DataCreate]):
         }
         for data in data_list
     ]
-    print(len(mappings))
     try:
-        # Usar bulk_insert_mappings para insertar todos los registros de una vez
         await db.execute(
             Data.__table__.insert(),
             mappings
@@ -245,4 +1429,78 @@ async def create_data_batch(db: AsyncSession, data_list: list[DataCreate]):
         return len(mappings)
     except Exception as e:
         await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error al crear datos: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al crear datos: {str(e)}")
+
+# ✅ Sincronización incremental (ver sync.py)
+
+def _sync_sources(since: int, class_id, tables: list) -> list:
+    """ (clave de la respuesta, consulta, columna de versión) de cada origen de cambios """
+    data_stmt = select(Data.id, Data.class_id, Data.content, Data.row_version)
+    if class_id is not None:
+        data_stmt = data_stmt.where(query.class_scope(class_id))
+    sources = [
+        ("classes", select(
+            ClassModel.id, ClassModel.name, ClassModel.position_x, ClassModel.position_y, ClassModel.row_version,
+        ).where(LIVE_CLASS), ClassModel.row_version),
+        ("attributes", select(
+            Attribute.id, Attribute.class_id, Attribute.name, Attribute.data_type, Attribute.row_version,
+        ), Attribute.row_version),
+        ("properties", select(
+            Property.id, Property.attribute_id, Property.name, Property.value, Property.row_version,
+        ), Property.row_version),
+        ("connections", select(
+            Connection.id, Connection.source_class, Connection.target_class, Connection.relationship_type,
+            Connection.source_attribute, Connection.target_attribute, Connection.row_version,
+        ), Connection.row_version),
+        ("data", data_stmt, Data.row_version),
+    ]
+    for mt in tables:
+        sources.append(("data", select(*mt.row_columns(), mt.row_version.label("row_version")), mt.row_version))
+    if since:
+        tombstones = select(
+            Tombstone.entity, Tombstone.entity_id.label("id"), Tombstone.class_id, Tombstone.row_version,
+        )
+        if class_id is not None:
+            tombstones = tombstones.where(or_(Tombstone.entity != "data", Tombstone.class_id == class_id))
+        sources.append(("deleted", tombstones, Tombstone.row_version))
+    return sources
+
+async def get_changes_since(since: int, limit: int, class_id=None) -> dict:
+    """
+    Filas creadas o modificadas y lápidas con since < row_version <= versión
+    segura. Si algún origen tiene más de limit cambios, la respuesta se corta
+    en la menor versión alcanzada y has_more indica que hay que volver a pedir.
+    Con since=0 se devuelve todo (sin lápidas).
+    """
+    high = await sync.safe_version()
+    # En el primario: la réplica podría no haber llegado aún a la versión segura
+    async with AsyncSessionLocal() as db:
+        if since > high or (since and since < await sync.pruned_through(db)):
+            # Lápidas ya purgadas (o una base de datos restaurada): recarga completa
+            return {"version": high, "reset": True, "has_more": False}
+        if class_id is not None:
+            mt = await get_materialized_table(db, class_id)
+            tables = [mt] if mt is not None else []
+        else:
+            tables = await _materialized_tables(db)
+
+        fetched = []
+        version = high
+        for key, stmt, version_column in _sync_sources(since, class_id, tables):
+            stmt = (
+                stmt.where(version_column > since, version_column <= high)
+                .order_by(version_column)
+                .limit(limit + 1)
+            )
+            rows = (await db.execute(stmt)).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                version = min(version, rows[-1].row_version)
+            fetched.append((key, rows))
+
+    changes = {"version": version, "reset": False, "has_more": version < high}
+    for key in ("classes", "attributes", "properties", "connections", "data", "deleted"):
+        changes[key] = []
+    for key, rows in fetched:
+        changes[key].extend(dict(row._mapping) for row in rows if row.row_version <= version)
+    return changes
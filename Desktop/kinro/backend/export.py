@@ -0,0 +1,162 @@
+# backend/export.py
+import asyncio
+import csv
+import io
+import json
+import logging
+import queue
+import tempfile
+import threading
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from backend import crud, query, serialization
+from backend.database import ReadSessionLocal
+from backend.models import Data
+
+logger = logging.getLogger(__name__)
+
+# Filas por lote leídas del cursor del servidor
+EXPORT_BATCH_SIZE = 2000
+# Lotes leídos pendientes de escribir en el XLSX (los escribe un hilo)
+XLSX_QUEUE_BATCHES = 4
+# Tamaño de los bloques del XLSX enviados al cliente
+XLSX_CHUNK_SIZE = 64 * 1024
+# Por encima de este tamaño el XLSX temporal pasa de memoria a disco
+XLSX_SPOOL_SIZE = 8 * 1024 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# ✅ Lectura por lotes
+
+async def iter_content_batches(class_id: str):
+    """
+    Recorre el content de una clase con un cursor del servidor.
+    Abre su propia sesión (en la réplica de lectura si existe): la de get_db
+    se cierra antes de que termine el streaming.
+    """
+    async with ReadSessionLocal() as session:
+        mt = await crud.get_materialized_table(session, class_id)
+        if mt is not None:
+            stmt = select(mt.content_expression())
+        else:
+            stmt = select(Data.content).where(query.class_scope(class_id))
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield [row[0] for row in partition]
+
+def cell_value(value):
+    """ Valor plano para una celda: objetos y listas como JSON """
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+# ✅ Formatos
+
+async def stream_csv(class_id: str, columns: list[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM para que Excel detecte UTF-8 al abrir el CSV
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    async for batch in iter_content_batches(class_id):
+        writer.writerows([cell_value(content.get(col)) for col in columns] for content in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+async def stream_ndjson(class_id: str, columns: list[str]):
+    async for batch in iter_content_batches(class_id):
+        yield b"".join(
+            serialization.dumps_line({col: content.get(col) for col in columns})
+            for content in batch
+        )
+
+def _write_xlsx(batches: queue.Queue, cancelled: threading.Event, columns: list[str], output):
+    """
+    En un hilo: escribe las filas que llegan por batches (None al terminar)
+    en un libro write-only y lo guarda en output, salvo si se cancela.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Datos")
+    sheet.append(columns)
+    while (batch := batches.get()) is not None and not cancelled.is_set():
+        for content in batch:
+            sheet.append([cell_value(content.get(col)) for col in columns])
+    if cancelled.is_set():
+        _discard_sheet(sheet)
+    else:
+        workbook.save(output)
+
+def _discard_sheet(sheet):
+    """
+    Cierra la hoja sin generar el zip y borra su archivo temporal (save lo
+    haría). openpyxl no tiene una forma pública de descartarla: se usa
+    WorksheetWriter.cleanup de la versión fijada en pyproject (~3.1.5) y, si
+    otra versión no lo tiene, el archivo queda para el atexit de openpyxl.
+    """
+    sheet.close()
+    cleanup = getattr(getattr(sheet, "_writer", None), "cleanup", None)
+    if cleanup is None:
+        logger.warning("openpyxl no permite descartar la hoja: el archivo temporal se borrará al salir")
+        return
+    try:
+        cleanup()
+    except OSError:
+        logger.warning("No se pudo borrar el archivo temporal de la hoja XLSX", exc_info=True)
+
+async def _put_batch(batches: queue.Queue, batch, writer: asyncio.Future):
+    """ Espera sitio en la cola (contrapresión) sin quedarse bloqueado si el hilo ha fallado """
+    while not writer.done():
+        try:
+            await run_in_threadpool(batches.put, batch, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+async def stream_xlsx(class_id: str, columns: list[str]):
+    """
+    XLSX en modo write-only de openpyxl. El libro se construye en un hilo
+    (_write_xlsx), que recibe los lotes por una cola acotada: el event loop
+    sólo lee del cursor. El zip final sólo existe al cerrar el libro, así que
+    se envía al terminar, por bloques y desde un archivo temporal.
+    """
+    batches = queue.Queue(maxsize=XLSX_QUEUE_BATCHES)
+    cancelled = threading.Event()
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_SIZE) as output:
+        writer = asyncio.ensure_future(run_in_threadpool(_write_xlsx, batches, cancelled, columns, output))
+        try:
+            async for batch in iter_content_batches(class_id):
+                await _put_batch(batches, batch, writer)
+                if writer.done():
+                    break
+            await _put_batch(batches, None, writer)
+            await writer
+        except BaseException:
+            # Cliente desconectado o error al leer: el hilo termina sin guardar
+            cancelled.set()
+            try:
+                batches.put_nowait(None)
+            except queue.Full:
+                pass
+            raise
+        output.seek(0)
+        while chunk := await run_in_threadpool(output.read, XLSX_CHUNK_SIZE):
+            yield chunk
+
+STREAMERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "xlsx": stream_xlsx,
+}
@@ -0,0 +1,198 @@
+# backend/indexes.py
+import asyncio
+import logging
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from backend import query
+from backend.database import engine
+from backend.models import STORAGE_READY, Attribute, MaterializedClass
+
+logger = logging.getLogger(__name__)
+
+# Validez de un índice: NULL si no existe, false si CONCURRENTLY no terminó
+INDEX_VALID_SQL = "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+
+# Tareas en segundo plano: se guarda la referencia para que no las recoja el GC
+_pending_tasks: set = set()
+
+# ✅ Nombres y DDL de índices sobre data.content
+
+def attribute_index_name(attribute_id) -> str:
+    return f"ix_data_attr_{str(attribute_id).replace('-', '')}"
+
+def class_gin_index_name(class_id) -> str:
+    return f"ix_data_gin_{str(class_id).replace('-', '')}"
+
+def _sql(expression) -> str:
+    """ Renderiza una expresión de query.py tal cual la verá el planner """
+    compiled = expression.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    return str(compiled).replace("data.content", "content")
+
+def attribute_index_ddl(attribute) -> str | None:
+    """
+    Índice de expresión parcial (sólo filas de la clase) para un atributo.
+    La expresión es la misma que generan query.typed_value / query.content_text,
+    de lo contrario el planner no lo usaría.
+    """
+    name = attribute_index_name(attribute.id)
+    scope = f"class_id = '{attribute.class_id}'"
+    if attribute.data_type in query.TYPED_INDEX_TYPES:
+        expression = _sql(query.typed_value(attribute.name, attribute.data_type))
+        return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON data (({expression})) WHERE {scope}"
+    if attribute.data_type in query.TEXT_INDEX_TYPES:
+        expression = _sql(query.content_text(attribute.name))
+        return (
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON data (({expression}) text_pattern_ops) WHERE {scope}"
+        )
+    # json: la igualdad por contención ya la cubre el índice GIN de la clase
+    return None
+
+def class_gin_index_ddl(class_id) -> str:
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {class_gin_index_name(class_id)} "
+        f"ON data USING GIN (content jsonb_path_ops) WHERE class_id = '{class_id}'"
+    )
+
+def natural_key_index_name(class_id) -> str:
+    return f"ix_data_nk_{str(class_id).replace('-', '')}"
+
+def natural_key_index_ddl(class_id, names: list[str]) -> str:
+    """
+    Índice único parcial sobre los atributos clave natural de la clase. Las
+    expresiones son las de query.content_text, que usa crud.upsert_data_rows
+    en ON CONFLICT para que PostgreSQL infiera este índice.
+    """
+    expressions = ", ".join(f"({_sql(query.content_text(name))})" for name in names)
+    return (
+        f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {natural_key_index_name(class_id)} "
+        f"ON data ({expressions}) WHERE class_id = '{class_id}'"
+    )
+
+# ✅ Ejecución
+
+async def execute_ddl(*statements: str):
+    """ CREATE/DROP INDEX CONCURRENTLY no puede ir dentro de una transacción """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        # Construir un índice sobre una tabla grande supera DB_STATEMENT_TIMEOUT_MS
+        await conn.execute(text("SET statement_timeout = 0"))
+        try:
+            for statement in statements:
+                await conn.execute(text(statement))
+        finally:
+            await conn.execute(text("RESET statement_timeout"))
+
+def schedule(coro):
+    """ Lanza la construcción de índices en segundo plano sin bloquear la petición """
+    task = asyncio.create_task(coro)
+    _pending_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _pending_tasks.discard(t)
+        if not t.cancelled() and t.exception():
+            logger.error("Error al mantener índices de data.content", exc_info=t.exception())
+
+    task.add_done_callback(_done)
+    return task
+
+async def create_index(name: str, ddl: str):
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS da por bueno un índice inválido
+    (una construcción anterior que falló o se interrumpió), que el planner no
+    usa: se elimina y se vuelve a crear. Si la construcción falla, se elimina
+    el inválido que deja para que el siguiente intento la repita.
+    """
+    drop = f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+    async with engine.connect() as conn:
+        result = await conn.execute(text(INDEX_VALID_SQL), {"name": name})
+        valid = result.scalar_one_or_none()
+    if valid is False:
+        logger.warning(f"Índice inválido {name}: se vuelve a crear")
+        await execute_ddl(drop)
+    try:
+        await execute_ddl(ddl)
+    except Exception:
+        await execute_ddl(drop)
+        raise
+
+async def create_indexes(targets: list[tuple[str, str]]) -> list[str]:
+    """ Crea cada índice (nombre, DDL) por separado: un fallo no impide los demás. Devuelve los que fallaron """
+    failed = []
+    for name, ddl in targets:
+        try:
+            await create_index(name, ddl)
+        except Exception:
+            logger.exception(f"Error al crear el índice {name}")
+            failed.append(name)
+    return failed
+
+def _attribute_target(attribute) -> list[tuple[str, str]]:
+    ddl = attribute_index_ddl(attribute)
+    return [(attribute_index_name(attribute.id), ddl)] if ddl else []
+
+def _class_gin_target(class_id) -> tuple[str, str]:
+    return class_gin_index_name(class_id), class_gin_index_ddl(class_id)
+
+async def create_attribute_indexes(attribute) -> list[str]:
+    """ Crea (o repara) el índice GIN de la clase y el índice del atributo, de forma independiente """
+    failed = await create_indexes([_class_gin_target(attribute.class_id), *_attribute_target(attribute)])
+    if not failed:
+        logger.info(f"Índices creados para el atributo {attribute.name} ({attribute.id})")
+    return failed
+
+async def drop_attribute_indexes(attribute_id, class_id=None, remaining_attributes: int | None = None):
+    """ Elimina el índice del atributo y el GIN de la clase si ya no le quedan atributos """
+    statements = [f"DROP INDEX CONCURRENTLY IF EXISTS {attribute_index_name(attribute_id)}"]
+    if class_id is not None and remaining_attributes == 0:
+        statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS {class_gin_index_name(class_id)}")
+    await execute_ddl(*statements)
+
+async def drop_class_indexes(class_id, attribute_ids: list):
+    """ Índices parciales de una clase eliminada: los de sus atributos, el GIN y el de la clave natural """
+    statements = [f"DROP INDEX CONCURRENTLY IF EXISTS {attribute_index_name(a)}" for a in attribute_ids]
+    statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS {class_gin_index_name(class_id)}")
+    statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS {natural_key_index_name(class_id)}")
+    await execute_ddl(*statements)
+
+async def rebuild_natural_key_index(class_id, names: list[str]):
+    """
+    Vuelve a crear el índice único de la clave natural (o lo elimina si la
+    clase ya no tiene). Si falla, p. ej. por filas duplicadas escritas después
+    de la validación, se elimina el índice inválido que deja CONCURRENTLY.
+    """
+    drop = f"DROP INDEX CONCURRENTLY IF EXISTS {natural_key_index_name(class_id)}"
+    await execute_ddl(drop)
+    if not names:
+        return
+    try:
+        await execute_ddl(natural_key_index_ddl(class_id, names))
+    except Exception:
+        await execute_ddl(drop)
+        raise
+    logger.info(f"Índice de clave natural creado para la clase {class_id}: {', '.join(names)}")
+
+async def natural_key_index_ready(db, class_id) -> bool:
+    """ El índice existe y terminó de construirse (CREATE INDEX CONCURRENTLY lo marca válido al final) """
+    result = await db.execute(text(INDEX_VALID_SQL), {"name": natural_key_index_name(class_id)})
+    return bool(result.scalar_one_or_none())
+
+async def ensure_all_indexes():
+    """ Crea los índices que falten o sean inválidos para los atributos existentes (idempotente) """
+    # Las clases materializadas ya no guardan sus filas en data
+    materialized = select(MaterializedClass.class_id).where(MaterializedClass.state == STORAGE_READY)
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(Attribute.id, Attribute.class_id, Attribute.name, Attribute.data_type)
+            .where(Attribute.class_id.not_in(materialized))
+        )
+        attributes = result.all()
+    # El GIN una vez por clase; cada índice por separado
+    targets = [_class_gin_target(class_id) for class_id in dict.fromkeys(a.class_id for a in attributes)]
+    for attribute in attributes:
+        targets.extend(_attribute_target(attribute))
+    failed = await create_indexes(targets)
+    if failed:
+        logger.error(f"{len(failed)} de {len(targets)} índices de data.content no se pudieron crear")
@@ -0,0 +1,408 @@
+# backend/ingest.py
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Callable
+
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from backend import coercion, config, crud, parsing
+from backend.schemas import DataCreate
+
+logger = logging.getLogger(__name__)
+
+EXCEL_SUFFIXES = {".xlsx", ".xlsm"}
+CSV_SUFFIXES = {".csv", ".txt"}
+
+_pool: ProcessPoolExecutor | None = None
+
+# ✅ Pool de procesos
+
+def get_pool() -> ProcessPoolExecutor:
+    """ Pool compartido para el parseo (CPU) fuera del event loop y del GIL """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=config.INGEST_WORKERS)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+# ✅ Ingesta
+
+def _save_upload(upload: UploadFile, target: str):
+    upload.file.seek(0)
+    with open(target, "wb") as out:
+        shutil.copyfileobj(upload.file, out, length=1024 * 1024)
+
+async def _prepare_csv(upload: UploadFile, workdir: str) -> tuple[str, str]:
+    """ Guarda el archivo en disco y devuelve (ruta CSV, codificación) """
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    if suffix not in EXCEL_SUFFIXES | CSV_SUFFIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato no soportado: {suffix or 'sin extensión'}. Use .xlsx o .csv",
+        )
+    source = os.path.join(workdir, f"upload{suffix}")
+    await run_in_threadpool(_save_upload, upload, source)
+    if suffix in CSV_SUFFIXES:
+        return source, await run_in_threadpool(parsing.detect_encoding, source)
+
+    target = os.path.join(workdir, "upload.csv")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(get_pool(), parsing.xlsx_to_csv, source, target)
+    return target, "utf-8"
+
+async def iter_parsed_chunks(
+    csv_path: str,
+    encoding: str,
+    header_map: list,
+    data_start: int,
+    schema: list | None = None,
+    report: coercion.ErrorReport | None = None,
+):
+    """
+    Parsea el CSV por rangos de bytes en el pool de procesos y devuelve
+    (content, bytes procesados) en orden. Sólo hay INGEST_WORKERS * 2 rangos
+    en vuelo, así la memoria queda acotada aunque el archivo sea enorme.
+    Con schema cada rango se convierte a los tipos de la clase en el mismo
+    proceso y las filas no válidas se anotan en report.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    ranges = iter(await run_in_threadpool(
+        parsing.split_csv_ranges, csv_path, data_start, config.INGEST_RANGE_BYTES
+    ))
+    pending = deque()
+    rows_seen = 0
+
+    def submit_next():
+        for start, end in ranges:
+            if schema is None:
+                future = loop.run_in_executor(
+                    pool, parsing.parse_csv_range, csv_path, start, end, header_map, encoding
+                )
+            else:
+                future = loop.run_in_executor(
+                    pool, coercion.parse_csv_range_typed, csv_path, start, end, header_map, encoding, schema
+                )
+            pending.append((future, end))
+            return
+
+    for _ in range(config.INGEST_WORKERS * 2):
+        submit_next()
+    try:
+        while pending:
+            future, end = pending.popleft()
+            contents = await future
+            submit_next()
+            if schema is not None:
+                contents, errors, parsed = contents
+                # Fila de datos en el archivo (1 = la primera tras el encabezado)
+                for error in errors:
+                    error["row"] += rows_seen + 1
+                report.add(errors, parsed - len(contents))
+                rows_seen += parsed
+            for i in range(0, len(contents), config.INGEST_CHUNK_SIZE):
+                yield contents[i:i + config.INGEST_CHUNK_SIZE], end
+    finally:
+        for future, _ in pending:
+            future.cancel()
+
+class PreparedUpload:
+    """ Archivo ya guardado en disco y columnas mapeadas, listo para insertar """
+
+    def __init__(self, class_id, csv_path: str, encoding: str, header_map: list, data_start: int, schema: list | None = None):
+        self.class_id = class_id
+        self.csv_path = csv_path
+        self.encoding = encoding
+        self.header_map = header_map
+        self.data_start = data_start
+        self.total_bytes = os.path.getsize(csv_path)
+        self.schema = schema
+        self.report = coercion.ErrorReport()
+
+    @property
+    def columns(self) -> list[str]:
+        return [name for _, name in self.header_map]
+
+    def chunks(self):
+        return iter_parsed_chunks(
+            self.csv_path, self.encoding, self.header_map, self.data_start, self.schema, self.report,
+        )
+
+async def prepare_upload(db: AsyncSession, class_id: str, upload: UploadFile, workdir: str) -> PreparedUpload:
+    """ Valida la clase, guarda el archivo en workdir y mapea los encabezados a los atributos """
+    try:
+        class_uuid = uuid.UUID(class_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Identificador de clase no válido")
+    if await crud.get_class_name(db, class_id) is None:
+        raise HTTPException(status_code=404, detail="Clase no encontrada")
+    attributes = await crud.get_attributes_by_class(db, class_id)
+
+    csv_path, encoding = await _prepare_csv(upload, workdir)
+    headers, data_start = await run_in_threadpool(parsing.read_csv_header, csv_path, encoding)
+    header_map = parsing.build_header_map(headers, [attr.name for attr in attributes])
+    if not header_map:
+        raise HTTPException(
+            status_code=400,
+            detail="Ninguna columna del archivo coincide con los atributos de la clase",
+        )
+    schema = coercion.class_schema(attributes) if config.DATA_COERCION else None
+    return PreparedUpload(class_uuid, csv_path, encoding, header_map, data_start, schema)
+
+async def ingest_upload(db: AsyncSession, class_id: str, upload: UploadFile, upsert: bool = False, merge: bool = False) -> dict:
+    """
+    Importa un Excel/CSV en la clase: parseo en paralelo, columnas mapeadas a
+    los atributos e inserción por bloques de INGEST_CHUNK_SIZE filas, cada uno
+    en su propia transacción. Con upsert=True cada bloque se inserta o
+    actualiza según la clave natural de la clase.
+    """
+    started = time.perf_counter()
+    inserted = 0
+    counts = dict.fromkeys(UPSERT_COUNTS, 0)
+    with tempfile.TemporaryDirectory(prefix="kinro_ingest_") as workdir:
+        prepared = await prepare_upload(db, class_id, upload, workdir)
+        try:
+            async for chunk, _ in prepared.chunks():
+                if upsert:
+                    stats = await crud.upsert_data_rows(db, prepared.class_id, chunk, merge)
+                    prepared.report.add(stats["errors"], stats["rejected"])
+                    for key in UPSERT_COUNTS:
+                        counts[key] += stats[key]
+                    inserted += stats["inserted"]
+                else:
+                    inserted += await crud.insert_data_rows(db, prepared.class_id, chunk)
+        except HTTPException:
+            raise
+        except Exception as e:
+            await db.rollback()
+            logger.exception("Error al importar archivo")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error al importar datos tras {inserted} registros: {str(e)}",
+            )
+
+    elapsed = time.perf_counter() - started
+    message = f"{inserted} datos creados exitosamente"
+    if upsert:
+        message += f", {counts['updated']} actualizados y {counts['unchanged']} sin cambios"
+    return {
+        "message": message,
+        **(counts if upsert else {"inserted": inserted}),
+        "columns": prepared.columns,
+        "elapsed_seconds": round(elapsed, 3),
+        **prepared.report.summary(),
+    }
+
+# ✅ Conversión de lotes (/data/batch y trabajos de importación)
+
+async def _coerce_class(contents: list[dict], schema: list) -> tuple[list[dict], list[dict], int]:
+    """ En el event loop si el lote es pequeño; si no, por bloques en el pool de procesos """
+    if len(contents) < config.COERCE_POOL_MIN_ROWS:
+        return coercion.coerce_contents(contents, schema)
+    loop = asyncio.get_running_loop()
+    size = config.INGEST_CHUNK_SIZE
+    results = await asyncio.gather(*(
+        loop.run_in_executor(get_pool(), coercion.coerce_chunk, contents[i:i + size], schema, i)
+        for i in range(0, len(contents), size)
+    ))
+    valid, errors, rejected = [], [], 0
+    for chunk_valid, chunk_errors, chunk_rejected in results:
+        valid.extend(chunk_valid)
+        errors.extend(chunk_errors)
+        rejected += chunk_rejected
+    return valid, errors, rejected
+
+def _group_by_class(data_list: list[DataCreate]) -> dict:
+    """ {class_id: posiciones en data_list} """
+    by_class: dict = {}
+    for position, data in enumerate(data_list):
+        by_class.setdefault(data.class_id, []).append(position)
+    return by_class
+
+async def _coerce_group(db: AsyncSession, class_id, contents: list[dict]) -> tuple[list[dict], list[int], list[dict], int]:
+    """ Contents de una clase convertidos: (válidos, su posición en contents, errores, descartadas) """
+    schema = coercion.class_schema(await crud.get_attributes_by_class(db, str(class_id))) if config.DATA_COERCION else []
+    if not schema:
+        return contents, list(range(len(contents))), [], 0
+    valid, errors, rejected = await _coerce_class(contents, schema)
+    bad = {error["row"] for error in errors}
+    return valid, [i for i in range(len(contents)) if i not in bad], errors, rejected
+
+async def coerce_batch(db: AsyncSession, data_list: list[DataCreate]) -> tuple[list[DataCreate], coercion.ErrorReport]:
+    """
+    Convierte el content de cada fila a los tipos de los atributos de su clase
+    y valida sus propiedades. Las filas no válidas se descartan y se informan
+    con su posición en data_list.
+    """
+    report = coercion.ErrorReport()
+    if not config.DATA_COERCION:
+        return data_list, report
+    valid = []
+    for class_id, positions in _group_by_class(data_list).items():
+        contents, _, errors, rejected = await _coerce_group(db, class_id, [data_list[p].content for p in positions])
+        for error in errors:
+            error["row"] = positions[error["row"]]
+        report.add(errors, rejected)
+        valid.extend(DataCreate.model_construct(class_id=class_id, content=content) for content in contents)
+    report.errors.sort(key=lambda error: error["row"])
+    return valid, report
+
+UPSERT_COUNTS = ("inserted", "updated", "unchanged", "duplicates")
+
+async def upsert_batch(
+    db: AsyncSession,
+    data_list: list[DataCreate],
+    chunk_size: int | None = None,
+    merge: bool = False,
+) -> dict:
+    """
+    Importación por clave natural (crud.upsert_data_rows) de filas ya
+    convertidas, por clase y por bloques de chunk_size filas (una transacción
+    por bloque). Devuelve filas insertadas, actualizadas, sin cambios y repetidas.
+    """
+    size = chunk_size or config.BULK_CHUNK_SIZE
+    totals = dict.fromkeys(UPSERT_COUNTS, 0)
+    report = coercion.ErrorReport()
+    for class_id, positions in _group_by_class(data_list).items():
+        contents, kept, errors, rejected = await _coerce_group(db, class_id, [data_list[p].content for p in positions])
+        for error in errors:
+            error["row"] = positions[error["row"]]
+        report.add(errors, rejected)
+        for start in range(0, len(contents), size):
+            stats = await crud.upsert_data_rows(db, class_id, contents[start:start + size], merge)
+            for error in stats["errors"]:
+                error["row"] = positions[kept[start + error["row"]]]
+            report.add(stats["errors"], stats["rejected"])
+            for key in UPSERT_COUNTS:
+                totals[key] += stats[key]
+    report.errors.sort(key=lambda error: error["row"])
+    return {**totals, **report.summary()}
+
+async def create_data_batch(
+    db: AsyncSession,
+    data_list: list[DataCreate],
+    chunk_size: int | None = None,
+    atomic: bool = True,
+    upsert: bool = False,
+    merge: bool = False,
+) -> dict:
+    """
+    crud.create_data_batch con las filas ya convertidas; las no válidas no
+    abortan el lote. Con upsert=True las filas se insertan o actualizan según
+    la clave natural de su clase (upsert_batch; atomic no aplica).
+    """
+    if upsert:
+        return await upsert_batch(db, data_list, chunk_size, merge)
+    valid, report = await coerce_batch(db, data_list)
+    stats = await crud.create_data_batch(db, valid, chunk_size, atomic)
+    return {**stats, **report.summary()}
+
+# ✅ Ingesta en streaming (POST /data/batch/stream)
+
+STREAM_COUNTS = ("inserted", "updated", "unchanged", "duplicates")
+
+# Caracteres de un registro que no se puede decodificar que se devuelven en el error
+STREAM_ERROR_VALUE_CHARS = 200
+
+def _stream_error(number: int, column, value, message: str) -> dict:
+    """ Mismo formato que los errores de coercion.coerce_contents """
+    return {"row": number, "column": column, "value": value, "error": message}
+
+def _stream_record(number: int, record: bytes, decode) -> tuple[DataCreate | None, dict | None]:
+    """ Un registro del cuerpo validado como DataCreate, o su error """
+    try:
+        return DataCreate.model_validate(decode(record)), None
+    except ValidationError as e:
+        first = e.errors()[0]
+        column = ".".join(str(part) for part in first["loc"]) or None
+        # En un campo que falta, input es el registro entero
+        value = None if first["type"] == "missing" else first.get("input")
+        return None, _stream_error(number, column, value, first["msg"])
+    except ValueError as e:
+        raw = record[:STREAM_ERROR_VALUE_CHARS].decode("utf-8", errors="replace")
+        return None, _stream_error(number, None, raw, f"Registro no válido: {e}")
+
+async def ingest_stream(
+    db: AsyncSession,
+    records: AsyncIterator[tuple[int, bytes]],
+    decode: Callable,
+    chunk_size: int | None = None,
+    atomic: bool = True,
+    upsert: bool = False,
+    merge: bool = False,
+) -> dict:
+    """
+    Valida e inserta los registros de streaming.records por bloques de
+    chunk_size (create_data_batch, un commit por bloque) a medida que llegan:
+    en memoria sólo está el bloque en curso. Mientras se inserta un bloque no
+    se lee el cuerpo, así que el servidor deja de leer del socket y el cliente
+    espera (contrapresión de TCP). atomic se aplica a cada bloque. Los errores
+    llevan el número de línea o de registro del cuerpo.
+    """
+    size = chunk_size or config.INGEST_CHUNK_SIZE
+    started = time.perf_counter()
+    totals = dict.fromkeys(STREAM_COUNTS if upsert else ("inserted",), 0)
+    report = coercion.ErrorReport()
+    pending: list[DataCreate] = []
+    numbers: list[int] = []
+    chunks = 0
+
+    async def flush():
+        nonlocal chunks
+        stats = await create_data_batch(db, pending, size, atomic, upsert, merge)
+        for error in stats["errors"]:
+            error["row"] = numbers[error["row"]]
+        report.add(stats["errors"], stats["rejected"])
+        for key in totals:
+            totals[key] += stats[key]
+        chunks += 1
+        pending.clear()
+        numbers.clear()
+
+    try:
+        async for number, record in records:
+            data, error = _stream_record(number, record, decode)
+            if error is not None:
+                report.add([error], 1)
+                continue
+            pending.append(data)
+            numbers.append(number)
+            if len(pending) >= size:
+                await flush()
+        if pending:
+            await flush()
+    except HTTPException as e:
+        # Los bloques anteriores ya están confirmados: se indica cuántas filas
+        committed = totals["inserted"] + totals.get("updated", 0)
+        if committed:
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=f"{e.detail} ({committed} filas de bloques anteriores ya confirmadas)",
+            )
+        raise
+
+    report.errors.sort(key=lambda error: error["row"])
+    elapsed = time.perf_counter() - started
+    logger.info(f"Streaming: {totals['inserted']} filas en {chunks} bloques, {elapsed:.2f}s")
+    return {
+        **totals,
+        "chunks": chunks,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(totals["inserted"] / elapsed) if elapsed > 0 else totals["inserted"],
+        **report.summary(),
+    }
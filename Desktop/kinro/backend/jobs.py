@@ -0,0 +1,416 @@
+# backend/jobs.py
+import asyncio
+import logging
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+
+from backend import changefeed, config, crud, indexes, ingest, materialize
+from backend.database import long_session
+
+logger = logging.getLogger(__name__)
+
+MAX_JOB_ERRORS = 20
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+# ✅ Estado de un trabajo
+
+@dataclass
+class ImportJob:
+    kind: str
+    class_id: str | None = None
+    total_rows: int | None = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    state: str = QUEUED
+    rows_processed: int = 0
+    # Filas descartadas por valores que no encajan en el tipo o las propiedades del atributo
+    rows_rejected: int = 0
+    # Importaciones por clave natural (upsert): filas actualizadas y sin cambios.
+    # En la reescritura de content, filas reescritas
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+    progress: float = 0.0
+    errors: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel_requested: bool = False
+    # Trabajo a ejecutar: async (job, db) -> None, y limpieza final opcional
+    runner: object = field(default=None, repr=False)
+    cleanup: object = field(default=None, repr=False)
+
+    def release(self):
+        """ Libera el trabajo pendiente y los recursos asociados (archivos temporales) """
+        if self.cleanup is not None:
+            self.cleanup()
+        self.runner = None
+        self.cleanup = None
+
+    def add_error(self, message: str):
+        if len(self.errors) < MAX_JOB_ERRORS:
+            self.errors.append(message)
+
+    def add_row_errors(self, errors: list[dict]):
+        for error in errors:
+            self.add_error(f"Fila {error['row']}, {error['column']}: {error['error']} ({error['value']!r})")
+
+    def status(self) -> dict:
+        """ Progreso, velocidad y tiempo restante estimado """
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        throughput = self.rows_processed / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.state == RUNNING and 0 < self.progress < 1:
+            eta = round(elapsed * (1 - self.progress) / self.progress, 1)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "class_id": self.class_id,
+            "state": self.state,
+            "rows_processed": self.rows_processed,
+            "rows_rejected": self.rows_rejected,
+            "rows_updated": self.rows_updated,
+            "rows_unchanged": self.rows_unchanged,
+            "total_rows": self.total_rows,
+            "progress": round(self.progress, 4),
+            "rows_per_second": round(throughput, 1),
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta,
+            "errors": self.errors,
+        }
+
+class JobCancelled(Exception):
+    pass
+
+# ✅ Cola y trabajadores
+
+class JobManager:
+    """
+    Cola de importaciones en memoria (por proceso de uvicorn) atendida por
+    JOB_CONCURRENCY tareas asyncio. Guarda los últimos JOB_HISTORY_SIZE trabajos.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int, history_size: int):
+        self.concurrency = concurrency
+        self.history_size = history_size
+        self.queue: asyncio.Queue | None = None
+        self.queue_size = queue_size
+        self.jobs: OrderedDict[str, ImportJob] = OrderedDict()
+        self.workers: list[asyncio.Task] = []
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    async def stop(self):
+        for job in self.jobs.values():
+            if job.state not in FINISHED_STATES:
+                job.cancel_requested = True
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        for job in self.jobs.values():
+            if job.state == QUEUED:
+                job.state = CANCELLED
+            job.release()
+
+    def submit(self, job: ImportJob) -> ImportJob:
+        if self.queue is None:
+            raise HTTPException(status_code=503, detail="La cola de importaciones no está iniciada")
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Cola de importaciones llena, intente más tarde")
+        self.jobs[job.id] = job
+        self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> ImportJob:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+        return job
+
+    def cancel(self, job_id: str) -> ImportJob:
+        """ Cancelación cooperativa: el trabajo se detiene entre bloques, tras confirmar el actual """
+        job = self.get(job_id)
+        if job.state in FINISHED_STATES:
+            return job
+        job.cancel_requested = True
+        if job.state == QUEUED:
+            job.state = CANCELLED
+            job.finished_at = time.time()
+        return job
+
+    def _trim_history(self):
+        while len(self.jobs) > self.history_size:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest.state not in FINISHED_STATES:
+                break
+            self.jobs.pop(oldest_id)
+
+    async def _worker(self, number: int):
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.state == CANCELLED:
+                    job.release()
+                    continue
+                await self._run(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: ImportJob):
+        job.state = RUNNING
+        job.started_at = time.time()
+        try:
+            async with long_session() as db:
+                await job.runner(job, db)
+            job.state = CANCELLED if job.cancel_requested else COMPLETED
+            if job.state == COMPLETED:
+                job.progress = 1.0
+        except JobCancelled:
+            job.state = CANCELLED
+        except asyncio.CancelledError:
+            job.state = CANCELLED
+            raise
+        except HTTPException as e:
+            job.state = FAILED
+            job.add_error(str(e.detail))
+        except Exception as e:
+            logger.exception(f"Error en el trabajo de importación {job.id}")
+            job.state = FAILED
+            job.add_error(str(e))
+        finally:
+            job.finished_at = time.time()
+            job.release()
+
+job_manager = JobManager(config.JOB_CONCURRENCY, config.JOB_QUEUE_SIZE, config.JOB_HISTORY_SIZE)
+
+# ✅ Tipos de trabajo
+
+def _check_cancel(job: ImportJob):
+    if job.cancel_requested:
+        raise JobCancelled()
+
+def _count_upsert(job: ImportJob, stats: dict):
+    job.rows_updated += stats["updated"]
+    job.rows_unchanged += stats["unchanged"]
+
+def submit_batch_import(data_list: list, upsert: bool = False, merge: bool = False) -> ImportJob:
+    """
+    Importación de una lista de DataCreate, por bloques con crud.create_data_batch
+    (o ingest.upsert_batch si upsert=True)
+    """
+    class_ids = {str(data.class_id) for data in data_list}
+    job = ImportJob(
+        kind="batch",
+        class_id=class_ids.pop() if len(class_ids) == 1 else None,
+        total_rows=len(data_list),
+    )
+
+    async def runner(job: ImportJob, db):
+        for i in range(0, len(data_list), config.BULK_CHUNK_SIZE):
+            _check_cancel(job)
+            chunk = data_list[i:i + config.BULK_CHUNK_SIZE]
+            if upsert:
+                stats = await ingest.upsert_batch(db, chunk, merge=merge)
+                _count_upsert(job, stats)
+                errors, rejected = stats["errors"], stats["rejected"]
+            else:
+                valid, report = await ingest.coerce_batch(db, chunk)
+                stats = await crud.create_data_batch(db, valid)
+                errors, rejected = report.errors, report.rejected
+            for error in errors:
+                error["row"] += i
+            job.add_row_errors(errors)
+            job.rows_rejected += rejected
+            job.rows_processed += len(chunk)
+            job.progress = job.rows_processed / job.total_rows if job.total_rows else 1.0
+
+    job.runner = runner
+    return job_manager.submit(job)
+
+def submit_file_import(prepared, workdir: str, upsert: bool = False, merge: bool = False) -> ImportJob:
+    """
+    Importación de un archivo ya guardado en workdir (ingest.prepare_upload).
+    El progreso se mide en bytes del archivo, porque el total de filas no se conoce.
+    """
+    job = ImportJob(kind="file", class_id=str(prepared.class_id))
+
+    async def runner(job: ImportJob, db):
+        async for chunk, parsed_bytes in prepared.chunks():
+            _check_cancel(job)
+            if upsert:
+                stats = await crud.upsert_data_rows(db, prepared.class_id, chunk, merge)
+                prepared.report.add(stats["errors"], stats["rejected"])
+                _count_upsert(job, stats)
+                job.rows_processed += len(chunk)
+            else:
+                job.rows_processed += await crud.insert_data_rows(db, prepared.class_id, chunk)
+            job.rows_rejected = prepared.report.rejected
+            job.progress = parsed_bytes / prepared.total_bytes if prepared.total_bytes else 1.0
+        job.add_row_errors(prepared.report.errors)
+
+    job.runner = runner
+    job.cleanup = lambda: shutil.rmtree(workdir, ignore_errors=True)
+    try:
+        return job_manager.submit(job)
+    except HTTPException:
+        job.release()
+        raise
+
+def _storage_changed():
+    crud.metadata_changed(crud.STORAGE_KEY, crud.CLASSES_KEY)
+
+def submit_materialization(class_id: str) -> ImportJob:
+    """
+    Mueve las filas de una clase de data.content a su tabla tipada (materialize.py)
+    sin bloquear escrituras: el trigger de captura registra los cambios hechos
+    durante la copia, que se vuelven a copiar antes y después del cambio de
+    almacenamiento. Las filas de data se borran al final, pasado
+    MATERIALIZE_GRACE_SECONDS para que ningún proceso siga leyendo de data.
+    """
+    for job in job_manager.jobs.values():
+        if job.kind == "materialize" and job.class_id == class_id and job.state not in FINISHED_STATES:
+            raise HTTPException(status_code=409, detail="La clase ya se está materializando")
+    job = ImportJob(kind="materialize", class_id=class_id)
+
+    async def runner(job: ImportJob, db):
+        if await crud.get_class_name(db, class_id) is None:
+            raise HTTPException(status_code=404, detail="Clase no encontrada")
+        if await crud.get_storage_state(db, class_id) == materialize.READY:
+            raise HTTPException(status_code=409, detail="La clase ya está materializada")
+        attributes = await crud.get_attributes_by_class(db, class_id)
+        job.total_rows = await crud.count_data_by_class(db, class_id)
+        mt = await materialize.start_migration(db, class_id, attributes)
+        await db.commit()
+        _storage_changed()
+        try:
+            last_id = None
+            while True:
+                _check_cancel(job)
+                copied, last_id = await materialize.copy_chunk(db, mt, last_id)
+                await db.commit()
+                job.rows_processed += copied
+                if job.total_rows:
+                    job.progress = min(job.rows_processed / job.total_rows, 1.0) * 0.9
+                if not copied:
+                    break
+            while await materialize.drain_changes(db, mt):
+                _check_cancel(job)
+                await db.commit()
+            await materialize.mark_ready(db, mt.class_id)
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            await materialize.drop_storage(db, mt.class_id)
+            await db.commit()
+            _storage_changed()
+            raise
+        _storage_changed()
+
+        # Otros procesos pueden seguir escribiendo en data hasta que expire su caché
+        deadline = time.monotonic() + config.MATERIALIZE_GRACE_SECONDS
+        while time.monotonic() < deadline:
+            await materialize.drain_changes(db, mt)
+            await db.commit()
+            await asyncio.sleep(1)
+        await materialize.stop_capture(db, mt.class_id)
+        while await materialize.drain_changes(db, mt):
+            pass
+        await db.commit()
+        job.progress = 0.95
+        await crud.purge_jsonb_rows(db, class_id)
+        await indexes.drop_class_indexes(class_id, [attribute.id for attribute in attributes])
+        materialize.schedule_column_indexes(class_id, attributes)
+
+    job.runner = runner
+    return job_manager.submit(job)
+
+REWRITE_KINDS = {"rename_key", "drop_key"}
+
+def submit_content_rewrite(
+    class_id,
+    old_name: str,
+    new_name: str | None = None,
+    released: asyncio.Event | None = None,
+) -> ImportJob:
+    """
+    Renombra (o elimina, sin new_name) una clave en el content de todas las
+    filas de la clase, por bloques de REWRITE_CHUNK_SIZE filas en orden de id
+    con un commit por bloque: ni un UPDATE enorme ni bloqueos largos. Los
+    trabajos de una misma clase se ejecutan en el orden en que se enviaron.
+    Las clases materializadas ya lo resuelven al modificar la tabla.
+    Con released, el trabajo no empieza hasta que se activa (ver content_rewrite).
+    """
+    class_id = str(class_id)
+    earlier = [
+        job for job in job_manager.jobs.values()
+        if job.kind in REWRITE_KINDS and job.class_id == class_id and job.state not in FINISHED_STATES
+    ]
+    job = ImportJob(kind="rename_key" if new_name is not None else "drop_key", class_id=class_id)
+
+    async def runner(job: ImportJob, db):
+        if released is not None:
+            await released.wait()
+            _check_cancel(job)
+        for previous in earlier:
+            while previous.state not in FINISHED_STATES:
+                _check_cancel(job)
+                await asyncio.sleep(0.5)
+        if await crud.get_storage_state(db, class_id) is not None:
+            return
+        job.total_rows = await crud.count_data_by_class(db, class_id)
+        last_id = None
+        while True:
+            _check_cancel(job)
+            scanned, rewritten, last_id = await crud.rewrite_content_key(db, class_id, old_name, new_name, last_id)
+            await db.commit()
+            job.rows_processed += scanned
+            job.rows_updated += rewritten
+            if job.total_rows:
+                job.progress = min(job.rows_processed / job.total_rows, 1.0)
+            if rewritten:
+                crud.rows_changed(class_id)
+            if scanned < config.REWRITE_CHUNK_SIZE:
+                break
+            await asyncio.sleep(config.REWRITE_PAUSE_SECONDS)
+        if job.rows_updated:
+            changefeed.emit("data", "update", class_id=class_id, count=job.rows_updated)
+        names = await crud.get_natural_key(db, class_id)
+        if new_name in names:
+            # Se quitó al renombrar (crud.update_attribute): ahora las filas ya usan el nombre nuevo
+            await indexes.rebuild_natural_key_index(class_id, names)
+
+    job.runner = runner
+    return job_manager.submit(job)
+
+@asynccontextmanager
+async def content_rewrite(class_id, old_name: str, new_name: str | None = None):
+    """
+    Encola la reescritura antes de cambiar el atributo: si la cola está llena
+    el 503 llega antes del commit y no queda un cambio sin su reescritura. El
+    trabajo espera a que termine el bloque; si termina con un error se cancela.
+    """
+    released = asyncio.Event()
+    job = submit_content_rewrite(class_id, old_name, new_name, released)
+    try:
+        yield job
+    except BaseException:
+        job_manager.cancel(job.id)
+        raise
+    finally:
+        released.set()
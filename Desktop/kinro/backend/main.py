@@ -1,7 +1,8 @@
 from fastapi import FastAPI
-from backend.database import engine
+from backend.database import engine, read_engine
 from backend.models import Base
-from backend.routes import classes, attributes, data, properties, connections
+from backend import cache, changefeed, config, crud, indexes, ingest, jobs, materialize, metrics, notifications, sync
+from backend.routes import classes, attributes, data, properties, connections, graph, monitoring, changes, jobs as jobs_routes, sync as sync_routes, metrics as metrics_routes, search as search_routes
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import os
@@ -19,20 +20,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Kinro-Profile"],
 )
 
+# ✅ Métricas de peticiones y SQL (GET /metrics)
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # ✅ Evento de inicio
 @app.on_event("startup")
 async def startup():
     logger.info("🔹 Tablas detectadas por SQLAlchemy:")
     for table in Base.metadata.tables.keys():
         logger.info(f"✅ {table}")
+    jobs.job_manager.start()
+    # Invalidación de la caché de metadatos entre procesos (CACHE_NOTIFY)
+    cache.register_listener()
+    # Eventos de cambios de otros procesos para los clientes de /changes/stream
+    changefeed.register_listener()
+    await notifications.start()
+    try:
+        await materialize.ensure_catalog()
+    except Exception:
+        logger.exception("No se pudo crear el catálogo de clases materializadas")
+    try:
+        await sync.prune_tombstones()
+    except Exception:
+        logger.exception("No se pudieron purgar las lápidas de sincronización")
+    # Índices de data.content para atributos creados antes de existir indexes.py
+    indexes.schedule(indexes.ensure_all_indexes())
+    # Clases cuya eliminación quedó a medias (crud.delete_class)
+    indexes.schedule(crud.resume_class_deletions())
 
 # ✅ Evento de apagado
 @app.on_event("shutdown")
 async def shutdown():
     """Cierra conexiones a la base de datos si es necesario."""
+    await jobs.job_manager.stop()
+    await notifications.stop()
+    ingest.shutdown_pool()
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
     logger.info("🔻 Conexión a la base de datos cerrada.")
 
 # ✅ Incluir rutas organizadas
@@ -41,6 +70,13 @@ app.include_router(attributes.router)
 app.include_router(data.router)
 app.include_router(properties.router)
 app.include_router(connections.router)
+app.include_router(graph.router)
+app.include_router(jobs_routes.router)
+app.include_router(monitoring.router)
+app.include_router(changes.router)
+app.include_router(sync_routes.router)
+app.include_router(metrics_routes.router)
+app.include_router(search_routes.router)
 
 
 @app.get("/")
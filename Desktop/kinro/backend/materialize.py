@@ -0,0 +1,618 @@
+# backend/materialize.py
+# Almacenamiento opcional de una clase en una tabla generada con una columna
+# tipada por atributo, en lugar de data.content (JSONB). La migración de
+# JSONB a tabla la orquesta jobs.submit_materialization con estas piezas.
+import json
+import logging
+import math
+import re
+import uuid
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Date, MetaData, Numeric, Table, Text, and_, any_, bindparam, case,
+    cast, delete, func, insert, literal, not_, or_, select, text, update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import bulk, coercion, config, indexes, query, sync
+from backend.database import engine, long_session
+from backend.models import (
+    STORAGE_MIGRATING, STORAGE_READY, Attribute, Data, MaterializeChange, MaterializedClass,
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATING = STORAGE_MIGRATING
+READY = STORAGE_READY
+
+# Attribute.data_type -> tipo de la columna (los tipos desconocidos se guardan como texto)
+COLUMN_TYPES = {
+    "integer": "numeric",
+    "float": "numeric",
+    "boolean": "boolean",
+    "date": "date",
+    "text": "text",
+    "uuid": "uuid",
+    "json": "jsonb",
+}
+SA_TYPES = {
+    "numeric": Numeric(),
+    "boolean": Boolean(),
+    "date": Date(),
+    "text": Text(),
+    "uuid": UUID(as_uuid=True),
+    "jsonb": JSONB(),
+}
+
+# jsonb_build_object admite como mucho 100 argumentos (50 pares clave/valor)
+BUILD_OBJECT_PAIRS = 50
+
+def column_type(data_type: str) -> str:
+    return COLUMN_TYPES.get(data_type, "text")
+
+# ✅ Nombres
+
+def _hex(value) -> str:
+    return uuid.UUID(str(value)).hex
+
+def table_name(class_id) -> str:
+    return f"data_c_{_hex(class_id)}"
+
+def column_name(attribute_id) -> str:
+    # Por id y no por nombre: renombrar un atributo no reescribe la tabla
+    return f"a_{_hex(attribute_id)}"
+
+def column_index_name(attribute_id) -> str:
+    return f"ix_mat_{_hex(attribute_id)}"
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+# ✅ Conversión de valores
+
+_UNCONVERTIBLE = object()
+# Números y booleanos se reconocen igual que al importar (coercion.py)
+DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+# numeric de PostgreSQL no acepta exponentes arbitrarios
+MAX_EXPONENT = 1000
+
+def _to_decimal(value):
+    if isinstance(value, bool):
+        return _UNCONVERTIBLE
+    if isinstance(value, float) and not math.isfinite(value):
+        return _UNCONVERTIBLE
+    if isinstance(value, (int, float)):
+        value = str(value)
+    if not isinstance(value, str) or not coercion.NUMERIC_RE.fullmatch(value):
+        return _UNCONVERTIBLE
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return _UNCONVERTIBLE
+    return number if abs(number.adjusted()) <= MAX_EXPONENT else _UNCONVERTIBLE
+
+def to_column_value(value, kind: str):
+    """
+    Valor de content -> valor de la columna. Devuelve _UNCONVERTIBLE si no
+    encaja en el tipo (el valor original se conserva en extra). En columnas no
+    textuales la cadena vacía, que es como llegan las celdas vacías de Excel, es NULL.
+    """
+    if value is None:
+        return None
+    if kind == "jsonb":
+        return value
+    if kind == "text":
+        return value if isinstance(value, str) else _UNCONVERTIBLE
+    if isinstance(value, str):
+        value = value.strip()
+        if value == "":
+            return None
+    if kind == "numeric":
+        return _to_decimal(value)
+    if kind == "boolean":
+        try:
+            return coercion.to_boolean(value)
+        except coercion.CoercionError:
+            return _UNCONVERTIBLE
+    if kind == "date":
+        if isinstance(value, str) and DATE_RE.fullmatch(value):
+            try:
+                return date.fromisoformat(value)
+            except ValueError:
+                pass
+        return _UNCONVERTIBLE
+    if kind == "uuid":
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            return _UNCONVERTIBLE
+    return _UNCONVERTIBLE
+
+# ✅ Tabla generada
+
+class MaterializedTable:
+    """
+    Tabla de una clase: id, una columna tipada por atributo y extra (jsonb)
+    con las claves sin atributo y los valores que no encajan en su tipo.
+    El content se reconstruye en SQL, así que lectura y escritura mantienen
+    la misma forma que en data.content.
+    """
+
+    def __init__(self, class_id, signature: tuple):
+        self.class_id = uuid.UUID(str(class_id))
+        self.name = table_name(class_id)
+        # (nombre del atributo, tipo de columna, Column) en el orden de los atributos
+        self.slots = []
+        for attribute_id, name, data_type in signature:
+            kind = column_type(data_type)
+            self.slots.append((name, kind, Column(column_name(attribute_id), SA_TYPES[kind])))
+        self.table = Table(
+            self.name,
+            MetaData(),
+            Column("id", UUID(as_uuid=True), primary_key=True),
+            *[slot[2] for slot in self.slots],
+            Column("extra", JSONB, nullable=False),
+            # La asignan los triggers de sync.py, como en data
+            Column("row_version", BigInteger, nullable=False, server_default="0"),
+        )
+        self.id = self.table.c.id
+        self.extra = self.table.c.extra
+        self.row_version = self.table.c.row_version
+        self.types = {name: kind for name, kind, _ in self.slots}
+        self.columns = {name: column for name, _, column in self.slots}
+        self.copy_columns = ["id", *[column.name for _, _, column in self.slots], "extra"]
+
+    # Escritura
+
+    def split(self, content: dict) -> tuple[list, dict]:
+        """ Reparte content entre las columnas tipadas y extra """
+        values = []
+        extra = {key: value for key, value in content.items() if key not in self.types}
+        for name, kind, _ in self.slots:
+            value = to_column_value(content.get(name), kind)
+            if value is _UNCONVERTIBLE:
+                extra[name] = content[name]
+                value = None
+            values.append(value)
+        return values, extra
+
+    def to_record(self, data_id, content: dict) -> tuple:
+        """ Registro para COPY: el codec jsonb de la conexión espera el documento serializado """
+        values, extra = self.split(content)
+        values = [
+            json.dumps(value, ensure_ascii=False) if kind == "jsonb" and value is not None else value
+            for value, (_, kind, _) in zip(values, self.slots)
+        ]
+        return (data_id, *values, json.dumps(extra, ensure_ascii=False, default=str))
+
+    def to_params(self, content: dict) -> dict:
+        """ Valores por nombre de columna para INSERT/UPDATE """
+        values, extra = self.split(content)
+        params = {column.name: value for value, (_, _, column) in zip(values, self.slots)}
+        params["extra"] = extra
+        return params
+
+    # Lectura
+
+    def content_expression(self):
+        """ content reconstruido: {nombre: valor} de las columnas no nulas, más extra """
+        scalars = []
+        parts = []
+        for name, kind, column in self.slots:
+            if kind == "jsonb":
+                # jsonb_strip_nulls es recursivo: no debe tocar el interior de un json
+                parts.append(case(
+                    (column.is_(None), func.jsonb_build_object()),
+                    else_=func.jsonb_build_object(query.inline(name), column),
+                ))
+            else:
+                scalars.append((name, column))
+        for i in range(0, len(scalars), BUILD_OBJECT_PAIRS):
+            args = [arg for name, column in scalars[i:i + BUILD_OBJECT_PAIRS] for arg in (query.inline(name), column)]
+            parts.insert(0, func.jsonb_strip_nulls(func.jsonb_build_object(*args)))
+        expression = self.extra
+        for part in reversed(parts):
+            expression = part.op("||", return_type=JSONB)(expression)
+        return expression
+
+    def row_columns(self) -> tuple:
+        """ Mismas columnas que select(Data.id, Data.class_id, Data.content) """
+        return (
+            self.id.label("id"),
+            literal(self.class_id, UUID(as_uuid=True)).label("class_id"),
+            self.content_expression().label("content"),
+        )
+
+    # Consultas
+
+    def column(self, key: str):
+        return self.columns[key]
+
+    def coerce(self, key: str, value):
+        """ Valor de un filtro o cursor convertido al tipo de la columna """
+        kind = self.types[key]
+        if kind == "text":
+            return str(value)
+        converted = to_column_value(value, kind)
+        if converted is None or converted is _UNCONVERTIBLE:
+            raise HTTPException(status_code=400, detail=f"Valor no válido para {key}: {value}")
+        return converted
+
+    def filter_condition(self, key: str, op: str, value):
+        """ Mismos operadores que query.filter_condition, sobre la columna tipada """
+        column = self.columns[key]
+        in_extra = self.extra.has_key(query.inline(key))
+        if op == "is_null":
+            return and_(column.is_(None), not_(in_extra))
+        if op == "not_null":
+            return or_(column.is_not(None), in_extra)
+        if op == "prefix":
+            if value is None:
+                raise HTTPException(status_code=400, detail=f"El filtro prefix requiere un valor ({key})")
+            target = column if self.types[key] == "text" else cast(column, Text)
+            return target.like(query.inline(query.escape_like(str(value)) + "%"))
+        if op == "in":
+            if not isinstance(value, list) or not value:
+                raise HTTPException(status_code=400, detail=f"El filtro in requiere una lista ({key})")
+            return column.in_([self.coerce(key, v) for v in value])
+
+        if value is None:
+            raise HTTPException(status_code=400, detail=f"El filtro {op} requiere un valor ({key})")
+        typed = self.coerce(key, value)
+        if op == "eq":
+            return column == typed
+        if op == "ne":
+            return column != typed
+        if op == "lt":
+            return column < typed
+        if op == "lte":
+            return column <= typed
+        if op == "gt":
+            return column > typed
+        if op == "gte":
+            return column >= typed
+        raise HTTPException(status_code=400, detail=f"Operador no soportado: {op}")
+
+@lru_cache(maxsize=256)
+def _table(class_id: str, signature: tuple) -> MaterializedTable:
+    return MaterializedTable(class_id, signature)
+
+def table_for(class_id, attributes) -> MaterializedTable:
+    """
+    Tabla de la clase para sus atributos actuales. Se reutiliza el mismo
+    objeto mientras no cambien, para aprovechar la caché de compilación de SQLAlchemy.
+    """
+    signature = tuple((str(a.id), a.name, a.data_type) for a in attributes)
+    return _table(str(uuid.UUID(str(class_id))), signature)
+
+# ✅ DDL
+
+CAPTURE_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION kinro_capture_data_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO materialize_changes (class_id, data_id) VALUES (OLD.class_id, OLD.id)
+        ON CONFLICT DO NOTHING;
+    ELSE
+        INSERT INTO materialize_changes (class_id, data_id) VALUES (NEW.class_id, NEW.id)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+def create_table_ddl(mt: MaterializedTable) -> str:
+    columns = "".join(f", {column.name} {kind}" for _, kind, column in mt.slots)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {mt.name} "
+        f"(id uuid PRIMARY KEY{columns}, extra jsonb NOT NULL DEFAULT '{{}}'::jsonb, "
+        f"row_version bigint NOT NULL DEFAULT 0)"
+    )
+
+def sync_ddl(mt: MaterializedTable) -> list[str]:
+    """ Índice por versión y triggers de versión y lápidas (sync.py); la tabla aún está vacía """
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_mat_{_hex(mt.class_id)}_row_version ON {mt.name} (row_version)",
+        *sync.table_trigger_ddl(mt.name, "data", str(mt.class_id)),
+    ]
+
+def comment_column_ddl(class_id, attribute) -> str:
+    return f"COMMENT ON COLUMN {table_name(class_id)}.{column_name(attribute.id)} IS {_quote_literal(attribute.name)}"
+
+def column_index_ddl(class_id, attribute) -> str | None:
+    if column_type(attribute.data_type) == "jsonb":
+        return None
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {column_index_name(attribute.id)} "
+        f"ON {table_name(class_id)} ({column_name(attribute.id)})"
+    )
+
+def _trigger_names(class_id) -> tuple[str, str]:
+    return f"kinro_capture_{_hex(class_id)}_w", f"kinro_capture_{_hex(class_id)}_d"
+
+def capture_trigger_ddl(class_id) -> list[str]:
+    """ Registra en materialize_changes cada fila de la clase escrita en data durante la migración """
+    writes, deletes = _trigger_names(class_id)
+    class_literal = _quote_literal(str(uuid.UUID(str(class_id))))
+    return [
+        *drop_capture_trigger_ddl(class_id),
+        f"CREATE TRIGGER {writes} AFTER INSERT OR UPDATE ON data FOR EACH ROW "
+        f"WHEN (NEW.class_id = {class_literal}) EXECUTE FUNCTION kinro_capture_data_change()",
+        f"CREATE TRIGGER {deletes} AFTER DELETE ON data FOR EACH ROW "
+        f"WHEN (OLD.class_id = {class_literal}) EXECUTE FUNCTION kinro_capture_data_change()",
+    ]
+
+def drop_capture_trigger_ddl(class_id) -> list[str]:
+    return [f"DROP TRIGGER IF EXISTS {name} ON data" for name in _trigger_names(class_id)]
+
+async def _execute(db: AsyncSession, *statements: str):
+    for statement in statements:
+        await db.execute(text(statement))
+
+async def ensure_catalog():
+    """ Crea materialized_classes y materialize_changes en bases creadas antes de este módulo """
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            MaterializedClass.metadata.create_all,
+            tables=[MaterializedClass.__table__, MaterializeChange.__table__],
+        )
+
+# ✅ Migración desde data.content (pasos de jobs.submit_materialization)
+
+async def start_migration(db: AsyncSession, class_id, attributes) -> MaterializedTable:
+    """
+    Crea la tabla vacía y el trigger de captura y registra la clase como
+    "migrating". Si una migración anterior quedó a medias, empieza de cero.
+    El llamador confirma la transacción.
+    """
+    mt = table_for(class_id, attributes)
+    await _execute(db, CAPTURE_FUNCTION_DDL, create_table_ddl(mt), f"TRUNCATE {mt.name}", *sync_ddl(mt))
+    await _execute(db, *[comment_column_ddl(class_id, a) for a in attributes])
+    await _execute(db, *capture_trigger_ddl(class_id))
+    await db.execute(delete(MaterializeChange).where(MaterializeChange.class_id == mt.class_id))
+    await db.execute(
+        pg_insert(MaterializedClass)
+        .values(class_id=mt.class_id, table_name=mt.name, state=MIGRATING)
+        .on_conflict_do_update(index_elements=["class_id"], set_={"state": MIGRATING})
+    )
+    return mt
+
+async def copy_chunk(db: AsyncSession, mt: MaterializedTable, after_id=None, limit: int | None = None):
+    """ Copia el siguiente bloque de filas de data (por id) a la tabla. Devuelve (filas, último id) """
+    stmt = (
+        select(Data.id, Data.content)
+        .where(query.class_scope(mt.class_id))
+        .order_by(Data.id)
+        .limit(limit or config.MATERIALIZE_CHUNK_SIZE)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Data.id > after_id)
+    rows = (await db.execute(stmt)).all()
+    if rows:
+        await bulk.copy_records(db, mt.name, [mt.to_record(r.id, r.content) for r in rows], mt.copy_columns)
+    return len(rows), rows[-1].id if rows else None
+
+def _ids_param(ids):
+    return literal(list(ids), ARRAY(UUID(as_uuid=True)))
+
+async def drain_changes(db: AsyncSession, mt: MaterializedTable, limit: int | None = None) -> int:
+    """ Vuelve a copiar desde data las filas capturadas por el trigger (o las borra si ya no existen) """
+    pending = (
+        select(MaterializeChange.data_id)
+        .where(MaterializeChange.class_id == mt.class_id)
+        .limit(limit or config.MATERIALIZE_CHUNK_SIZE)
+    )
+    result = await db.execute(
+        delete(MaterializeChange)
+        .where(MaterializeChange.class_id == mt.class_id, MaterializeChange.data_id.in_(pending.scalar_subquery()))
+        .returning(MaterializeChange.data_id)
+        .execution_options(synchronize_session=False)
+    )
+    ids = result.scalars().all()
+    if not ids:
+        return 0
+    # Se vuelven a copiar: no son eliminaciones (las reales ya dejaron su lápida en data)
+    await db.execute(text(sync.SKIP_TOMBSTONES))
+    await db.execute(delete(mt.table).where(mt.id == any_(_ids_param(ids))))
+    rows = (await db.execute(select(Data.id, Data.content).where(Data.id == any_(_ids_param(ids))))).all()
+    if rows:
+        await bulk.copy_records(db, mt.name, [mt.to_record(r.id, r.content) for r in rows], mt.copy_columns)
+    return len(ids)
+
+async def mark_ready(db: AsyncSession, class_id):
+    await db.execute(
+        update(MaterializedClass)
+        .where(MaterializedClass.class_id == class_id)
+        .values(state=READY)
+    )
+
+async def stop_capture(db: AsyncSession, class_id):
+    await _execute(db, *drop_capture_trigger_ddl(class_id))
+
+async def drop_storage(db: AsyncSession, class_id):
+    """ Elimina tabla, triggers y registro (migración cancelada o clase eliminada) """
+    await _execute(db, *drop_capture_trigger_ddl(class_id), f"DROP TABLE IF EXISTS {table_name(class_id)}")
+    await db.execute(delete(MaterializeChange).where(MaterializeChange.class_id == class_id))
+    await db.execute(delete(MaterializedClass).where(MaterializedClass.class_id == class_id))
+
+def schedule_column_indexes(class_id, attributes):
+    statements = [ddl for ddl in (column_index_ddl(class_id, a) for a in attributes) if ddl]
+    if statements:
+        indexes.schedule(indexes.execute_ddl(*statements))
+
+# ✅ Cambios de atributos en una clase materializada
+
+async def alter_for_attribute(db: AsyncSession, class_id, previous, current) -> bool:
+    """
+    DDL para un atributo creado (previous=None), modificado o eliminado
+    (current=None), en la transacción del cambio. Devuelve True si hay que
+    mover valores de extra a la columna después (ver finish_attribute_change).
+    """
+    table = table_name(class_id)
+    if current is None:
+        # El índice de la columna desaparece con ella
+        await _execute(db, f"ALTER TABLE {table} DROP COLUMN IF EXISTS {column_name(previous.id)}")
+        return False
+    column = column_name(current.id)
+    kind = column_type(current.data_type)
+    if previous is None:
+        await _execute(db, f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {kind}", comment_column_ddl(class_id, current))
+        return True
+
+    renormalize = False
+    if previous.name != current.name:
+        # Los valores que estaban en extra con el nombre anterior pasan al nuevo
+        await db.execute(
+            text(
+                f"UPDATE {table} SET extra = (extra - :old) || jsonb_build_object(:new, extra -> :old) "
+                f"WHERE extra ? :old"
+            ).bindparams(old=previous.name, new=current.name)
+        )
+    if column_type(previous.data_type) != kind:
+        # Se conservan los valores en extra y se recrea la columna con el tipo nuevo
+        await db.execute(
+            text(
+                f"UPDATE {table} SET extra = extra || jsonb_build_object(:name, {column}) "
+                f"WHERE {column} IS NOT NULL"
+            ).bindparams(name=current.name)
+        )
+        await _execute(
+            db,
+            f"ALTER TABLE {table} DROP COLUMN {column}",
+            f"ALTER TABLE {table} ADD COLUMN {column} {kind}",
+        )
+        renormalize = True
+    await _execute(db, comment_column_ddl(class_id, current))
+    return renormalize
+
+async def finish_attribute_change(class_id, attribute_id, renormalize: bool):
+    """
+    En segundo plano: mueve a la columna los valores de extra que ahora encajan
+    (por bloques, un commit por bloque) y crea su índice.
+    """
+    async with long_session() as db:
+        attributes = (await db.execute(select(Attribute).where(Attribute.class_id == class_id))).scalars().all()
+        attribute = next((a for a in attributes if str(a.id) == str(attribute_id)), None)
+        if attribute is None:
+            return
+        mt = table_for(class_id, attributes)
+        if renormalize:
+            await _renormalize(db, mt, attribute)
+    ddl = column_index_ddl(class_id, attribute)
+    if ddl:
+        await indexes.execute_ddl(ddl)
+
+async def _renormalize(db: AsyncSession, mt: MaterializedTable, attribute):
+    name = attribute.name
+    kind = mt.types[name]
+    column = mt.columns[name]
+    stmt = (
+        update(mt.table)
+        .where(mt.id == bindparam("row_id"))
+        .values({column.name: bindparam("row_value"), "extra": mt.extra.op("-")(query.inline(name))})
+    )
+    last_id = None
+    while True:
+        batch = select(mt.id, mt.extra[name]).where(mt.extra.has_key(query.inline(name)))
+        if last_id is not None:
+            batch = batch.where(mt.id > last_id)
+        rows = (await db.execute(batch.order_by(mt.id).limit(config.MATERIALIZE_CHUNK_SIZE))).all()
+        if not rows:
+            return
+        params = []
+        for row_id, value in rows:
+            converted = to_column_value(value, kind)
+            if converted is not _UNCONVERTIBLE:
+                params.append({"row_id": row_id, "row_value": converted})
+        if params:
+            await db.execute(stmt, params)
+        await db.commit()
+        last_id = rows[-1][0]
+
+# ✅ Filas (CRUD transparente sobre la tabla)
+
+def select_rows(mt: MaterializedTable):
+    return select(*mt.row_columns())
+
+async def insert_row(db: AsyncSession, mt: MaterializedTable, content: dict) -> dict:
+    params = mt.to_params(content)
+    result = await db.execute(
+        insert(mt.table).values(id=uuid.uuid4(), **params).returning(*mt.row_columns())
+    )
+    return dict(result.one()._mapping)
+
+async def copy_rows(db: AsyncSession, mt: MaterializedTable, contents: list[dict]) -> int:
+    records = [mt.to_record(uuid.uuid4(), content) for content in contents]
+    await bulk.copy_records(db, mt.name, records, mt.copy_columns)
+    return len(records)
+
+async def replace_row(db: AsyncSession, mt: MaterializedTable, data_id, content: dict) -> dict | None:
+    result = await db.execute(
+        update(mt.table).where(mt.id == data_id).values(**mt.to_params(content)).returning(*mt.row_columns())
+    )
+    row = result.first()
+    return dict(row._mapping) if row else None
+
+async def patch_rows(db: AsyncSession, mt: MaterializedTable, patches: dict) -> set:
+    """ Merge-patch por id: se lee el content, se combina y se vuelve a repartir en columnas """
+    rows = (await db.execute(
+        select(mt.id, mt.content_expression()).where(mt.id == any_(_ids_param(patches)))
+    )).all()
+    if not rows:
+        return set()
+    stmt = (
+        update(mt.table)
+        .where(mt.id == bindparam("row_id"))
+        .values({name: bindparam(f"p_{name}") for name in mt.copy_columns if name != "id"})
+    )
+    params = []
+    for row_id, content in rows:
+        merged = {**content, **patches[row_id]}
+        merged = {key: value for key, value in merged.items() if value is not None}
+        values = mt.to_params(merged)
+        params.append({"row_id": row_id, **{f"p_{name}": value for name, value in values.items()}})
+    await db.execute(stmt, params)
+    return {row_id for row_id, _ in rows}
+
+async def update_where(db: AsyncSession, mt: MaterializedTable, changes: dict, conditions: list) -> int:
+    """ Asigna valores a atributos con un único UPDATE; los que no encajan en su tipo van a extra """
+    values = {}
+    removed = []
+    unconvertible = {}
+    for key, value in changes.items():
+        converted = to_column_value(value, mt.types[key])
+        removed.append(key)
+        if converted is _UNCONVERTIBLE:
+            unconvertible[key] = value
+            converted = None
+        values[mt.columns[key].name] = converted
+    extra = mt.extra.op("-")(literal(removed, ARRAY(Text)))
+    if unconvertible:
+        extra = extra.op("||")(literal(unconvertible, JSONB))
+    values["extra"] = extra
+    result = await db.execute(update(mt.table).where(*conditions).values(values))
+    return result.rowcount
+
+async def delete_rows(db: AsyncSession, mt: MaterializedTable, ids) -> int:
+    result = await db.execute(delete(mt.table).where(mt.id == any_(_ids_param(ids))))
+    return result.rowcount
+
+async def delete_row(db: AsyncSession, mt: MaterializedTable, data_id) -> dict | None:
+    result = await db.execute(delete(mt.table).where(mt.id == data_id).returning(*mt.row_columns()))
+    row = result.first()
+    return dict(row._mapping) if row else None
+
+async def find_row(db: AsyncSession, tables: list, data_id):
+    """ Busca un id en las tablas materializadas: (tabla, fila) o (None, None) """
+    for mt in tables:
+        row = (await db.execute(select_rows(mt).where(mt.id == data_id))).first()
+        if row:
+            return mt, dict(row._mapping)
+    return None, None
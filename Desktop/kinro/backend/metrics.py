@@ -0,0 +1,273 @@
+# backend/metrics.py
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from backend import config
+
+logger = logging.getLogger(__name__)
+
+# Métricas de este proceso en formato de texto de Prometheus (GET /metrics).
+# Con varios procesos de uvicorn cada uno expone las suyas: Prometheus las
+# distingue por instancia y se suman en la consulta.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# ✅ Tipos de métricas
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+            for labels, value in self._values.items()
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # [cuenta por cubo..., suma, total]
+                series = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, series in self._values.items():
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                le = _labels(self.label_names, labels, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+# ✅ Registro
+
+REQUESTS = Counter("kinro_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status"))
+REQUEST_DURATION = Histogram(
+    "kinro_http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "route"),
+)
+RESPONSE_SIZE = Histogram(
+    "kinro_http_response_size_bytes", "Tamaño del cuerpo de las respuestas", ("method", "route"), SIZE_BUCKETS,
+)
+IN_FLIGHT = Gauge("kinro_http_requests_in_flight", "Peticiones HTTP en curso")
+SQL_DURATION = Histogram("kinro_sql_query_duration_seconds", "Duración de las sentencias SQL", ("engine",), SQL_BUCKETS)
+SQL_SLOW = Counter("kinro_sql_slow_queries_total", "Sentencias más lentas que METRICS_SLOW_QUERY_MS", ("engine",))
+QUERIES_PER_REQUEST = Histogram(
+    "kinro_sql_queries_per_request", "Sentencias SQL por petición (N+1)", ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+SQL_PER_REQUEST = Histogram(
+    "kinro_sql_seconds_per_request", "Tiempo total en SQL por petición", ("method", "route"),
+)
+
+METRICS = [REQUESTS, REQUEST_DURATION, RESPONSE_SIZE, IN_FLIGHT, SQL_DURATION, SQL_SLOW, QUERIES_PER_REQUEST, SQL_PER_REQUEST]
+
+# Funciones que devuelven métricas ya calculadas en otros módulos (pool, caché, feed)
+_collectors: list = []
+
+def register_collector(collect):
+    """ collect() devuelve [(nombre, tipo, ayuda, {etiquetas}, valor), ...] """
+    _collectors.append(collect)
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            samples = collect()
+        except Exception:
+            logger.exception("Error al recoger métricas")
+            continue
+        described = set()
+        for name, kind, help, labels, value in samples:
+            if value is None:
+                continue
+            if name not in described:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                described.add(name)
+            lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+# ✅ Estadísticas SQL de la petición en curso
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    sql_seconds: float = 0.0
+    slow: list = field(default_factory=list)
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("kinro_request_stats", default=None)
+
+# Últimas sentencias lentas de este proceso (GET /monitoring/slow-queries)
+slow_queries: deque = deque(maxlen=config.METRICS_SLOW_QUERY_LOG_SIZE)
+
+def _statement(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= 2000 else statement[:2000] + "…"
+
+def instrument_engine(engine, name: str):
+    """ Cuenta y cronometra cada sentencia del engine (las de COPY van por asyncpg directamente) """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("kinro_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["kinro_query_started"].pop()
+        SQL_DURATION.observe(elapsed, name)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+        if elapsed * 1000 >= config.METRICS_SLOW_QUERY_MS:
+            SQL_SLOW.inc(name)
+            entry = {
+                "engine": name,
+                "ms": round(elapsed * 1000, 2),
+                "statement": _statement(statement),
+                "executemany": executemany,
+                "at": time.time(),
+            }
+            slow_queries.append(entry)
+            if stats is not None:
+                stats.slow.append(entry)
+            logger.warning(f"🐢 Sentencia lenta ({entry['ms']} ms, {name}): {entry['statement']}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        # La sentencia falló: after_cursor_execute no llega a ejecutarse
+        started = context.connection.info.get("kinro_query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+# ✅ Middleware
+
+PROFILE_HEADER = "x-kinro-profile"
+
+def _route(scope) -> str:
+    # La plantilla de la ruta ("/data/{data_id}"), no la URL, para no disparar la cardinalidad
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: duración, tamaño de respuesta y sentencias SQL por ruta.
+    Con METRICS_PROFILING=True, una petición con la cabecera X-Kinro-Profile
+    recibe el desglose en Server-Timing y X-Kinro-Profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        profile = config.METRICS_PROFILING and any(name == PROFILE_HEADER.encode() for name, _ in scope["headers"])
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile:
+                    message["headers"] = list(message.get("headers", [])) + profile_headers(stats)
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            _current.reset(token)
+            elapsed = time.perf_counter() - stats.started
+            method, route = scope["method"], _route(scope)
+            REQUESTS.inc(method, route, str(status))
+            REQUEST_DURATION.observe(elapsed, method, route)
+            RESPONSE_SIZE.observe(size, method, route)
+            QUERIES_PER_REQUEST.observe(stats.queries, method, route)
+            SQL_PER_REQUEST.observe(stats.sql_seconds, method, route)
+
+def profile_headers(stats: RequestStats) -> list[tuple[bytes, bytes]]:
+    """ Desglose hasta el inicio de la respuesta (en las respuestas en streaming, sin el cuerpo) """
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    sql_ms = stats.sql_seconds * 1000
+    server_timing = (
+        f'total;dur={total_ms:.2f}, sql;dur={sql_ms:.2f};desc="{stats.queries} queries", '
+        f"app;dur={max(total_ms - sql_ms, 0):.2f}"
+    )
+    profile = f"total_ms={total_ms:.2f}; sql_ms={sql_ms:.2f}; queries={stats.queries}; slow={len(stats.slow)}"
+    return [(b"server-timing", server_timing.encode()), (PROFILE_HEADER.encode(), profile.encode())]
@@ -1,19 +1,34 @@
 # backend/models.py
-from sqlalchemy import Column, String, ForeignKey, Enum, Float
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, String, ForeignKey, Enum, Float, Identity, Index, Sequence, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB  # Cambiar a JSONB
 from sqlalchemy.orm import relationship, declarative_base
 import uuid
 
 Base = declarative_base()
 
+# ✅ Versión de fila para la sincronización incremental (ver sync.py)
+# Un trigger BEFORE INSERT OR UPDATE asigna nextval de esta secuencia en cada escritura
+ROW_VERSION_SEQ = Sequence("kinro_row_version_seq", metadata=Base.metadata)
+
+def row_version_column():
+    return Column(BigInteger, nullable=False, server_default="0")
+
 class ClassModel(Base):
     __tablename__ = "class_models"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
     position_x = Column(Float, default=0.0)
     position_y = Column(Float, default=0.0)
-    attributes = relationship("Attribute", back_populates="class_model", cascade="all, delete-orphan", lazy="selectin")
-    data_entries = relationship("Data", back_populates="class_model", cascade="all, delete-orphan", lazy="selectin")
+    # Marcada por crud.delete_class mientras se purgan sus filas: ya no se muestra
+    deleting = Column(Boolean, nullable=False, server_default="false")
+    row_version = row_version_column()
+    # Ninguna relación se carga implícitamente: cada consulta declara su perfil
+    # de carga (ver crud.CLASS_DIAGRAM_LOAD / CLASS_FULL_LOAD). Los hijos que no
+    # estén cargados los borra la base de datos con ON DELETE CASCADE.
+    attributes = relationship("Attribute", back_populates="class_model", cascade="all, delete-orphan", lazy="raise", passive_deletes=True, order_by="Attribute.position")
+    data_entries = relationship("Data", back_populates="class_model", cascade="all, delete-orphan", lazy="raise", passive_deletes=True)
+
+    __table_args__ = (Index("ix_class_models_row_version", "row_version"),)
 
 class Attribute(Base):
     __tablename__ = "attributes"
@@ -21,8 +36,13 @@ class Attribute(Base):
     name = Column(String, nullable=False)
     data_type = Column(String, nullable=False)
     class_id = Column(UUID(as_uuid=True), ForeignKey("class_models.id", ondelete="CASCADE"), nullable=False)
-    class_model = relationship("ClassModel", back_populates="attributes", lazy="selectin")
-    properties = relationship("Property", back_populates="attribute", cascade="all, delete-orphan", lazy="selectin")
+    # Orden de creación: orden estable de los atributos (columnas de la exportación)
+    position = Column(BigInteger, Identity(), nullable=False)
+    row_version = row_version_column()
+    class_model = relationship("ClassModel", back_populates="attributes", lazy="raise")
+    properties = relationship("Property", back_populates="attribute", cascade="all, delete-orphan", lazy="raise", passive_deletes=True)
+
+    __table_args__ = (Index("ix_attributes_row_version", "row_version"),)
 
 class Property(Base):
     __tablename__ = "properties"
@@ -30,25 +50,76 @@ class Property(Base):
     attribute_id = Column(UUID(as_uuid=True), ForeignKey("attributes.id", ondelete="CASCADE"), nullable=False)
     name = Column(String, nullable=False)
     value = Column(String, nullable=False)
-    attribute = relationship("Attribute", back_populates="properties", lazy="selectin")
+    row_version = row_version_column()
+    attribute = relationship("Attribute", back_populates="properties", lazy="raise")
+
+    __table_args__ = (Index("ix_properties_row_version", "row_version"),)
 
 class Data(Base):
     __tablename__ = "data"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     class_id = Column(UUID(as_uuid=True), ForeignKey("class_models.id", ondelete="CASCADE"), nullable=False)
     content = Column(JSONB, nullable=False)  # Cambiado a JSONB
+    row_version = row_version_column()
+
+    class_model = relationship("ClassModel", back_populates="data_entries", lazy="raise")
 
-    class_model = relationship("ClassModel", back_populates="data_entries", lazy="selectin")
+    __table_args__ = (
+        # Índice para la paginación por cursor: WHERE class_id = ? ORDER BY id
+        Index("ix_data_class_id_id", "class_id", "id"),
+        # Cambios desde una versión: WHERE row_version > ? ORDER BY row_version
+        Index("ix_data_row_version", "row_version"),
+    )
 
 class Connection(Base):
     __tablename__ = "connections"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    source_class = Column(UUID(as_uuid=True), ForeignKey("class_models.id"))
-    target_class = Column(UUID(as_uuid=True), ForeignKey("class_models.id"))
+    source_class = Column(UUID(as_uuid=True), ForeignKey("class_models.id", ondelete="CASCADE"))
+    target_class = Column(UUID(as_uuid=True), ForeignKey("class_models.id", ondelete="CASCADE"))
     relationship_type = Column(
     Enum("1-1", "1-N", "N-N", name="relationship_types", create_type=True), 
     nullable=False
 )
+    # Atributos que unen las filas de ambas clases (opcionales, ver crud.traverse_data)
+    source_attribute = Column(UUID(as_uuid=True), ForeignKey("attributes.id", ondelete="SET NULL"))
+    target_attribute = Column(UUID(as_uuid=True), ForeignKey("attributes.id", ondelete="SET NULL"))
+    row_version = row_version_column()
+
+    __table_args__ = (Index("ix_connections_row_version", "row_version"),)
+
+# Filas eliminadas (las registra un trigger AFTER DELETE, también en los borrados en cascada)
+class Tombstone(Base):
+    __tablename__ = "sync_tombstones"
+    row_version = Column(BigInteger, primary_key=True)
+    entity = Column(String, nullable=False)  # "class" | "attribute" | "property" | "connection" | "data"
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    class_id = Column(UUID(as_uuid=True))
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Última eliminación de cada entidad (versión del modelo en /graph)
+    __table_args__ = (Index("ix_sync_tombstones_entity_version", "entity", "row_version"),)
+
+# Versión hasta la que se han purgado las lápidas: un cliente más antiguo debe recargar todo
+class SyncState(Base):
+    __tablename__ = "sync_state"
+    id = Column(String, primary_key=True, default="tombstones")
+    pruned_through = Column(BigInteger, nullable=False, server_default="0")
+
+# Clases almacenadas en una tabla tipada propia en lugar de data.content (ver materialize.py)
+STORAGE_MIGRATING = "migrating"
+STORAGE_READY = "ready"
+
+class MaterializedClass(Base):
+    __tablename__ = "materialized_classes"
+    class_id = Column(UUID(as_uuid=True), ForeignKey("class_models.id", ondelete="CASCADE"), primary_key=True)
+    table_name = Column(String, nullable=False)
+    state = Column(String, nullable=False)  # STORAGE_MIGRATING | STORAGE_READY
+
+# Filas de data modificadas durante una migración, registradas por trigger
+class MaterializeChange(Base):
+    __tablename__ = "materialize_changes"
+    class_id = Column(UUID(as_uuid=True), primary_key=True)
+    data_id = Column(UUID(as_uuid=True), primary_key=True)
 
 print("🔹 Tablas detectadas por SQLAlchemy:")
 for table_name in Base.metadata.tables.keys():
@@ -0,0 +1,137 @@
+# backend/notifications.py
+import asyncio
+import json
+import logging
+import uuid
+
+import asyncpg
+
+from backend.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Identifica a este proceso para ignorar sus propios mensajes
+ORIGIN = uuid.uuid4().hex
+RECONNECT_MAX_DELAY = 30
+# NOTIFY pendientes de enviar; si se llena (sin conexión durante mucho tiempo) se descartan
+SEND_QUEUE_SIZE = 10000
+
+# ✅ Conexión LISTEN compartida por proceso
+
+_handlers: dict[str, list] = {}
+_reconnect_handlers: list = []
+_connection: asyncpg.Connection | None = None
+_reconnect_task: asyncio.Task | None = None
+_send_queue: asyncio.Queue | None = None
+_sender_task: asyncio.Task | None = None
+_stopping = False
+
+def subscribe(channel: str, handler, on_reconnect=None):
+    """
+    Registra handler(payload: dict) para un canal. on_reconnect se llama tras
+    recuperar la conexión, porque los mensajes intermedios se han perdido.
+    """
+    _handlers.setdefault(channel, []).append(handler)
+    if on_reconnect is not None:
+        _reconnect_handlers.append(on_reconnect)
+
+def _dsn() -> str:
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+def _dispatch(connection, pid, channel: str, raw: str):
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        logger.warning(f"Notificación no válida en {channel}: {raw[:200]}")
+        return
+    if message.get("origin") == ORIGIN:
+        return
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(message.get("payload", {}))
+        except Exception:
+            logger.exception(f"Error al procesar una notificación de {channel}")
+
+def _on_terminated(connection):
+    global _connection, _reconnect_task
+    _connection = None
+    if not _stopping and (_reconnect_task is None or _reconnect_task.done()):
+        logger.warning("Conexión LISTEN perdida, reintentando...")
+        _reconnect_task = asyncio.create_task(_connect(reconnecting=True))
+
+async def _connect(reconnecting: bool = False):
+    global _connection
+    delay = 1
+    while not _stopping:
+        try:
+            connection = await asyncpg.connect(_dsn())
+            for channel in _handlers:
+                await connection.add_listener(channel, _dispatch)
+            connection.add_termination_listener(_on_terminated)
+            _connection = connection
+            logger.info(f"🔔 Escuchando canales: {', '.join(_handlers) or '-'}")
+            if reconnecting:
+                for handler in _reconnect_handlers:
+                    handler()
+            return
+        except (OSError, asyncpg.PostgresError) as e:
+            logger.warning(f"No se pudo abrir la conexión LISTEN ({e}); nuevo intento en {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+async def start():
+    """ Abre la conexión LISTEN si hay canales suscritos y arranca el envío de NOTIFY """
+    global _stopping, _reconnect_task, _sender_task
+    _stopping = False
+    if _handlers:
+        _reconnect_task = asyncio.create_task(_connect())
+    _sender_task = asyncio.create_task(_sender())
+
+async def stop():
+    global _stopping, _connection
+    _stopping = True
+    if _reconnect_task is not None:
+        _reconnect_task.cancel()
+    if _sender_task is not None:
+        _sender_task.cancel()
+    if _connection is not None:
+        await _connection.close()
+        _connection = None
+
+# ✅ Publicación
+
+def connected() -> bool:
+    return _connection is not None
+
+async def _send(channel: str, message: str):
+    if _connection is None:
+        logger.warning(f"Sin conexión LISTEN: notificación de {channel} descartada")
+        return
+    await _connection.execute("SELECT pg_notify($1, $2)", channel, message)
+
+def _queue() -> asyncio.Queue:
+    global _send_queue
+    if _send_queue is None:
+        _send_queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+    return _send_queue
+
+async def _sender():
+    """
+    Única tarea que envía por la conexión compartida: asyncpg no admite dos
+    operaciones a la vez en la misma conexión.
+    """
+    queue = _queue()
+    while True:
+        channel, message = await queue.get()
+        try:
+            await _send(channel, message)
+        except Exception:
+            logger.exception(f"Error al enviar una notificación de {channel}")
+
+def publish(channel: str, payload: dict):
+    """ NOTIFY en segundo plano por la conexión compartida (no ocupa el pool), en orden """
+    message = json.dumps({"origin": ORIGIN, "payload": payload}, default=str)
+    try:
+        _queue().put_nowait((channel, message))
+    except asyncio.QueueFull:
+        logger.warning(f"Cola de notificaciones llena: notificación de {channel} descartada")
@@ -0,0 +1,159 @@
+# backend/parsing.py
+# Funciones que se ejecutan en el pool de procesos de ingest.py.
+# No importa nada de backend: en Windows los procesos hijos se crean con
+# "spawn" y reimportan este módulo, que debe ser ligero y sin efectos.
+import csv
+import io
+import os
+from datetime import date, datetime, time
+
+# Bytes leídos por iteración al buscar límites de registro
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+# ✅ Encabezados
+
+def normalize_header(header) -> str:
+    return " ".join(str(header).split()).casefold() if header is not None else ""
+
+def build_header_map(headers: list, attribute_names: list[str]) -> list[tuple[int, str]]:
+    """
+    Relaciona cada columna del archivo con un atributo de la clase:
+    primero por nombre exacto y luego ignorando mayúsculas y espacios.
+    Las columnas sin atributo se descartan (igual que hacía el frontend).
+    """
+    exact = set(attribute_names)
+    normalized = {normalize_header(name): name for name in attribute_names}
+    mapping = []
+    for index, header in enumerate(headers):
+        if header in exact:
+            mapping.append((index, header))
+        elif normalize_header(header) in normalized:
+            mapping.append((index, normalized[normalize_header(header)]))
+    return mapping
+
+# ✅ Celdas
+
+def cell_to_text(value) -> str:
+    """ Convierte una celda de Excel a texto como lo hacía UploadExcelModal """
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if value.time() == time(0, 0):
+            return value.date().isoformat()
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def rows_to_contents(rows, header_map: list[tuple[int, str]]) -> list[dict]:
+    """ Convierte filas (listas de celdas) en diccionarios content, omitiendo filas vacías """
+    contents = []
+    for row in rows:
+        if not any(cell not in (None, "") for cell in row):
+            continue
+        contents.append({
+            name: (row[index] if index < len(row) else "")
+            for index, name in header_map
+        })
+    return contents
+
+# ✅ CSV por rangos de bytes
+
+def read_csv_header(path: str, encoding: str = "utf-8-sig") -> tuple[list[str], int]:
+    """ Devuelve los encabezados y el offset en bytes donde empiezan los datos """
+    with open(path, "rb") as f:
+        offset = _next_record_start(f, 0, 0)
+        f.seek(0)
+        header_bytes = f.read(offset)
+    headers = next(csv.reader(io.StringIO(header_bytes.decode(encoding))), [])
+    return headers, offset
+
+def _next_record_start(f, position: int, quotes_before: int) -> int:
+    """
+    Primer offset >= position que empieza un registro. Un salto de línea
+    termina un registro sólo si el número de comillas anteriores es par
+    (las comillas escapadas van duplicadas, así que la paridad se mantiene).
+    """
+    f.seek(position)
+    quotes = quotes_before
+    while True:
+        block = f.read(SCAN_BLOCK_SIZE)
+        if not block:
+            return position
+        start = 0
+        while True:
+            newline = block.find(b"\n", start)
+            if newline == -1:
+                quotes += block.count(b'"', start)
+                break
+            quotes += block.count(b'"', start, newline)
+            if quotes % 2 == 0:
+                return position + newline + 1
+            start = newline + 1
+        position += len(block)
+
+def split_csv_ranges(path: str, data_start: int, range_size: int) -> list[tuple[int, int]]:
+    """ Divide el archivo en rangos de ~range_size bytes alineados a registros completos """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = data_start
+        while start < size:
+            target = min(start + range_size, size)
+            # Comillas entre el inicio del rango y el objetivo, para conocer la paridad
+            f.seek(start)
+            quotes = f.read(target - start).count(b'"') % 2
+            end = _next_record_start(f, target, quotes) if target < size else size
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def parse_csv_range(
+    path: str,
+    start: int,
+    end: int,
+    header_map: list[tuple[int, str]],
+    encoding: str = "utf-8-sig",
+) -> list[dict]:
+    """ Tarea del pool: parsea un rango de registros CSV y devuelve los content """
+    with open(path, "rb") as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    return rows_to_contents(csv.reader(io.StringIO(raw.decode(encoding))), header_map)
+
+def detect_encoding(path: str) -> str:
+    """ UTF-8 (con o sin BOM) si el inicio del archivo es válido; si no, Latin-1 (CSV de Excel) """
+    with open(path, "rb") as f:
+        sample = f.read(SCAN_BLOCK_SIZE)
+    try:
+        sample.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # Un carácter multibyte cortado al final de la muestra no cuenta como error
+        if e.start >= len(sample) - 3:
+            return "utf-8-sig"
+        return "latin-1"
+
+# ✅ Excel
+
+def xlsx_to_csv(source: str, target: str) -> int:
+    """
+    Tarea del pool: vuelca la primera hoja a CSV en modo read-only (memoria
+    acotada) para poder parsearla después en paralelo por rangos.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = 0
+        with open(target, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            for row in sheet.iter_rows(values_only=True):
+                writer.writerow([cell_to_text(cell) for cell in row])
+                rows += 1
+        return rows
+    finally:
+        workbook.close()
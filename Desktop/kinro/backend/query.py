@@ -0,0 +1,240 @@
+# backend/query.py
+import base64
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    Boolean, Numeric, Text, and_, bindparam, case, cast, column, func, literal_column, or_, select,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from backend.models import Data
+
+# ✅ Expresiones tipadas sobre Data.content
+
+# Expresiones regulares que protegen los casts: los valores llegan como texto
+# desde Excel y un cast directo fallaría con celdas vacías o mal formadas.
+# Sin barras invertidas: el mismo texto debe renderizarse igual en el DDL de
+# los índices y en las consultas, sea cual sea standard_conforming_strings.
+NUMERIC_PATTERN = r"^[[:space:]]*-?[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?[[:space:]]*$"
+DATE_PATTERN = r"^[0-9]{4}-[0-9]{2}-[0-9]{2}"
+BOOLEAN_PATTERN = r"^(true|false|t|f|1|0|yes|no|on|off)$"
+
+NUMERIC_TYPES = {"integer", "float"}
+# Tipos que se indexan con btree sobre el valor convertido (rangos, IN, orden)
+TYPED_INDEX_TYPES = NUMERIC_TYPES | {"boolean", "date"}
+# Tipos que se indexan con btree text_pattern_ops (igualdad y prefijo)
+TEXT_INDEX_TYPES = {"text", "uuid"}
+
+
+def inline(value: str) -> ColumnElement:
+    """
+    Literal renderizado en el SQL (no como parámetro), para que el planner
+    pueda emparejar la expresión con los índices de expresión sobre content.
+    """
+    return bindparam(None, value, type_=Text, literal_execute=True)
+
+
+def content_text(key: str, content: ColumnElement = Data.content) -> ColumnElement:
+    """ Valor de una clave de content como texto (content->>'key') """
+    return content.op("->>", return_type=Text)(inline(key))
+
+
+def typed_value(key: str, data_type: str, content: ColumnElement = Data.content) -> ColumnElement:
+    """
+    Valor de una clave de content convertido según Attribute.data_type.
+    Los valores que no cumplen el formato se tratan como NULL.
+    Las fechas se comparan como texto ISO (orden lexicográfico = cronológico),
+    así la expresión es IMMUTABLE y se puede indexar.
+    """
+    raw = content_text(key, content)
+    if data_type in NUMERIC_TYPES:
+        return case((raw.op("~")(inline(NUMERIC_PATTERN)), cast(raw, Numeric)), else_=None)
+    if data_type == "boolean":
+        return case((raw.op("~*")(inline(BOOLEAN_PATTERN)), cast(raw, Boolean)), else_=None)
+    if data_type == "date":
+        return case((raw.op("~")(inline(DATE_PATTERN)), raw), else_=None)
+    return raw
+
+
+def class_uuid(class_id) -> uuid.UUID:
+    """ El id de una clase como UUID (400 si no lo es) """
+    try:
+        return class_id if isinstance(class_id, uuid.UUID) else uuid.UUID(str(class_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Identificador de clase no válido")
+
+def class_scope(class_id) -> ColumnElement:
+    """
+    Data.class_id = '<uuid>' con el id renderizado en el SQL: los índices por
+    atributo son parciales (WHERE class_id = ...) y el planner sólo los usa si
+    puede probar el predicado con un literal.
+    """
+    return Data.class_id == bindparam(None, class_uuid(class_id), type_=UUID(as_uuid=True), literal_execute=True)
+
+
+def coerce_value(value, data_type: str):
+    """ Convierte un valor recibido (query string, cursor) al tipo del atributo """
+    if value is None:
+        return None
+    if data_type in NUMERIC_TYPES:
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            raise HTTPException(status_code=400, detail=f"Valor numérico no válido: {value}")
+    if data_type == "boolean":
+        if isinstance(value, bool):
+            return value
+        lowered = str(value).strip().lower()
+        if lowered in ("true", "t", "1", "yes", "on"):
+            return True
+        if lowered in ("false", "f", "0", "no", "off"):
+            return False
+        raise HTTPException(status_code=400, detail=f"Valor booleano no válido: {value}")
+    return str(value)
+
+
+# ✅ Filtros sobre Data.content
+
+FILTER_OPERATORS = ("eq", "ne", "lt", "lte", "gt", "gte", "in", "prefix", "is_null", "not_null")
+
+
+def escape_like(value: str) -> str:
+    """ Escapa los comodines de LIKE (escape por defecto: barra invertida) """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filter_condition(key: str, op: str, value, data_type: str) -> ColumnElement:
+    """
+    Traduce un predicado (clave, operador, valor) a SQL, eligiendo la forma que
+    aprovecha los índices de indexes.py:
+    - igualdad en texto/uuid/json: content @> {"key": value} (GIN jsonb_path_ops)
+    - prefijo: content->>'key' LIKE 'abc%' (btree text_pattern_ops)
+    - rangos, IN e igualdad tipada: btree sobre typed_value
+    """
+    raw = content_text(key)
+    if op == "is_null":
+        return raw.is_(None)
+    if op == "not_null":
+        return raw.is_not(None)
+    if op == "prefix":
+        if value is None:
+            raise HTTPException(status_code=400, detail=f"El filtro prefix requiere un valor ({key})")
+        # Sin cláusula ESCAPE (la barra invertida ya es el escape por defecto):
+        # con ESCAPE explícito el planner no extrae el prefijo para el índice
+        return raw.like(inline(escape_like(str(value)) + "%"))
+    if op == "in":
+        if not isinstance(value, list) or not value:
+            raise HTTPException(status_code=400, detail=f"El filtro in requiere una lista ({key})")
+        return typed_value(key, data_type).in_([coerce_value(v, data_type) for v in value])
+
+    if value is None:
+        raise HTTPException(status_code=400, detail=f"El filtro {op} requiere un valor ({key})")
+    if op == "eq" and data_type not in TYPED_INDEX_TYPES:
+        return Data.content.contains({key: value})
+
+    expr = typed_value(key, data_type)
+    typed = coerce_value(value, data_type)
+    if op == "eq":
+        return expr == typed
+    if op == "ne":
+        return expr != typed
+    if op == "lt":
+        return expr < typed
+    if op == "lte":
+        return expr <= typed
+    if op == "gt":
+        return expr > typed
+    if op == "gte":
+        return expr >= typed
+    raise HTTPException(status_code=400, detail=f"Operador no soportado: {op}")
+
+
+# ✅ Estimaciones del planner
+
+class Explain(Executable, ClauseElement):
+    """ EXPLAIN (FORMAT JSON) de una consulta, con sus parámetros ligados (filtros JSONB incluidos) """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+# ✅ Actualizaciones parciales (JSON merge-patch)
+
+def row_json(id_column, class_id_column, content_column):
+    """ Texto JSON de una fila {id, class_id, content}, construido en PostgreSQL """
+    return cast(
+        func.json_build_object(
+            inline("id"), id_column, inline("class_id"), class_id_column, inline("content"), content_column,
+        ),
+        Text,
+    ).label("json")
+
+def merge_patch(content: ColumnElement, patch: ColumnElement) -> ColumnElement:
+    """
+    content con el merge-patch aplicado (RFC 7386 en el primer nivel, que es
+    el único que usa content): las claves del parche sustituyen a las
+    existentes y las que valen null se eliminan.
+    """
+    entry = func.jsonb_each(patch).table_valued("key", "value").alias("entry")
+    removed = func.array(
+        select(entry.c.key)
+        .where(func.jsonb_typeof(entry.c.value) == literal_column("'null'"))
+        .scalar_subquery()
+    )
+    return content.op("||")(func.jsonb_strip_nulls(patch)).op("-")(removed)
+
+
+# ✅ Paginación por cursor (keyset)
+
+def encode_cursor(sort_value, last_id) -> str:
+    """ Codifica la posición (valor de orden, id) de la última fila de una página """
+    # Decimal, date y UUID (columnas tipadas de materialize.py) viajan como texto
+    payload = json.dumps([sort_value, str(last_id)], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """ Decodifica un cursor generado por encode_cursor """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, uuid.UUID(last_id)
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+
+
+def keyset_condition(sort_expr, sort_value, last_id, descending: bool, id_column=Data.id) -> ColumnElement:
+    """
+    Condición "después del cursor" para ORDER BY sort_expr NULLS LAST, id.
+    Sin sort_expr la paginación es sólo por id.
+    """
+    after_id = id_column < last_id if descending else id_column > last_id
+    if sort_expr is None:
+        return after_id
+    if sort_value is None:
+        return and_(sort_expr.is_(None), after_id)
+    after_value = sort_expr < sort_value if descending else sort_expr > sort_value
+    return or_(
+        after_value,
+        and_(sort_expr == sort_value, after_id),
+        sort_expr.is_(None),
+    )
+
+
+def order_by_clause(sort_expr, descending: bool, id_column=Data.id) -> list:
+    """ ORDER BY estable: valor de orden (nulos al final) y luego id """
+    id_order = id_column.desc() if descending else id_column.asc()
+    if sort_expr is None:
+        return [id_order]
+    value_order = sort_expr.desc() if descending else sort_expr.asc()
+    return [value_order.nulls_last(), id_order]
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.database import get_db
-from backend import crud
+from backend import crud, jobs
 from backend.schemas import AttributeCreate, AttributeSchema, AttributeUpdate
 
 router = APIRouter(prefix="/attributes", tags=["Attributes"])
@@ -21,14 +21,23 @@ async def create_attribute(attribute_data: AttributeCreate, db: AsyncSession = D
 
 @router.patch("/{attribute_id}", response_model=AttributeSchema)
 async def update_attribute(attribute_id: str, update_data: AttributeUpdate, db: AsyncSession = Depends(get_db)):
-    updated_attr = await crud.update_attribute(db, attribute_id, update_data)
-    if not updated_attr:
+    current = await crud.get_attribute(db, attribute_id)
+    if not current:
         raise HTTPException(status_code=404, detail="Atributo no encontrado")
-    return updated_attr
+    if not update_data.name or update_data.name == current.name:
+        return await crud.update_attribute(db, attribute_id, update_data)
+    # Las filas existentes pasan al nombre nuevo en segundo plano (GET /jobs/)
+    async with jobs.content_rewrite(current.class_id, current.name, update_data.name):
+        return await crud.update_attribute(db, attribute_id, update_data)
 
 @router.delete("/{attribute_id}", response_model=AttributeSchema)
 async def delete_attribute(attribute_id: str, db: AsyncSession = Depends(get_db)):
-    deleted_attr = await crud.delete_attribute(db, attribute_id)
-    if not deleted_attr:
+    current = await crud.get_attribute(db, attribute_id)
+    if not current:
         raise HTTPException(status_code=404, detail="Atributo no encontrado")
-    return deleted_attr
\ No newline at end of file
+    # La clave se quita del content de las filas en segundo plano (GET /jobs/)
+    async with jobs.content_rewrite(current.class_id, current.name) as rewrite:
+        deleted_attr = await crud.delete_attribute(db, attribute_id)
+        if isinstance(deleted_attr, dict):
+            jobs.job_manager.cancel(rewrite.id)
+    return deleted_attr
@@ -0,0 +1,47 @@
+# backend/routes/changes.py
+import uuid
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from backend import config, serialization
+from backend.changefeed import change_feed
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    class_id: Optional[str] = None,
+    entities: Optional[str] = Query(None, description="Lista separada por comas: class,attribute,property,connection,data"),
+):
+    """
+    Server-Sent Events con los cambios del modelo y de los datos. No hay
+    repetición de eventos perdidos: al (re)conectar el cliente recarga su
+    estado y después aplica los eventos sobre él.
+    """
+    if class_id is not None:
+        try:
+            class_id = str(uuid.UUID(class_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Identificador de clase no válido")
+    subscriber = change_feed.subscribe(class_id, set(entities.split(",")) if entities else None)
+
+    async def events():
+        try:
+            # retry: espera del navegador antes de reconectar (ms)
+            yield b"retry: 3000\n: conectado\n\n"
+            while not await request.is_disconnected():
+                event = await subscriber.next(config.CHANGEFEED_HEARTBEAT_SECONDS)
+                if event is None:
+                    # Latido: mantiene abiertos proxies y balanceadores
+                    yield b": ping\n\n"
+                    continue
+                yield b"data: " + serialization.dumps(event) + b"\n\n"
+        finally:
+            change_feed.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
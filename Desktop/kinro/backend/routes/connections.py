@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.database import get_db
 from backend import crud
-from backend.schemas import ConnectionSchema, ConnectionCreate
+from backend.schemas import ConnectionSchema, ConnectionCreate, ConnectionUpdate
 
 router = APIRouter(prefix="/connections", tags=["Connections"])
 
@@ -19,6 +19,10 @@ async def create_connection(connection_data: ConnectionCreate, db: AsyncSession
         raise HTTPException(status_code=404, detail="Clase origen o destino no encontrada")
     return await crud.create_connection(db, connection_data)
 
+@router.patch("/{connection_id}", response_model=ConnectionSchema)
+async def update_connection(connection_id: str, update_data: ConnectionUpdate, db: AsyncSession = Depends(get_db)):
+    return await crud.update_connection(db, connection_id, update_data)
+
 @router.delete("/{connection_id}", response_model=dict)
 async def delete_connection(connection_id: str, db: AsyncSession = Depends(get_db)):
     result = await crud.delete_connection(db, connection_id)
@@ -1,35 +1,153 @@
 # ✅ backend/routes/data.py
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Body
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete
 from backend.database import get_db
-from backend import crud
-from backend.schemas import DataCreate, DataSchema, DataUpdate
-from typing import List
-from backend.models import Data
+from backend import config, crud, export, ingest, serialization, streaming
+from backend.schemas import (
+    DataCreate, DataSchema, DataUpdate, DataPage, DataQuery, DataFilter, DataPatch, DataSetWhere,
+    DataAggregate, DataAggregateResult, DataTraversal, DataTraversalResult,
+)
+from typing import List, Literal, Optional
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/data", tags=["Data"])
 
-@router.get("/{class_id}/data/", response_model=list[DataSchema])
-async def get_data_by_class(class_id: str, db: AsyncSession = Depends(get_db)):
-    return await crud.get_data_by_class(db, class_id)
+@router.get("/{class_id}/data/", response_model=DataPage)
+async def get_data_by_class(
+    class_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+    count: Literal["none", "estimate", "exact"] = "none",
+    render: Optional[Literal["model", "orjson", "db"]] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    render = render or config.DATA_RENDER
+    page = await crud.get_data_by_class(db, class_id, limit, cursor, sort, order, count, render=render)
+    return _render_page(page, render)
+
+@router.post("/{class_id}/query", response_model=DataPage)
+async def query_data(class_id: str, data_query: DataQuery, db: AsyncSession = Depends(get_db)):
+    render = data_query.render or config.DATA_RENDER
+    page = await crud.get_data_by_class(
+        db, class_id, data_query.limit, data_query.cursor, data_query.sort,
+        data_query.order, data_query.count, data_query.filters, render,
+    )
+    return _render_page(page, render)
+
+@router.post("/{class_id}/aggregate", response_model=DataAggregateResult)
+async def aggregate_data(class_id: str, spec: DataAggregate, db: AsyncSession = Depends(get_db)):
+    return await crud.aggregate_data(db, class_id, spec)
+
+@router.post("/{class_id}/traverse", response_model=DataTraversalResult)
+async def traverse_data(class_id: str, spec: DataTraversal, db: AsyncSession = Depends(get_db)):
+    return await crud.traverse_data(db, class_id, spec)
+
+def _render_page(page: dict, render: str):
+    # Al devolver una Response, FastAPI no aplica response_model
+    if render == "model":
+        return page
+    return serialization.page_response(page, render)
+
+@router.get("/{class_id}/export")
+async def export_data(
+    class_id: str,
+    format: Literal["csv", "ndjson", "xlsx"] = "csv",
+    db: AsyncSession = Depends(get_db),
+):
+    class_name = await crud.get_class_name(db, class_id)
+    if class_name is None:
+        raise HTTPException(status_code=404, detail="Clase no encontrada")
+    attributes = await crud.get_attributes_by_class(db, class_id)
+    columns = [attr.name for attr in attributes]
+    filename = quote(f"{class_name}_datos.{format}")
+    return StreamingResponse(
+        export.STREAMERS[format](class_id, columns),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"},
+    )
 
 @router.post("/", response_model=DataSchema)
 async def create_data(data: DataCreate, db: AsyncSession = Depends(get_db)):
     return await crud.create_data(db, data)
 
 @router.post("/batch", response_model=dict)
-async def create_data_batch(data_list: List[DataCreate], db: AsyncSession = Depends(get_db)):
+async def create_data_batch(
+    data_list: List[DataCreate],
+    chunk_size: Optional[int] = Query(None, ge=1, le=100000),
+    atomic: bool = True,
+    upsert: bool = Query(False, description="Inserta o actualiza según la clave natural de la clase"),
+    merge: bool = Query(False, description="Con upsert, aplica el content como merge-patch sobre el existente"),
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        created_count = await crud.create_data_batch(db, data_list)
-        return {"message": f"{created_count} datos creados exitosamente"}
+        stats = await ingest.create_data_batch(db, data_list, chunk_size, atomic, upsert, merge)
+        message = f"{stats['inserted']} datos creados exitosamente"
+        if upsert:
+            message += f", {stats['updated']} actualizados y {stats['unchanged']} sin cambios"
+        if stats["rejected"]:
+            message += f", {stats['rejected']} filas descartadas por valores no válidos"
+        return {"message": message, **stats}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Error al crear datos en batch")
         raise HTTPException(status_code=500, detail=f"Error al crear datos: {str(e)}")
 
+@router.post("/batch/stream", response_model=dict)
+async def create_data_stream(
+    request: Request,
+    chunk_size: Optional[int] = Query(None, ge=1, le=100000),
+    atomic: bool = True,
+    upsert: bool = Query(False, description="Inserta o actualiza según la clave natural de la clase"),
+    merge: bool = Query(False, description="Con upsert, aplica el content como merge-patch sobre el existente"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Como /data/batch, pero el cuerpo (NDJSON o msgpack con prefijo de
+    longitud, ver streaming.py) se lee e inserta por bloques mientras llega.
+    """
+    streaming.check_content_length(request.headers.get("content-length"))
+    records, decode = streaming.records(request.stream(), request.headers.get("content-type"))
+    try:
+        stats = await ingest.ingest_stream(db, records, decode, chunk_size, atomic, upsert, merge)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error al crear datos en streaming")
+        raise HTTPException(status_code=500, detail=f"Error al crear datos: {str(e)}")
+    message = f"{stats['inserted']} datos creados exitosamente"
+    if upsert:
+        message += f", {stats['updated']} actualizados y {stats['unchanged']} sin cambios"
+    if stats["rejected"]:
+        message += f", {stats['rejected']} filas descartadas por valores no válidos"
+    return {"message": message, **stats}
+
+@router.post("/{class_id}/upload", response_model=dict)
+async def upload_data_file(
+    class_id: str,
+    file: UploadFile = File(...),
+    upsert: bool = False,
+    merge: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    return await ingest.ingest_upload(db, class_id, file, upsert, merge)
+
+@router.patch("/batch", response_model=dict)
+async def patch_data_batch(patches: List[DataPatch], db: AsyncSession = Depends(get_db)):
+    result = await crud.patch_data_batch(db, patches)
+    return {"message": f"{result['updated']} registros actualizados correctamente", **result}
+
+@router.patch("/{class_id}/set", response_model=dict)
+async def update_data_where(class_id: str, update: DataSetWhere, db: AsyncSession = Depends(get_db)):
+    updated = await crud.update_data_where(db, class_id, update.set, update.filters)
+    return {"message": f"{updated} registros actualizados correctamente", "updated": updated}
+
 @router.patch("/{data_id}", response_model=DataSchema)
 async def update_data(data_id: str, update_data: DataUpdate, db: AsyncSession = Depends(get_db)):
     updated_data = await crud.update_data(db, data_id, update_data)
@@ -39,18 +157,17 @@ async def update_data(data_id: str, update_data: DataUpdate, db: AsyncSession =
 
 @router.delete("/batch", response_model=dict)
 async def delete_data_batch(ids: List[str] = Body(...), db: AsyncSession = Depends(get_db)):
-    try:
-        batch_size = 1000
-        total_deleted = 0
-        for i in range(0, len(ids), batch_size):
-            batch = ids[i:i + batch_size]
-            await db.execute(delete(Data).where(Data.id.in_(batch)))
-            total_deleted += len(batch)
-        await db.commit()
-        return {"message": f"{total_deleted} registros eliminados correctamente"}
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    deleted = await crud.delete_data_batch(db, ids)
+    return {"message": f"{deleted} registros eliminados correctamente", "deleted": deleted}
+
+@router.delete("/{class_id}/purge", response_model=dict)
+async def purge_class_data(
+    class_id: str,
+    filters: List[DataFilter] = Body(default=[]),
+    db: AsyncSession = Depends(get_db),
+):
+    deleted = await crud.purge_class_data(db, class_id, filters)
+    return {"message": f"{deleted} registros eliminados correctamente", "deleted": deleted}
 
 
 @router.delete("/{data_id}", response_model=DataSchema)
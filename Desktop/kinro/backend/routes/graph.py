@@ -0,0 +1,40 @@
+# backend/routes/graph.py
+from fastapi import APIRouter, Request, Response
+from backend.database import AsyncSessionLocal
+from backend import crud
+from backend.schemas import GraphSchema
+from backend.versioning import model_version
+
+router = APIRouter(prefix="/graph", tags=["Graph"])
+
+# Última instantánea serializada: (versión, JSON)
+_snapshot: tuple[int, bytes] | None = None
+
+def _not_modified(request: Request, version: int) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return model_version.etag(version) in [tag.strip() for tag in if_none_match.split(",")]
+
+def _headers(version: int) -> dict:
+    # no-cache: el navegador guarda la respuesta pero la revalida siempre con If-None-Match
+    return {"ETag": model_version.etag(version), "Cache-Control": "no-cache"}
+
+@router.get("/", response_model=GraphSchema)
+async def get_graph(request: Request):
+    """
+    Instantánea del modelo. La versión sale de la base de datos
+    (crud.get_model_version), así que es la misma en todos los procesos: si
+    el cliente ya la tiene (304) o la instantánea en memoria es de esa
+    versión, sólo se hace esa consulta. Se lee del primario, nunca de la réplica.
+    """
+    global _snapshot
+    async with AsyncSessionLocal() as db:
+        # La versión se lee antes que el modelo: si hay una escritura entre
+        # medias, la instantánea queda con la versión anterior y se rehace luego
+        version = await crud.get_model_version(db)
+        if _not_modified(request, version):
+            return Response(status_code=304, headers=_headers(version))
+        if _snapshot is None or _snapshot[0] != version:
+            graph = await crud.get_graph(db)
+            body = GraphSchema.model_validate({"version": version, **graph}).model_dump_json().encode()
+            _snapshot = (version, body)
+    return Response(content=_snapshot[1], media_type="application/json", headers=_headers(version))
@@ -0,0 +1,60 @@
+# backend/routes/jobs.py
+import shutil
+import tempfile
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import get_db
+from backend import crud, ingest, jobs
+from backend.schemas import DataCreate, ImportJobSchema
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.post("/import", response_model=ImportJobSchema, status_code=202)
+async def submit_batch_import(data_list: List[DataCreate], upsert: bool = False, merge: bool = False):
+    return jobs.submit_batch_import(data_list, upsert, merge).status()
+
+@router.post("/upload/{class_id}", response_model=ImportJobSchema, status_code=202)
+async def submit_file_import(
+    class_id: str,
+    file: UploadFile = File(...),
+    upsert: bool = False,
+    merge: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    # El archivo se guarda antes de responder: UploadFile se cierra al terminar la petición
+    workdir = tempfile.mkdtemp(prefix="kinro_job_")
+    try:
+        prepared = await ingest.prepare_upload(db, class_id, file, workdir)
+    except Exception:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    return jobs.submit_file_import(prepared, workdir, upsert, merge).status()
+
+@router.post("/materialize/{class_id}", response_model=ImportJobSchema, status_code=202)
+async def submit_materialization(class_id: str):
+    return jobs.submit_materialization(class_id).status()
+
+@router.post("/rewrite/{class_id}", response_model=ImportJobSchema, status_code=202)
+async def submit_content_rewrite(
+    class_id: str,
+    old: str = Query(..., min_length=1, description="Clave que se renombra o elimina del content"),
+    new: Optional[str] = Query(None, min_length=1, description="Nombre nuevo; sin él la clave se elimina"),
+    db: AsyncSession = Depends(get_db),
+):
+    # Para reanudar una reescritura cancelada o limpiar claves de cambios anteriores
+    if await crud.get_class_name(db, class_id) is None:
+        raise HTTPException(status_code=404, detail="Clase no encontrada")
+    return jobs.submit_content_rewrite(class_id, old, new).status()
+
+@router.get("/", response_model=list[ImportJobSchema])
+async def list_jobs():
+    return [job.status() for job in reversed(jobs.job_manager.jobs.values())]
+
+@router.get("/{job_id}", response_model=ImportJobSchema)
+async def get_job(job_id: str):
+    return jobs.job_manager.get(job_id).status()
+
+@router.post("/{job_id}/cancel", response_model=ImportJobSchema)
+async def cancel_job(job_id: str):
+    return jobs.job_manager.cancel(job_id).status()
@@ -0,0 +1,45 @@
+# backend/routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from backend import metrics
+from backend.cache import metadata_cache
+from backend.changefeed import change_feed
+from backend.database import pool_stats
+from backend.jobs import job_manager
+
+router = APIRouter(tags=["Monitoring"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _runtime_samples() -> list:
+    """ Lo que ya exponen /monitoring/pool, /monitoring/cache y /monitoring/changes """
+    samples = []
+    for engine_name, pool in pool_stats().items():
+        labels = {"engine": engine_name}
+        samples += [
+            ("kinro_db_pool_size", "gauge", "Conexiones del pool", labels, pool["size"]),
+            ("kinro_db_pool_checked_out", "gauge", "Conexiones del pool en uso", labels, pool["checked_out"]),
+            ("kinro_db_pool_overflow", "gauge", "Conexiones de desbordamiento abiertas", labels, pool["overflow"]),
+        ]
+    cache = metadata_cache.stats()
+    samples += [
+        ("kinro_cache_entries", "gauge", "Entradas en la caché de metadatos", {}, cache["entries"]),
+        ("kinro_cache_hits_total", "counter", "Aciertos de la caché de metadatos", {}, cache["hits"]),
+        ("kinro_cache_misses_total", "counter", "Fallos de la caché de metadatos", {}, cache["misses"]),
+        ("kinro_cache_evictions_total", "counter", "Expulsiones de la caché de metadatos", {}, cache["evictions"]),
+    ]
+    feed = change_feed.stats()
+    samples += [
+        ("kinro_changefeed_subscribers", "gauge", "Clientes conectados a /changes/stream", {}, feed["subscribers"]),
+        ("kinro_changefeed_queued", "gauge", "Eventos pendientes de enviar", {}, feed["queued"]),
+    ]
+    if job_manager.queue is not None:
+        samples.append(("kinro_jobs_queued", "gauge", "Trabajos en cola", {}, job_manager.queue.qsize()))
+    return samples
+
+metrics.register_collector(_runtime_samples)
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """ Métricas de este proceso en formato de texto de Prometheus """
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,28 @@
+# backend/routes/monitoring.py
+from fastapi import APIRouter
+from backend import metrics
+from backend.cache import metadata_cache
+from backend.changefeed import change_feed
+from backend.database import pool_stats
+
+router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
+
+@router.get("/cache", response_model=dict)
+async def cache_stats():
+    """ Aciertos, fallos e invalidaciones de la caché de metadatos de este proceso """
+    return metadata_cache.stats()
+
+@router.get("/pool", response_model=dict)
+async def pool_usage():
+    """ Conexiones en uso y libres de los pools de este proceso """
+    return pool_stats()
+
+@router.get("/changes", response_model=dict)
+async def change_feed_stats():
+    """ Clientes conectados a /changes/stream en este proceso y eventos repartidos """
+    return change_feed.stats()
+
+@router.get("/slow-queries", response_model=list[dict])
+async def slow_queries():
+    """ Últimas sentencias SQL más lentas que METRICS_SLOW_QUERY_MS en este proceso """
+    return list(reversed(metrics.slow_queries))
@@ -0,0 +1,20 @@
+# backend/routes/search.py
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import get_db
+from backend import search
+from backend.schemas import SearchPage
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+@router.get("/", response_model=SearchPage)
+async def search_data(
+    q: str = Query(..., min_length=1, max_length=200),
+    class_id: Optional[UUID] = Query(None, description="Limita la búsqueda a una clase"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    return await search.search(db, q, class_id, limit, offset)
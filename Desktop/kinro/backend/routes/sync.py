@@ -0,0 +1,25 @@
+# backend/routes/sync.py
+import uuid
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from backend import crud, serialization
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+@router.get("/")
+async def get_changes(
+    since: int = Query(0, ge=0, description="Última versión recibida (0 = todo)"),
+    limit: int = Query(1000, ge=1, le=10000),
+    class_id: Optional[str] = None,
+):
+    """
+    Cambios desde la versión since: filas nuevas o modificadas por entidad y
+    eliminadas en "deleted". El cliente guarda "version" para la siguiente
+    petición y repite mientras has_more; con reset debe recargar desde 0.
+    """
+    if class_id is not None:
+        try:
+            class_id = str(uuid.UUID(class_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Identificador de clase no válido")
+    return serialization.FastJSONResponse(await crud.get_changes_since(since, limit, class_id))
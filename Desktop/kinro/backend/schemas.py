@@ -1,6 +1,6 @@
-from pydantic import BaseModel, field_validator, UUID4
+from pydantic import BaseModel, Field, field_validator, UUID4
 from uuid import UUID
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 
 # ✅ Esquema para Crear una Clase
 class ClassModelCreate(BaseModel):
@@ -11,7 +11,24 @@ class ClassUpdate(BaseModel):
     position_x: Optional[float] = None
     position_y: Optional[float] = None
 
-# ✅ Esquema para Leer una Clase (Incluye ID y Atributos)
+# ✅ Esquema de una Clase en el Grafo (Atributos y Propiedades, sin Datos)
+class ClassGraphSchema(BaseModel):
+    id: UUID
+    name: str
+    position_x: float
+    position_y: float
+    attributes: List["AttributeSchema"] = []
+
+    model_config = {
+        "from_attributes": True
+    }
+
+# ✅ Esquema para el Diagrama (Incluye el Número de Filas)
+class ClassDiagramSchema(ClassGraphSchema):
+    data_count: int = 0
+    storage: str = "jsonb"  # "jsonb" | "migrating" | "ready" (ver materialize.py)
+
+# ✅ Esquema para Leer una Clase Completa (Incluye Atributos y Datos)
 class ClassModelSchema(BaseModel):
     id: UUID
     name: str
@@ -85,12 +102,141 @@ class DataSchema(BaseModel):
         "from_attributes": True
     }
 
+# ✅ Esquemas para Consultas sobre el Contenido de los Datos
+class DataFilter(BaseModel):
+    key: str
+    op: Literal["eq", "ne", "lt", "lte", "gt", "gte", "in", "prefix", "is_null", "not_null"] = "eq"
+    value: Any = None
+
+class DataQuery(BaseModel):
+    filters: List[DataFilter] = []
+    sort: Optional[str] = None
+    order: Literal["asc", "desc"] = "asc"
+    limit: int = Field(100, ge=1, le=1000)
+    cursor: Optional[str] = None
+    count: Literal["none", "estimate", "exact"] = "none"
+    # Serialización de la respuesta (ver serialization.py); None = DATA_RENDER
+    render: Optional[Literal["model", "orjson", "db"]] = None
+
+# ✅ Esquemas para Actualizaciones Parciales de Datos (JSON merge-patch)
+class DataPatch(BaseModel):
+    id: UUID
+    content: Dict[str, Any]  # Las claves con valor null se eliminan
+
+class DataSetWhere(BaseModel):
+    set: Dict[str, Any]  # Atributo -> nuevo valor (null lo elimina)
+    filters: List[DataFilter] = []
+
+# ✅ Esquema para una Página de Datos (paginación por cursor)
+class DataPage(BaseModel):
+    items: List[DataSchema]
+    next_cursor: Optional[str] = None
+    total_estimate: Optional[int] = None
+
+# ✅ Esquemas para Agregaciones sobre los Datos
+class AggregateGroup(BaseModel):
+    key: str
+    # Sólo en atributos date: agrupa por año, mes o día ("2024", "2024-03", "2024-03-05")
+    bucket: Optional[Literal["year", "month", "day"]] = None
+
+class AggregateMetric(BaseModel):
+    fn: Literal["count", "count_distinct", "sum", "avg", "min", "max"] = "count"
+    key: Optional[str] = None  # count sin key cuenta las filas
+    name: Optional[str] = None  # Nombre en la respuesta; por defecto "count" o "fn_key"
+
+class DataAggregate(BaseModel):
+    group_by: List[AggregateGroup] = []
+    metrics: List[AggregateMetric] = Field(default_factory=lambda: [AggregateMetric()])
+    filters: List[DataFilter] = []
+    sort: Optional[str] = None  # Nombre de una métrica; por defecto se ordena por los grupos
+    order: Literal["asc", "desc"] = "asc"
+    limit: int = Field(1000, ge=1, le=10000)
+
+class DataAggregateResult(BaseModel):
+    groups: List[Dict[str, Any]]  # Una fila por grupo: valores de group_by y de las métricas
+    truncated: bool = False
+
 # ✅ Esquema para Crear una Conexión
 class ConnectionCreate(BaseModel):
     source_class: UUID
     target_class: UUID
     relationship_type: str
+    # Atributos de unión (uno de cada clase): content[origen] = content[destino]
+    source_attribute: Optional[UUID] = None
+    target_attribute: Optional[UUID] = None
+
+# ✅ Esquema para Actualizar los Atributos de Unión de una Conexión
+class ConnectionUpdate(BaseModel):
+    source_attribute: Optional[UUID] = None
+    target_attribute: Optional[UUID] = None
 
 # ✅ Esquema para Leer una Conexión (Incluye ID)
 class ConnectionSchema(ConnectionCreate):
     id: UUID
+
+# ✅ Esquemas para Recorrer las Conexiones desde las Filas de una Clase
+class DataTraversal(BaseModel):
+    filters: List[DataFilter] = []  # Sobre la clase de partida
+    start_limit: int = Field(100, ge=1, le=1000)  # Filas de partida
+    max_depth: int = Field(1, ge=1, le=5)  # Saltos entre clases
+    direction: Literal["out", "in", "both"] = "both"  # Sentido de las conexiones
+    classes: List[UUID] = []  # Clases que se devuelven (vacío = todas las alcanzadas)
+    limit: int = Field(1000, ge=1, le=10000)
+
+class TraversalRow(BaseModel):
+    id: UUID
+    class_id: UUID
+    content: Dict[str, Any]
+    depth: int
+    parent_id: Optional[UUID] = None  # Fila desde la que se llegó (la primera, a menor profundidad)
+    connection_id: Optional[UUID] = None
+
+class DataTraversalResult(BaseModel):
+    items: List[TraversalRow]
+    truncated: bool = False
+
+# ✅ Esquemas para la Búsqueda en los Datos
+class SearchHighlight(BaseModel):
+    key: str  # Atributo que coincide
+    score: float
+    # Fragmento de content[key] que coincide ([start, end)); sin posiciones si no se pueden calcular
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+class SearchHit(BaseModel):
+    id: UUID
+    class_id: UUID
+    content: Dict[str, Any]
+    score: float  # 0-100, RapidFuzz
+    highlights: List[SearchHighlight] = []
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    next_offset: Optional[int] = None
+
+# ✅ Esquema para el Estado de un Trabajo de Importación
+class ImportJobSchema(BaseModel):
+    id: str
+    kind: str
+    class_id: Optional[str] = None
+    state: str
+    rows_processed: int
+    rows_rejected: int = 0
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+    total_rows: Optional[int] = None
+    progress: float
+    rows_per_second: float
+    elapsed_seconds: float
+    eta_seconds: Optional[float] = None
+    errors: List[str] = []
+
+# ✅ Esquema para la Instantánea del Grafo (Clases y Conexiones)
+class GraphSchema(BaseModel):
+    version: int
+    classes: List[ClassGraphSchema]
+    connections: List[ConnectionSchema]
+
+    model_config = {
+        "from_attributes": True
+    }
@@ -0,0 +1,167 @@
+# backend/search.py
+import re
+
+from fastapi import HTTPException
+from rapidfuzz import fuzz
+from sqlalchemy import Text, bindparam, func, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from backend import config, crud, materialize, query
+from backend.models import Data
+
+# Búsqueda en el content de todas las clases (GET /search):
+# 1. candidatos por índice: palabras completas o prefijos (tsvector) y, si no
+#    bastan, coincidencias aproximadas por trigramas (pg_trgm);
+# 2. reordenación de los candidatos con RapidFuzz en el pool de hilos, con el
+#    fragmento de cada atributo que coincide.
+# Las clases materializadas no guardan sus filas en data: no se indexan.
+
+SEARCH_CONFIG = "simple"
+WORD_RE = re.compile(r"\w+")
+
+# ✅ Texto indexado
+
+# Valores de primer nivel de content separados por espacios (sin las claves).
+# IMMUTABLE para poder usarse en índices de expresión.
+SEARCH_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION kinro_search_text(content jsonb) RETURNS text AS $$
+    SELECT coalesce(string_agg(value, ' '), '') FROM jsonb_each_text(content)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+"""
+
+TRGM_INDEX = "ix_data_search_trgm"
+TSV_INDEX = "ix_data_search_tsv"
+
+def search_text(content=Data.content):
+    return func.kinro_search_text(content, type_=Text)
+
+def search_vector(content=Data.content):
+    # La configuración como literal: el planner sólo usa el índice si la expresión es idéntica
+    return func.to_tsvector(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), search_text(content))
+
+def index_ddl(concurrently: bool = True) -> list[str]:
+    """ Índices GIN sobre el texto de content (los crea también la migración de Alembic) """
+    mode = "CONCURRENTLY " if concurrently else ""
+    return [
+        f"CREATE INDEX {mode}IF NOT EXISTS {TSV_INDEX} "
+        f"ON data USING GIN (to_tsvector('{SEARCH_CONFIG}'::regconfig, kinro_search_text(content)))",
+        f"CREATE INDEX {mode}IF NOT EXISTS {TRGM_INDEX} "
+        f"ON data USING GIN (kinro_search_text(content) gin_trgm_ops)",
+    ]
+
+def schema_ddl() -> list[str]:
+    """ Para create_tables.py (dentro de una transacción: sin CONCURRENTLY) """
+    return ["CREATE EXTENSION IF NOT EXISTS pg_trgm", SEARCH_FUNCTION_DDL, *index_ddl(concurrently=False)]
+
+# ✅ Candidatos (PostgreSQL)
+
+def prefix_query(words: list[str]) -> str:
+    """ tsquery con todas las palabras, la última como prefijo (búsqueda mientras se escribe) """
+    return " & ".join(words[:-1] + [f"{words[-1]}:*"])
+
+def _scoped(stmt, class_id):
+    return stmt.where(query.class_scope(class_id)) if class_id is not None else stmt
+
+def _ranked(stmt, rank, limit: int):
+    """
+    Ordena por relevancia sólo las primeras SEARCH_SCAN_LIMIT coincidencias: con
+    una palabra muy común calcular el rango de todas las filas sería lo lento.
+    """
+    matches = stmt.add_columns(rank.label("rank")).limit(config.SEARCH_SCAN_LIMIT).subquery("matches")
+    return select(matches.c.id, matches.c.class_id, matches.c.content).order_by(matches.c.rank.desc()).limit(limit)
+
+async def candidates(db: AsyncSession, text_query: str, class_id, limit: int) -> list:
+    words = WORD_RE.findall(text_query.lower())
+    if not words:
+        raise HTTPException(status_code=400, detail="La búsqueda no contiene palabras")
+    base = _scoped(select(Data.id, Data.class_id, Data.content), class_id)
+
+    tsquery = func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), prefix_query(words))
+    vector = search_vector()
+    rows = (await db.execute(
+        _ranked(base.where(vector.op("@@")(tsquery)), func.ts_rank_cd(vector, tsquery), limit)
+    )).all()
+    if len(rows) >= limit or not config.SEARCH_FUZZY:
+        return rows
+
+    # Errores de escritura y subcadenas: similitud de trigramas (operador <%, índice gin_trgm_ops)
+    await db.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {"threshold": str(config.SEARCH_SIMILARITY_THRESHOLD)},
+    )
+    found = [row.id for row in rows]
+    needle = bindparam("needle", text_query, type_=Text)
+    document = search_text()
+    fuzzy = base.where(needle.op("<%")(document))
+    if found:
+        fuzzy = fuzzy.where(Data.id.not_in(found))
+    more = (await db.execute(
+        _ranked(fuzzy, func.word_similarity(needle, document), limit - len(rows))
+    )).all()
+    return rows + more
+
+# ✅ Reordenación (RapidFuzz)
+
+def _value_text(value) -> str | None:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value)
+
+def score_row(text_query: str, content: dict) -> tuple[float, list]:
+    """
+    Puntuación de una fila (0-100) y fragmentos que coinciden: la mejor
+    coincidencia parcial de cada atributo de texto, con su posición.
+    """
+    needle = text_query.lower()
+    highlights = []
+    for key, value in content.items():
+        haystack = _value_text(value)
+        if not haystack:
+            continue
+        lowered = haystack.lower()
+        alignment = fuzz.partial_ratio_alignment(needle, lowered, score_cutoff=config.SEARCH_MIN_SCORE)
+        if alignment is None:
+            continue
+        highlight = {"key": key, "score": round(alignment.score, 1)}
+        # Las posiciones sólo valen si pasar a minúsculas no cambió la longitud
+        if len(lowered) == len(haystack):
+            highlight.update(start=alignment.dest_start, end=alignment.dest_end)
+        highlights.append(highlight)
+    highlights.sort(key=lambda h: h["score"], reverse=True)
+    if not highlights:
+        return 0.0, []
+    # Mejor atributo, y un poco más si coinciden varios
+    score = highlights[0]["score"] + sum(h["score"] for h in highlights[1:]) * 0.01
+    return min(score, 100.0), highlights[:config.SEARCH_MAX_HIGHLIGHTS]
+
+def rerank(text_query: str, rows: list) -> list[dict]:
+    """ Tarea del pool de hilos: puntúa y ordena los candidatos (estable ante empates) """
+    hits = []
+    for position, row in enumerate(rows):
+        score, highlights = score_row(text_query, row.content or {})
+        hits.append((-score, position, {
+            "id": row.id,
+            "class_id": row.class_id,
+            "content": row.content,
+            "score": round(score, 1),
+            "highlights": highlights,
+        }))
+    hits.sort(key=lambda hit: hit[:2])
+    return [hit for _, _, hit in hits]
+
+async def search(db: AsyncSession, text_query: str, class_id=None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Una página de resultados. Se reordena una ventana de candidatos que cubre
+    la página pedida (al menos SEARCH_CANDIDATES), hasta SEARCH_MAX_CANDIDATES.
+    """
+    if class_id is not None and await crud.get_storage_state(db, class_id) == materialize.READY:
+        raise HTTPException(status_code=409, detail="La búsqueda no está disponible para clases materializadas")
+    window = max(config.SEARCH_CANDIDATES, offset + limit + 1)
+    if window > config.SEARCH_MAX_CANDIDATES:
+        raise HTTPException(status_code=400, detail="Página fuera del rango de resultados")
+    rows = await candidates(db, text_query, class_id, window)
+    hits = await run_in_threadpool(rerank, text_query, rows)
+    page = hits[offset:offset + limit]
+    has_more = len(hits) > offset + limit
+    return {"items": page, "next_offset": offset + limit if has_more else None}
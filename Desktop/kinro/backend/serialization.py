@@ -0,0 +1,56 @@
+# backend/serialization.py
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa json de la biblioteca estándar (más lento)
+    orjson = None
+
+# Modos de respuesta de los endpoints de datos:
+#   "model"  -> response_model de Pydantic (validación y serialización de FastAPI)
+#   "orjson" -> las filas de la base de datos se codifican directamente con orjson
+#   "db"     -> PostgreSQL construye el JSON de cada fila (json_build_object) y sólo se concatena
+RENDER_MODES = ("model", "orjson", "db")
+
+# ✅ Codificación
+
+def dumps(value) -> bytes:
+    """ JSON en bytes; orjson ya entiende UUID, datetime y date (el resto, como Decimal, va como texto) """
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def dumps_line(value) -> bytes:
+    """ Una línea NDJSON """
+    return dumps(value) + b"\n"
+
+def loads(data: bytes):
+    """ JSON desde bytes; los errores de orjson también son ValueError """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class FastJSONResponse(Response):
+    """ JSONResponse sin pasar por jsonable_encoder ni Pydantic """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+# ✅ Páginas de datos
+
+def page_body(page: dict) -> bytes:
+    """
+    Cuerpo de una DataPage cuyos items ya son texto JSON (modo "db"):
+    se concatenan tal cual, sin decodificarlos.
+    """
+    items = ",".join(page["items"]).encode("utf-8")
+    tail = dumps({"next_cursor": page["next_cursor"], "total_estimate": page["total_estimate"]})
+    return b'{"items":[' + items + b"]," + tail[1:]
+
+def page_response(page: dict, render: str) -> Response:
+    if render == "db":
+        return Response(content=page_body(page), media_type="application/json")
+    return FastJSONResponse(page)
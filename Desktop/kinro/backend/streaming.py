@@ -0,0 +1,117 @@
+# backend/streaming.py
+from typing import AsyncIterator, Callable
+
+from fastapi import HTTPException
+
+from backend import config, serialization
+
+try:
+    import msgpack
+except ImportError:  # Sin msgpack sólo se acepta NDJSON
+    msgpack = None
+
+# Lectura incremental del cuerpo de POST /data/batch/stream. El cuerpo llega
+# en trozos (request.stream()) y se corta en registros sin tenerlo entero en
+# memoria: sólo se guarda el registro incompleto del final de cada trozo.
+#   application/x-ndjson  -> un objeto JSON por línea
+#   application/x-msgpack -> cada registro precedido de su longitud (4 bytes, big-endian)
+# Cada registro sale con su número (línea NDJSON o registro msgpack, desde 1)
+# para informar de los errores.
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+MSGPACK_TYPES = {"application/x-msgpack", "application/msgpack"}
+LENGTH_PREFIX = 4
+
+def _too_large(what: str, limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"{what} supera el máximo de {limit} bytes")
+
+# ✅ Límite del cuerpo
+
+def check_content_length(value: str | None):
+    """ Rechaza antes de leer nada si Content-Length ya supera el máximo """
+    limit = config.STREAM_MAX_BODY_BYTES
+    if limit and value is not None and value.isdigit() and int(value) > limit:
+        raise _too_large("El cuerpo de la petición", limit)
+
+async def limited(chunks: AsyncIterator[bytes], limit: int | None = None) -> AsyncIterator[bytes]:
+    """ Cuenta los bytes recibidos (sin Content-Length, con chunked, sólo se sabe al leer) """
+    limit = config.STREAM_MAX_BODY_BYTES if limit is None else limit
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if limit and received > limit:
+            raise _too_large("El cuerpo de la petición", limit)
+        yield chunk
+
+# ✅ Formatos
+
+async def ndjson_records(chunks: AsyncIterator[bytes], max_record: int) -> AsyncIterator[tuple[int, bytes]]:
+    """ (número de línea, línea); las líneas en blanco se saltan """
+    buffer = bytearray()
+    line = 0
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            line += 1
+            record = bytes(buffer[start:end])
+            start = end + 1
+            if len(record) > max_record:
+                raise _too_large(f"La línea {line}", max_record)
+            if record.strip():
+                yield line, record
+        del buffer[:start]
+        if len(buffer) > max_record:
+            raise _too_large(f"La línea {line + 1}", max_record)
+    if buffer.strip():
+        yield line + 1, bytes(buffer)
+
+async def msgpack_records(chunks: AsyncIterator[bytes], max_record: int) -> AsyncIterator[tuple[int, bytes]]:
+    """ (número de registro, registro) con el prefijo de longitud ya quitado """
+    buffer = bytearray()
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while len(buffer) - start >= LENGTH_PREFIX:
+            size = int.from_bytes(buffer[start:start + LENGTH_PREFIX], "big")
+            if size > max_record:
+                raise _too_large(f"El registro {number + 1}", max_record)
+            end = start + LENGTH_PREFIX + size
+            if len(buffer) < end:
+                break
+            number += 1
+            yield number, bytes(buffer[start + LENGTH_PREFIX:end])
+            start = end
+        del buffer[:start]
+    if buffer:
+        raise HTTPException(status_code=400, detail=f"El registro {number + 1} está incompleto al final del cuerpo")
+
+def _msgpack_loads(record: bytes):
+    try:
+        return msgpack.unpackb(record, raw=False)
+    except Exception as e:
+        # ExtraData, FormatError, StackError...: un registro no válido no aborta la carga
+        raise ValueError(str(e)) from e
+
+def _media_type(content_type: str | None) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+def reader(content_type: str | None) -> tuple[Callable, Callable]:
+    """ (separador de registros, decodificador de un registro) según el Content-Type """
+    media_type = _media_type(content_type)
+    if media_type in NDJSON_TYPES:
+        return ndjson_records, serialization.loads
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="msgpack no está instalado en el servidor")
+        return msgpack_records, _msgpack_loads
+    raise HTTPException(
+        status_code=415,
+        detail=f"Content-Type no soportado: {media_type or 'ninguno'}. Use application/x-ndjson o application/x-msgpack",
+    )
+
+def records(chunks: AsyncIterator[bytes], content_type: str | None) -> tuple[AsyncIterator[tuple[int, bytes]], Callable]:
+    """ Registros del cuerpo, con los límites de config aplicados, y su decodificador """
+    split, decode = reader(content_type)
+    return split(limited(chunks), config.STREAM_MAX_RECORD_BYTES), decode
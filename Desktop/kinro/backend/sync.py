@@ -0,0 +1,164 @@
+# backend/sync.py
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from backend import config
+from backend.database import AsyncSessionLocal
+from backend.models import SyncState, Tombstone
+
+logger = logging.getLogger(__name__)
+
+# Cada transacción que escribe deja, antes de su primera versión, un advisory
+# lock compartido cuya clave es la última versión asignada hasta entonces: sus
+# versiones serán mayores. /sync lee esas claves en pg_locks (sin esperar a
+# nadie) y no pasa de la menor. Un lock por transacción, no por fila.
+SYNC_LOCK_CLASS = 0x6B696E72
+# Las claves de advisory lock son de 32 bits: se guarda la versión módulo 2^32
+LOCK_KEY_SPAN = 2 ** 32
+
+# Tablas sincronizadas: (entidad, de dónde sale class_id en la lápida)
+SYNCED_TABLES = {
+    "class_models": ("class", "id"),
+    "attributes": ("attribute", "class_id"),
+    "properties": ("property", ""),
+    "connections": ("connection", ""),
+    "data": ("data", "class_id"),
+}
+
+# ✅ DDL (la migración de Alembic tiene su propia copia; ésta sirve para create_tables.py y materialize.py)
+
+# Marca la transacción como escritora una sola vez (kinro.sync_writer es local a la transacción)
+WRITER_FUNCTION_DDL = f"""
+CREATE OR REPLACE FUNCTION kinro_mark_sync_writer() RETURNS void AS $$
+DECLARE
+    latest bigint;
+BEGIN
+    IF current_setting('kinro.sync_writer', true) = 'on' THEN
+        RETURN;
+    END IF;
+    SELECT CASE WHEN is_called THEN last_value ELSE 0 END INTO latest FROM kinro_row_version_seq;
+    PERFORM pg_advisory_xact_lock_shared({SYNC_LOCK_CLASS}, (latest % {LOCK_KEY_SPAN} - {LOCK_KEY_SPAN // 2})::int);
+    PERFORM set_config('kinro.sync_writer', 'on', true);
+END
+$$ LANGUAGE plpgsql
+"""
+
+VERSION_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION kinro_set_row_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM kinro_mark_sync_writer();
+    NEW.row_version := nextval('kinro_row_version_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# TG_ARGV: entidad y columna con el class_id ("id", "class_id", "") o un uuid fijo
+TOMBSTONE_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION kinro_record_tombstone() RETURNS trigger AS $$
+DECLARE
+    cls uuid;
+BEGIN
+    -- Borrados que no son eliminaciones para el cliente (p. ej. fin de una materialización)
+    IF current_setting('kinro.skip_tombstones', true) = 'on' THEN
+        RETURN OLD;
+    END IF;
+    IF TG_ARGV[1] = 'class_id' THEN
+        cls := OLD.class_id;
+    ELSIF TG_ARGV[1] = 'id' THEN
+        cls := OLD.id;
+    ELSIF TG_ARGV[1] <> '' THEN
+        cls := TG_ARGV[1]::uuid;
+    END IF;
+    PERFORM kinro_mark_sync_writer();
+    INSERT INTO sync_tombstones (row_version, entity, entity_id, class_id)
+    VALUES (nextval('kinro_row_version_seq'), TG_ARGV[0], OLD.id, cls);
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql
+"""
+
+def table_trigger_ddl(table: str, entity: str, class_source: str) -> list[str]:
+    """ Versión en cada INSERT/UPDATE que cambia la fila y lápida en cada DELETE """
+    return [
+        f"DROP TRIGGER IF EXISTS kinro_version_i ON {table}",
+        f"DROP TRIGGER IF EXISTS kinro_version_u ON {table}",
+        f"DROP TRIGGER IF EXISTS kinro_tombstone ON {table}",
+        f"CREATE TRIGGER kinro_version_i BEFORE INSERT ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION kinro_set_row_version()",
+        f"CREATE TRIGGER kinro_version_u BEFORE UPDATE ON {table} "
+        f"FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION kinro_set_row_version()",
+        f"CREATE TRIGGER kinro_tombstone AFTER DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION kinro_record_tombstone('{entity}', '{class_source}')",
+    ]
+
+def schema_ddl() -> list[str]:
+    statements = [
+        "CREATE SEQUENCE IF NOT EXISTS kinro_row_version_seq",
+        WRITER_FUNCTION_DDL,
+        VERSION_FUNCTION_DDL,
+        TOMBSTONE_FUNCTION_DDL,
+    ]
+    for table, (entity, class_source) in SYNCED_TABLES.items():
+        statements.extend(table_trigger_ddl(table, entity, class_source))
+    return statements
+
+SKIP_TOMBSTONES = "SET LOCAL kinro.skip_tombstones = 'on'"
+
+# ✅ Versión segura
+
+SEQUENCE_VALUE_SQL = "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM kinro_row_version_seq"
+
+# Versiones de partida de las transacciones escritoras en curso de esta base de datos
+WRITER_KEYS_SQL = f"""
+SELECT objid::bigint FROM pg_locks
+WHERE locktype = 'advisory' AND classid = {SYNC_LOCK_CLASS} AND objsubid = 2
+  AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+
+def writer_floor(latest: int, key: int) -> int:
+    """ Versión de partida de una escritora (≤ latest) a partir de su clave de 32 bits """
+    return latest - (latest - key - LOCK_KEY_SPAN // 2) % LOCK_KEY_SPAN
+
+async def safe_version() -> int:
+    """
+    Versión hasta la que todo está confirmado. Una transacción en curso puede
+    tener versiones menores que la última asignada, pero todas mayores que su
+    clave en pg_locks. La secuencia se lee antes que los locks: una escritora
+    que ya ha pedido una versión ≤ la leída ya ha dejado su lock. No espera.
+    """
+    async with AsyncSessionLocal() as db:
+        latest = (await db.execute(text(SEQUENCE_VALUE_SQL))).scalar_one()
+        keys = (await db.execute(text(WRITER_KEYS_SQL))).scalars().all()
+        await db.rollback()
+    return min([latest, *(writer_floor(latest, key) for key in keys)])
+
+async def pruned_through(db) -> int:
+    result = await db.execute(select(SyncState.pruned_through).where(SyncState.id == "tombstones"))
+    return result.scalar_one_or_none() or 0
+
+# ✅ Retención de lápidas
+
+async def prune_tombstones():
+    """ Borra las lápidas más antiguas que SYNC_TOMBSTONE_RETENTION_DAYS y guarda hasta qué versión """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=config.SYNC_TOMBSTONE_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        through = (await db.execute(
+            select(func.max(Tombstone.row_version)).where(Tombstone.deleted_at < cutoff)
+        )).scalar_one()
+        if through is None:
+            return
+        result = await db.execute(delete(Tombstone).where(Tombstone.row_version <= through))
+        await db.execute(
+            pg_insert(SyncState)
+            .values(id="tombstones", pruned_through=through)
+            .on_conflict_do_update(
+                index_elements=["id"],
+                set_={"pruned_through": func.greatest(SyncState.pruned_through, through)},
+            )
+        )
+        await db.commit()
+    logger.info(f"🧹 {result.rowcount} lápidas de sincronización eliminadas")
@@ -0,0 +1,32 @@
+# backend/versioning.py
+import time
+
+# ✅ Versión del modelo (clases, atributos, propiedades y conexiones)
+
+class ModelVersion:
+    """
+    Contador monótono de cambios del modelo, en memoria del proceso.
+    Arranca en el instante actual (ms) para seguir creciendo tras un reinicio,
+    y se incrementa después de cada commit que modifica metadatos.
+    """
+
+    def __init__(self):
+        self.value = self._now()
+
+    @staticmethod
+    def _now() -> int:
+        return int(time.time() * 1000)
+
+    def bump(self) -> int:
+        self.value = max(self.value + 1, self._now())
+        return self.value
+
+    def observe(self, value: int):
+        """ Adopta una versión recibida de otro proceso si es más reciente """
+        if value > self.value:
+            self.value = value
+
+    def etag(self, value: int | None = None) -> str:
+        return f'W/"graph-{self.value if value is None else value}"'
+
+model_version = ModelVersion()
@@ -0,0 +1,73 @@
+"""
+Compara la inserción masiva con executemany (ruta anterior) y con COPY.
+
+Uso (desde Desktop/kinro, con la base de datos configurada):
+    python benchmarks/bench_bulk_insert.py --rows 100000 --chunk-size 10000
+"""
+import sys
+import os
+
+# 🔹 Agregar la raíz del proyecto al `sys.path`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from sqlalchemy import delete
+
+from backend import crud
+from backend.database import AsyncSessionLocal, engine
+from backend.models import ClassModel, Data
+from backend.schemas import DataCreate
+
+def synthetic_rows(class_id, count: int) -> list[DataCreate]:
+    return [
+        DataCreate(class_id=class_id, content={
+            "nombre": f"registro {i}",
+            "edad": str(random.randint(0, 99)),
+            "fecha": f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+            "activo": random.choice(["true", "false"]),
+        })
+        for i in range(count)
+    ]
+
+async def run_path(name: str, insert, class_id, rows: int):
+    data_list = synthetic_rows(class_id, rows)
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        await insert(db, data_list)
+        elapsed = time.perf_counter() - started
+        await db.execute(delete(Data).where(Data.class_id == class_id))
+        await db.commit()
+    print(f"{name:<14} {rows:>9} filas  {elapsed:8.2f}s  {rows / elapsed:>10.0f} filas/s")
+    return elapsed
+
+async def main(rows: int, chunk_size: int):
+    class_id = uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        db.add(ClassModel(id=class_id, name=f"bench_{class_id.hex[:8]}"))
+        await db.commit()
+    try:
+        executemany = await run_path("executemany", crud.create_data_batch_executemany, class_id, rows)
+        copy = await run_path(
+            "COPY",
+            lambda db, data_list: crud.create_data_batch(db, data_list, chunk_size=chunk_size),
+            class_id,
+            rows,
+        )
+        print(f"COPY es {executemany / copy:.1f}x más rápido")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(ClassModel).where(ClassModel.id == class_id))
+            await db.commit()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.chunk_size))
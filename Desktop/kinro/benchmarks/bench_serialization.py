@@ -0,0 +1,135 @@
+"""
+Compara la serialización de páginas de datos: response_model de Pydantic
+(ruta actual), orjson directo sobre las filas y JSON construido en PostgreSQL.
+
+Uso (desde Desktop/kinro):
+    # Sólo codificación, sin base de datos
+    python benchmarks/bench_serialization.py --rows 1000 --repeat 50
+    # Extremo a extremo contra la API (con la base de datos configurada)
+    python benchmarks/bench_serialization.py --http --rows 100000 --limit 1000
+"""
+import sys
+import os
+
+# 🔹 Agregar la raíz del proyecto al `sys.path`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import delete
+
+from backend import crud, serialization
+from backend.schemas import DataCreate, DataPage
+
+def synthetic_content(i: int) -> dict:
+    return {
+        "nombre": f"registro {i}",
+        "edad": str(random.randint(0, 99)),
+        "fecha": f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        "activo": random.choice(["true", "false"]),
+        "notas": "texto " * random.randint(1, 20),
+    }
+
+def report(name: str, rows: int, elapsed: float, size: int):
+    print(f"{name:<8} {rows:>9} filas  {elapsed:8.3f}s  {rows / elapsed:>12.0f} filas/s  {size / 1024:>9.0f} KiB")
+
+# ✅ Sólo codificación
+
+def bench_encoding(rows: int, repeat: int):
+    class_id = uuid.uuid4()
+    page = {
+        "items": [{"id": uuid.uuid4(), "class_id": class_id, "content": synthetic_content(i)} for i in range(rows)],
+        "next_cursor": None,
+        "total_estimate": None,
+    }
+    adapter = TypeAdapter(DataPage)
+
+    def pydantic_path():
+        # Lo que hace FastAPI con response_model: validar, serializar y json.dumps
+        validated = adapter.validate_python(page, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode="json")).encode("utf-8")
+
+    def orjson_path():
+        return serialization.dumps(page)
+
+    # En el modo "db" PostgreSQL entrega cada fila ya como texto JSON
+    text_page = {**page, "items": [json.dumps(jsonable_encoder(item)) for item in page["items"]]}
+
+    def db_path():
+        return serialization.page_body(text_page)
+
+    timings = {}
+    for name, path in (("model", pydantic_path), ("orjson", orjson_path), ("db", db_path)):
+        body = path()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            path()
+        elapsed = time.perf_counter() - started
+        timings[name] = elapsed
+        report(name, rows * repeat, elapsed, len(body))
+    print(f"orjson es {timings['model'] / timings['orjson']:.1f}x y db {timings['model'] / timings['db']:.1f}x más rápido que model")
+
+# ✅ Extremo a extremo (API + base de datos)
+
+async def bench_http(rows: int, limit: int):
+    import httpx
+
+    from backend.database import AsyncSessionLocal, engine
+    from backend.main import app
+    from backend.models import ClassModel, Data
+
+    class_id = uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        db.add(ClassModel(id=class_id, name=f"bench_{class_id.hex[:8]}"))
+        await db.commit()
+        await crud.create_data_batch(db, [DataCreate(class_id=class_id, content=synthetic_content(i)) for i in range(rows)])
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            timings = {}
+            for render in serialization.RENDER_MODES:
+                cursor = None
+                fetched = 0
+                size = 0
+                started = time.perf_counter()
+                while True:
+                    params = {"limit": limit, "render": render}
+                    if cursor:
+                        params["cursor"] = cursor
+                    response = await client.get(f"/data/{class_id}/data/", params=params)
+                    response.raise_for_status()
+                    size += len(response.content)
+                    page = response.json()
+                    fetched += len(page["items"])
+                    cursor = page["next_cursor"]
+                    if not cursor:
+                        break
+                elapsed = time.perf_counter() - started
+                timings[render] = elapsed
+                report(render, fetched, elapsed, size)
+            print(f"orjson es {timings['model'] / timings['orjson']:.1f}x y db {timings['model'] / timings['db']:.1f}x más rápido que model")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Data).where(Data.class_id == class_id))
+            await db.execute(delete(ClassModel).where(ClassModel.id == class_id))
+            await db.commit()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--http", action="store_true", help="recorre la API con cada modo (requiere la base de datos)")
+    args = parser.parse_args()
+    if args.http:
+        asyncio.run(bench_http(args.rows, args.limit))
+    else:
+        bench_encoding(args.rows, args.repeat)
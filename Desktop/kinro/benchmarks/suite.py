@@ -0,0 +1,306 @@
+"""
+Suite de benchmarks reproducible: genera (o reutiliza) un modelo sintético con
+synthetic.py y lanza clientes concurrentes contra la API en proceso (httpx +
+ASGITransport) en cada escenario. Informa p50/p95/p99, peticiones por segundo,
+errores y la memoria máxima del proceso (RSS), y compara con una línea base
+guardada para detectar regresiones entre ejecuciones.
+
+Escenarios:
+    list_classes   GET    /classes/
+    data_page      GET    /data/{class_id}/data/?limit=100 (primera página y siguientes)
+    batch_insert   POST   /data/batch
+    batch_delete   DELETE /data/batch (sobre filas creadas antes en una clase aparte)
+    update_data    PATCH  /data/{data_id}
+
+Uso (desde Desktop/kinro, con la base de datos configurada):
+    python benchmarks/suite.py --rows 100000 --save-baseline
+    python benchmarks/suite.py --rows 100000 --baseline benchmarks/baselines/latest.json
+    python benchmarks/suite.py --scenarios data_page,update_data --concurrency 32
+"""
+import sys
+import os
+
+# 🔹 Agregar la raíz del proyecto al `sys.path`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import select
+
+import synthetic
+from backend.database import AsyncSessionLocal, engine
+from backend.main import app
+from backend.models import ClassModel, Data
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+SCENARIOS = ["list_classes", "data_page", "batch_insert", "batch_delete", "update_data"]
+
+# ✅ Métricas
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+def peak_rss_mb() -> float | None:
+    """ Memoria residente máxima del proceso (resource en Unix, psutil en Windows) """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux la da en KiB y macOS en bytes
+        return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    ms = lambda p: round(percentile(latencies, p) * 1000, 2)
+    rss = peak_rss_mb()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": ms(0.50),
+        "p95_ms": ms(0.95),
+        "p99_ms": ms(0.99),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+    }
+
+# ✅ Carga concurrente
+
+async def run_load(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> dict:
+    """
+    total peticiones repartidas entre concurrency clientes; make_request(i)
+    devuelve (método, url, kwargs) para la i-ésima.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+# ✅ Escenarios
+
+async def sample_data_ids(class_ids: list, count: int, seed: int) -> list:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Data.id).where(Data.class_id.in_(class_ids)).limit(count)
+        )
+        ids = [str(i) for i in result.scalars().all()]
+    random.Random(seed).shuffle(ids)
+    return ids
+
+async def scratch_class(name: str):
+    async with AsyncSessionLocal() as db:
+        class_model = ClassModel(name=name)
+        db.add(class_model)
+        await db.commit()
+        return class_model.id
+
+async def run_scenarios(model: synthetic.SyntheticModel, args) -> dict:
+    rng = random.Random(args.seed)
+    class_ids = [str(c) for c in model.class_ids]
+    attributes = {str(c): names for c, names in model.attributes.items()}
+    results = {}
+    scratch = await scratch_class(f"{synthetic.PREFIX}scratch_{args.seed}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def scenario(name: str, make_request, total: int = args.requests):
+            if name not in args.scenarios:
+                return
+            # Calentamiento (cachés de metadatos, sentencias preparadas) con índices
+            # a partir de total, para no repetir las peticiones medidas
+            for i in range(min(args.concurrency, total)):
+                method, url, kwargs = make_request(total + i)
+                await client.request(method, url, **kwargs)
+            results[name] = await run_load(client, make_request, total, args.concurrency)
+            print(format_row(name, results[name]))
+
+        await scenario("list_classes", lambda i: ("GET", "/classes/", {}))
+
+        # Páginas de datos: la mitad primeras páginas y la otra mitad con un cursor
+        cursors = {}
+        for class_id in class_ids:
+            page = (await client.get(f"/data/{class_id}/data/", params={"limit": args.page_size})).json()
+            cursors[class_id] = page.get("next_cursor")
+
+        def data_page(i):
+            class_id = class_ids[i % len(class_ids)]
+            params = {"limit": args.page_size}
+            if i % 2 and cursors[class_id]:
+                params["cursor"] = cursors[class_id]
+            return "GET", f"/data/{class_id}/data/", {"params": params}
+
+        await scenario("data_page", data_page)
+
+        def batch(i, class_id=None):
+            class_id = class_id or class_ids[i % len(class_ids)]
+            # La clase auxiliar no tiene atributos: usa los de la primera
+            names = attributes.get(class_id, attributes[class_ids[0]])
+            return [
+                {"class_id": class_id, "content": synthetic.synthetic_content(rng, names, i)}
+                for _ in range(args.batch_size)
+            ]
+
+        await scenario("batch_insert", lambda i: ("POST", "/data/batch", {"json": batch(i)}))
+
+        if "batch_delete" in args.scenarios:
+            # Filas para borrar creadas de antemano en la clase auxiliar
+            total = args.requests + args.concurrency
+            for i in range(total):
+                await client.post("/data/batch", json=batch(i, str(scratch)))
+            ids = await sample_data_ids([scratch], total * args.batch_size, args.seed)
+            groups = [ids[i:i + args.batch_size] for i in range(0, len(ids), args.batch_size)]
+            await scenario("batch_delete", lambda i: ("DELETE", "/data/batch", {"json": groups[i % len(groups)]}))
+
+        if "update_data" in args.scenarios:
+            ids = await sample_data_ids(model.class_ids, args.requests, args.seed)
+            class_attributes = attributes[class_ids[0]]
+
+            def update(i):
+                data_id = ids[i % len(ids)]
+                content = synthetic.synthetic_content(rng, class_attributes, i)
+                return "PATCH", f"/data/{data_id}", {"json": {"content": content}}
+
+            await scenario("update_data", update)
+
+    # Las filas de batch_insert y update_data quedan en el modelo; sólo se limpia la clase auxiliar
+    await synthetic.drop_models(f"{synthetic.PREFIX}scratch_{args.seed}")
+    return results
+
+# ✅ Línea base
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def params(args) -> dict:
+    return {
+        key: getattr(args, key)
+        for key in ("classes", "attributes", "properties", "connections", "rows",
+                    "concurrency", "requests", "batch_size", "page_size", "seed")
+    }
+
+def save_baseline(results: dict, args) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    baseline = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "params": params(args),
+        "scenarios": results,
+    }
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    for path in (os.path.join(BASELINE_DIR, f"{stamp}.json"), os.path.join(BASELINE_DIR, "latest.json")):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+    return path
+
+def compare(results: dict, args) -> list:
+    """ Escenarios cuyo p95 sube o cuyo rendimiento baja más que la tolerancia """
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("params") != params(args):
+        print("⚠️ Los parámetros no coinciden con los de la línea base")
+    regressions = []
+    tolerance = args.tolerance
+    print(f"\n🔹 Comparación con {args.baseline} (commit {baseline.get('commit')})")
+    for name, current in results.items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            continue
+        p95 = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        rps = current["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0.0
+        regressed = p95 > tolerance or rps < -tolerance
+        print(f"{'❌' if regressed else '✅'} {name:<14} p95 {p95:+7.1%}  rps {rps:+7.1%}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def format_row(name: str, r: dict) -> str:
+    rss = f"{r['peak_rss_mb']:.0f} MiB" if r["peak_rss_mb"] is not None else "-"
+    return (f"{name:<14} {r['requests']:>6} pet. {r['errors']:>4} err.  "
+            f"p50 {r['p50_ms']:>8.1f}ms  p95 {r['p95_ms']:>8.1f}ms  p99 {r['p99_ms']:>8.1f}ms  "
+            f"{r['throughput_rps']:>8.1f} pet/s  RSS {rss}")
+
+async def main(args) -> int:
+    try:
+        model = None if args.regenerate else await synthetic.existing_model(args.seed)
+        if model is None:
+            await synthetic.drop_models(f"{synthetic.PREFIX}{args.seed}_")
+            model = await synthetic.generate_model(
+                args.classes, args.attributes, args.rows, args.properties, args.connections, args.seed,
+            )
+        else:
+            print(f"🔹 Reutilizando el modelo sintético de la semilla {args.seed} "
+                  f"({len(model.class_ids)} clases, {model.rows_per_class} filas por clase)")
+        results = await run_scenarios(model, args)
+    finally:
+        await engine.dispose()
+
+    if args.save_baseline:
+        print(f"\n✅ Línea base guardada en {save_baseline(results, args)}")
+    if args.baseline:
+        regressions = compare(results, args)
+        if regressions:
+            print(f"❌ Regresiones en: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=5)
+    parser.add_argument("--attributes", type=int, default=8)
+    parser.add_argument("--properties", type=int, default=2, help="propiedades por atributo")
+    parser.add_argument("--connections", type=int, default=None, help="por defecto, clases - 1")
+    parser.add_argument("--rows", type=int, default=10_000, help="filas por clase (10^3 a 10^6)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--regenerate", action="store_true", help="vuelve a generar el modelo aunque exista")
+    parser.add_argument("--concurrency", type=int, default=16, help="clientes simultáneos")
+    parser.add_argument("--requests", type=int, default=500, help="peticiones por escenario")
+    parser.add_argument("--batch-size", type=int, default=100, help="filas por petición en los escenarios batch")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=SCENARIOS)
+    parser.add_argument("--save-baseline", action="store_true", help="guarda los resultados en benchmarks/baselines/")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="empeoramiento admitido (0.15 = 15%%)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,170 @@
+"""
+Generador de modelos sintéticos para los benchmarks: N clases con M atributos,
+propiedades, conexiones y filas JSONB por clase. Con la misma semilla genera
+siempre el mismo modelo (nombres, tipos y valores), para comparar ejecuciones.
+
+Uso (desde Desktop/kinro, con la base de datos configurada):
+    python benchmarks/synthetic.py --classes 5 --attributes 8 --rows 100000
+    python benchmarks/synthetic.py --drop bench_
+"""
+import sys
+import os
+
+# 🔹 Agregar la raíz del proyecto al `sys.path`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+
+from backend import bulk, crud, indexes
+from backend.database import AsyncSessionLocal, engine
+from backend.models import Attribute, ClassModel, Connection, Property
+
+DATA_TYPES = ["integer", "text", "boolean", "date", "float", "json", "uuid"]
+RELATIONSHIP_TYPES = ["1-1", "1-N", "N-N"]
+PROPERTY_NAMES = ["requerido", "único", "etiqueta", "valor por defecto"]
+PREFIX = "bench_"
+
+@dataclass
+class SyntheticModel:
+    seed: int
+    class_ids: list = field(default_factory=list)
+    # {class_id: [(nombre, tipo), ...]}
+    attributes: dict = field(default_factory=dict)
+    rows_per_class: int = 0
+
+# ✅ Valores
+
+def attribute_value(rng: random.Random, data_type: str, i: int):
+    """ Valores como los deja la importación de Excel/CSV: texto, salvo json """
+    if data_type == "integer":
+        return str(rng.randint(-1000, 100000))
+    if data_type == "float":
+        return f"{rng.uniform(-1000, 1000):.3f}"
+    if data_type == "boolean":
+        return rng.choice(["true", "false"])
+    if data_type == "date":
+        return f"{rng.randint(1990, 2030)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    if data_type == "uuid":
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    if data_type == "json":
+        return {"n": i, "tags": rng.sample(["a", "b", "c", "d", "e"], 2)}
+    return f"texto {rng.randint(0, 10_000)} " + "x" * rng.randint(0, 40)
+
+def synthetic_content(rng: random.Random, attributes: list, i: int) -> dict:
+    # Algunos valores vacíos, como en los archivos reales
+    return {
+        name: attribute_value(rng, data_type, i)
+        for name, data_type in attributes
+        if rng.random() > 0.05
+    }
+
+# ✅ Generación
+
+async def generate_model(
+    classes: int,
+    attributes: int,
+    rows: int,
+    properties: int = 2,
+    connections: int | None = None,
+    seed: int = 42,
+    chunk_size: int = 10_000,
+    verbose: bool = True,
+) -> SyntheticModel:
+    """ Crea el modelo y carga sus filas con COPY; los índices se crean al final """
+    rng = random.Random(seed)
+    model = SyntheticModel(seed=seed, rows_per_class=rows)
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for c in range(classes):
+            class_model = ClassModel(name=f"{PREFIX}{seed}_{c}", position_x=c * 250.0, position_y=0.0)
+            db.add(class_model)
+            await db.flush()
+            model.class_ids.append(class_model.id)
+            model.attributes[class_model.id] = []
+            for a in range(attributes):
+                data_type = DATA_TYPES[a % len(DATA_TYPES)]
+                attribute = Attribute(class_id=class_model.id, name=f"campo_{a}_{data_type}", data_type=data_type)
+                db.add(attribute)
+                await db.flush()
+                model.attributes[class_model.id].append((attribute.name, data_type))
+                for p in range(properties):
+                    db.add(Property(attribute_id=attribute.id, name=PROPERTY_NAMES[p % len(PROPERTY_NAMES)], value=str(p)))
+        connections = classes - 1 if connections is None else connections
+        for _ in range(connections if classes > 1 else 0):
+            source, target = rng.sample(model.class_ids, 2)
+            db.add(Connection(source_class=source, target_class=target, relationship_type=rng.choice(RELATIONSHIP_TYPES)))
+        await db.commit()
+        crud.metadata_changed(crud.CLASSES_KEY, crud.CONNECTIONS_KEY)
+
+        for class_id in model.class_ids:
+            class_attributes = model.attributes[class_id]
+            for start in range(0, rows, chunk_size):
+                batch = [
+                    (class_id, synthetic_content(rng, class_attributes, i))
+                    for i in range(start, min(start + chunk_size, rows))
+                ]
+                await bulk.copy_data_rows(db, batch, chunk_size=chunk_size)
+        crud.data_changed()
+
+    await indexes.ensure_all_indexes()
+    if verbose:
+        total = classes * rows
+        print(f"🔹 Modelo sintético: {classes} clases x {attributes} atributos, "
+              f"{total} filas en {time.perf_counter() - started:.1f}s")
+    return model
+
+def _like_prefix(prefix: str) -> str:
+    return prefix.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%") + "%"
+
+async def existing_model(seed: int) -> SyntheticModel | None:
+    """ Modelo ya generado con esa semilla (para no recargar filas entre ejecuciones) """
+    model = SyntheticModel(seed=seed)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ClassModel.id).where(ClassModel.name.like(_like_prefix(f"{PREFIX}{seed}_"))).order_by(ClassModel.position_x)
+        )
+        model.class_ids = result.scalars().all()
+        if not model.class_ids:
+            return None
+        for class_id in model.class_ids:
+            model.attributes[class_id] = [(a.name, a.data_type) for a in await crud.get_attributes_by_class(db, class_id)]
+        model.rows_per_class = await crud.count_data_by_class(db, model.class_ids[0])
+    return model
+
+async def drop_models(prefix: str = PREFIX) -> int:
+    """ Elimina las clases sintéticas (y en cascada todo lo demás) """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(ClassModel.id).where(ClassModel.name.like(_like_prefix(prefix))))
+        class_ids = result.scalars().all()
+        for class_id in class_ids:
+            await crud.delete_class(db, str(class_id))
+    return len(class_ids)
+
+async def main(args):
+    try:
+        if args.drop is not None:
+            print(f"🔻 {await drop_models(args.drop)} clases eliminadas")
+            return
+        await generate_model(
+            args.classes, args.attributes, args.rows, args.properties, args.connections, args.seed,
+        )
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=5)
+    parser.add_argument("--attributes", type=int, default=8)
+    parser.add_argument("--properties", type=int, default=2, help="propiedades por atributo")
+    parser.add_argument("--connections", type=int, default=None, help="por defecto, clases - 1")
+    parser.add_argument("--rows", type=int, default=10_000, help="filas por clase (10^3 a 10^6)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", nargs="?", const=PREFIX, default=None, help="elimina las clases con ese prefijo")
+    asyncio.run(main(parser.parse_args()))
@@ -104,6 +104,39 @@ export const deleteProperty = async (propertyId) => {
   return response.json();
 };
 
+// Instantánea del grafo (clases, atributos, propiedades y conexiones).
+// "no-cache" hace que el navegador revalide con If-None-Match: si el modelo
+// no cambió el servidor responde 304 y se reutiliza la respuesta guardada.
+export const fetchGraph = async () => {
+  const response = await fetch(`${API_URL}/graph/`, { cache: "no-cache" });
+  if (!response.ok) throw new Error("Error al obtener el grafo");
+  return response.json();
+};
+
+// Feed de cambios en tiempo real (Server-Sent Events). onEvent recibe cada
+// evento {entity, op, id, class_id, diff, ...}; onReconnect se llama cuando el
+// navegador recupera la conexión, porque los eventos intermedios se perdieron.
+// Devuelve una función para cerrar la suscripción.
+export const subscribeChanges = (onEvent, { classId, entities, onReconnect } = {}) => {
+  const params = new URLSearchParams();
+  if (classId) params.set("class_id", classId);
+  if (entities) params.set("entities", entities.join(","));
+  const source = new EventSource(`${API_URL}/changes/stream?${params}`);
+  let opened = false;
+  source.onopen = () => {
+    if (opened && onReconnect) onReconnect();
+    opened = true;
+  };
+  source.onmessage = (message) => {
+    try {
+      onEvent(JSON.parse(message.data));
+    } catch (error) {
+      console.error("Evento de cambios no válido:", error);
+    }
+  };
+  return () => source.close();
+};
+
 export const fetchConnections = async () => {
   const response = await fetch(`${API_URL}/connections/`);
   if (!response.ok) throw new Error("Error al obtener conexiones");
@@ -128,9 +161,13 @@ export const deleteConnection = async (connectionId) => {
   return response.json();
 };
 
-// Obtener los datos cargados para una clase específica
-export const fetchClassData = async (classId) => {
-  const response = await fetch(`${API_URL}/data/${classId}/data/`);
+// Obtener una página de datos de una clase específica
+// params: { limit, cursor, sort, order, count } -> { items, next_cursor, total_estimate }
+export const fetchClassData = async (classId, params = {}) => {
+  const query = new URLSearchParams(
+    Object.entries(params).filter(([, value]) => value !== undefined && value !== null)
+  ).toString();
+  const response = await fetch(`${API_URL}/data/${classId}/data/${query ? `?${query}` : ""}`);
   if (!response.ok) {
     const errorData = await response.json();
     throw new Error(errorData.detail || "Error al obtener los datos de la clase");
@@ -138,6 +175,10 @@ export const fetchClassData = async (classId) => {
   return response.json();
 };
 
+// URL de exportación en streaming (csv, ndjson o xlsx) generada por el backend
+export const getClassDataExportUrl = (classId, format = "xlsx") =>
+  `${API_URL}/data/${classId}/export?format=${format}`;
+
 // Actualizar un registro de datos
 export const updateClassData = async (dataId, updatedContent) => {
   const response = await fetch(`${API_URL}/data/${dataId}`, {
@@ -149,6 +190,17 @@ export const updateClassData = async (dataId, updatedContent) => {
   return response.json();
 };
 
+// Actualización parcial de varios registros (JSON merge-patch: null elimina la clave)
+export const patchDataBatch = async (patches) => {
+  const response = await fetch(`${API_URL}/data/batch`, {
+    method: "PATCH",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(patches),
+  });
+  if (!response.ok) throw new Error("Error al actualizar los datos");
+  return response.json();
+};
+
 // Crear datos en lote
 export const createDataBatch = async (dataList) => {
   const response = await fetch(`${API_URL}/data/batch`, {
@@ -163,6 +215,50 @@ export const createDataBatch = async (dataList) => {
   return response.json();
 };
 
+// Subir un archivo Excel/CSV para que el backend lo procese e inserte por bloques
+export const uploadDataFile = async (classId, file) => {
+  const formData = new FormData();
+  formData.append("file", file);
+  const response = await fetch(`${API_URL}/data/${classId}/upload`, {
+    method: "POST",
+    body: formData,
+  });
+  if (!response.ok) {
+    const errorData = await response.json();
+    throw new Error(errorData.detail || "Error al importar el archivo");
+  }
+  return response.json();
+};
+
+// Importación en segundo plano: devuelve el trabajo (id, estado, progreso)
+// Con upsert, las filas se insertan o actualizan según la clave natural de la clase
+export const submitUploadJob = async (classId, file, { upsert = false } = {}) => {
+  const formData = new FormData();
+  formData.append("file", file);
+  const query = upsert ? "?upsert=true" : "";
+  const response = await fetch(`${API_URL}/jobs/upload/${classId}${query}`, {
+    method: "POST",
+    body: formData,
+  });
+  if (!response.ok) {
+    const errorData = await response.json();
+    throw new Error(errorData.detail || "Error al iniciar la importación");
+  }
+  return response.json();
+};
+
+export const fetchJob = async (jobId) => {
+  const response = await fetch(`${API_URL}/jobs/${jobId}`);
+  if (!response.ok) throw new Error("Error al obtener el estado de la importación");
+  return response.json();
+};
+
+export const cancelJob = async (jobId) => {
+  const response = await fetch(`${API_URL}/jobs/${jobId}/cancel`, { method: "POST" });
+  if (!response.ok) throw new Error("Error al cancelar la importación");
+  return response.json();
+};
+
 export const deleteData = async (dataId) => {
   const response = await fetch(`${API_URL}/data/${dataId}`, {
     method: "DELETE",
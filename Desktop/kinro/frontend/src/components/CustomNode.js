@@ -20,6 +20,7 @@ const propertyLabels = {
   min_length: "Mín. caracteres",
   no_special_chars: "Sin caracteres especiales",
   required: "Requerido",
+  natural_key: "Clave natural",
 };
 
 const relationshipStyles = {
@@ -15,70 +15,91 @@ import { DataGrid } from "@mui/x-data-grid";
 import { Add, Delete, FileDownload } from "@mui/icons-material";
 import {
   fetchClassData,
-  updateClassData,
+  patchDataBatch,
   deleteDataBatch,
   createDataBatch,
+  getClassDataExportUrl,
 } from "../api";
-import * as XLSX from "xlsx";
+
+const PAGE_SIZE = 500;
 
 function DataGridModal({ open, onClose, nodes }) {
   const [rows, setRows] = useState([]);
   const [columns, setColumns] = useState([]);
   const [selectedIds, setSelectedIds] = useState([]);
   const [snackbar, setSnackbar] = useState({ open: false, message: "", severity: "success" });
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalEstimate, setTotalEstimate] = useState(null);
 
   const node = nodes[0];
   const classId = node?.id;
 
+  const appendPage = (page, reset) => {
+    const columnSet = new Set(reset ? [] : columns.map((col) => col.field));
+    page.items.forEach((dataItem) =>
+      Object.keys(dataItem.content).forEach((key) => columnSet.add(key))
+    );
+
+    const dynamicColumns = Array.from(columnSet).map((key) => ({
+      field: key,
+      headerName: key,
+      width: 150,
+      editable: true,
+    }));
+
+    const formattedRows = page.items.map((dataItem) => ({
+      id: dataItem.id,
+      classId: dataItem.class_id,
+      ...dataItem.content,
+    }));
+
+    setColumns(dynamicColumns);
+    setRows((prev) => (reset ? formattedRows : [...prev, ...formattedRows]));
+    setNextCursor(page.next_cursor);
+  };
+
   useEffect(() => {
     if (!open || !classId) return;
 
     const loadData = async () => {
       try {
-        const classData = await fetchClassData(classId);
-
-        if (!classData || classData.length === 0) {
-          setRows([]);
-          setColumns([]);
-          return;
-        }
-
-        const columnSet = new Set();
-        classData.forEach((dataItem) =>
-          Object.keys(dataItem.content).forEach((key) => columnSet.add(key))
-        );
-
-        const dynamicColumns = Array.from(columnSet).map((key) => ({
-          field: key,
-          headerName: key,
-          width: 150,
-          editable: true,
-        }));
-
-        const formattedRows = classData.map((dataItem) => ({
-          id: dataItem.id,
-          classId: dataItem.class_id,
-          ...dataItem.content,
-        }));
-
-        setColumns(dynamicColumns);
-        setRows(formattedRows);
+        const page = await fetchClassData(classId, { limit: PAGE_SIZE, count: "estimate" });
+        setTotalEstimate(page.total_estimate);
+        appendPage(page, true);
       } catch (error) {
         console.error("Error al cargar los datos:", error);
         setRows([]);
         setColumns([]);
+        setNextCursor(null);
       }
     };
 
     loadData();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [open, classId]);
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      const page = await fetchClassData(classId, { limit: PAGE_SIZE, cursor: nextCursor });
+      appendPage(page, false);
+    } catch (error) {
+      console.error("Error al cargar más datos:", error);
+      setSnackbar({ open: true, message: "Error al cargar más datos", severity: "error" });
+    }
+  };
+
   const handleProcessRowUpdate = async (newRow, oldRow) => {
     try {
-      const updatedContent = { ...newRow };
-      delete updatedContent.id;
-      delete updatedContent.classId;
-      await updateClassData(newRow.id, updatedContent);
+      // Sólo se envían las celdas modificadas
+      const changes = {};
+      Object.keys(newRow).forEach((key) => {
+        if (key !== "id" && key !== "classId" && newRow[key] !== oldRow[key]) {
+          changes[key] = newRow[key];
+        }
+      });
+      if (Object.keys(changes).length === 0) return newRow;
+      await patchDataBatch([{ id: newRow.id, content: changes }]);
       return newRow;
     } catch (error) {
       console.error("Error al actualizar:", error);
@@ -93,10 +114,10 @@ function DataGridModal({ open, onClose, nodes }) {
     if (!window.confirm("¿Eliminar los registros seleccionados?")) return;
 
     try {
-      await deleteDataBatch(selectedIds);
+      const result = await deleteDataBatch(selectedIds);
       setRows((prev) => prev.filter((row) => !selectedIds.includes(row.id)));
       setSelectedIds([]);
-      setSnackbar({ open: true, message: `${selectedIds.length} registros eliminados con éxito`, severity: "success" });
+      setSnackbar({ open: true, message: `${result.deleted} registros eliminados con éxito`, severity: "success" });
     } catch (error) {
       console.error("Error al eliminar registros:", error);
       setSnackbar({ open: true, message: "Error al eliminar registros", severity: "error" });
@@ -106,11 +127,8 @@ function DataGridModal({ open, onClose, nodes }) {
   const handleExport = () => {
     if (rows.length === 0) return;
 
-    const exportData = rows.map(({ id, classId, ...content }) => content);
-    const worksheet = XLSX.utils.json_to_sheet(exportData);
-    const workbook = XLSX.utils.book_new();
-    XLSX.utils.book_append_sheet(workbook, worksheet, "Datos");
-    XLSX.writeFile(workbook, `${node.data.label || "Clase"}_datos.xlsx`);
+    // El backend genera el archivo en streaming con todas las filas de la clase
+    window.location.href = getClassDataExportUrl(classId, "xlsx");
   };
 
   const handleAddRow = async () => {
@@ -178,9 +196,18 @@ function DataGridModal({ open, onClose, nodes }) {
                   </IconButton>
                 </Tooltip>
               </div>
-              <Button onClick={handleSaveNewRows} variant="outlined" size="small">
-                Guardar nuevos registros
-              </Button>
+              <div className="flex gap-2 items-center">
+                <span className="text-sm text-gray-500">
+                  {rows.length}
+                  {totalEstimate ? ` de ~${totalEstimate}` : ""} registros
+                </span>
+                <Button onClick={handleLoadMore} disabled={!nextCursor} size="small">
+                  Cargar más
+                </Button>
+                <Button onClick={handleSaveNewRows} variant="outlined" size="small">
+                  Guardar nuevos registros
+                </Button>
+              </div>
             </div>
 
             <div style={{ height: 450, width: "100%" }}>
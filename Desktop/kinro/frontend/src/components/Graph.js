@@ -1,8 +1,8 @@
 // src/components/Graph.js
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useEffect, useState, useCallback, useRef } from "react";
 import { ReactFlow, MiniMap, Controls, Background, applyNodeChanges, applyEdgeChanges, MarkerType } from "@xyflow/react";
 import "@xyflow/react/dist/style.css";
-import { fetchClasses, createClass, deleteClass, updateClassName, fetchConnections, createConnection, deleteConnection, updateClassPosition } from "../api";
+import { fetchGraph, createClass, deleteClass, updateClassName, createConnection, deleteConnection, updateClassPosition, subscribeChanges } from "../api";
 import CustomNode from "./CustomNode";
 import FloatingEdge from "./FloatingEdge";
 import CustomConnectionLine from "./CustomConnectionLine";
@@ -73,8 +73,8 @@ function Graph() {
   }, []);
 
   const loadGraph = useCallback(() => {
-    Promise.all([fetchClasses(), fetchConnections()])
-      .then(([classes, connections]) => {
+    fetchGraph()
+      .then(({ classes, connections }) => {
         const classNodes = classes.map((cls) => ({
           id: cls.id.toString(),
           type: "custom",
@@ -121,6 +121,56 @@ function Graph() {
     loadGraph();
   }, [loadGraph]);
 
+  // Cambios de otros usuarios: los renombrados, movimientos y conexiones se
+  // aplican sobre el estado; el resto agrupa una recarga del grafo.
+  const reloadTimer = useRef(null);
+  useEffect(() => {
+    const scheduleReload = () => {
+      clearTimeout(reloadTimer.current);
+      reloadTimer.current = setTimeout(loadGraph, 300);
+    };
+    const handleChange = (event) => {
+      if (event.entity === "class" && event.op === "update" && event.diff) {
+        const { name, position_x, position_y } = event.diff;
+        setNodes((nds) => nds.map((node) => {
+          if (node.id !== event.id) return node;
+          return {
+            ...node,
+            data: name !== undefined ? { ...node.data, label: name } : node.data,
+            position: {
+              x: position_x ?? node.position.x,
+              y: position_y ?? node.position.y,
+            },
+          };
+        }));
+      } else if (event.entity === "class" && event.op === "delete") {
+        setNodes((nds) => nds.filter((node) => node.id !== event.id));
+        setEdges((eds) => eds.filter((edge) => edge.source !== event.id && edge.target !== event.id));
+      } else if (event.entity === "connection" && event.op === "create" && event.diff) {
+        setEdges((eds) => eds.some((edge) => edge.id === event.id) ? eds : [...eds, {
+          id: event.id,
+          source: event.diff.source_class,
+          target: event.diff.target_class,
+          type: "floating",
+          label: event.diff.relationship_type,
+          data: { label: event.diff.relationship_type },
+        }]);
+      } else if (event.entity === "connection" && event.op === "delete") {
+        setEdges((eds) => eds.filter((edge) => edge.id !== event.id));
+      } else {
+        scheduleReload();
+      }
+    };
+    const unsubscribe = subscribeChanges(handleChange, {
+      entities: ["class", "attribute", "property", "connection"],
+      onReconnect: scheduleReload,
+    });
+    return () => {
+      unsubscribe();
+      clearTimeout(reloadTimer.current);
+    };
+  }, [loadGraph]);
+
   const handleNodeContextMenu = useCallback((event, node) => {
     event.preventDefault();
     console.log("Clic derecho en nodo:", { nodeId: node ? node.id : null, x: event.clientX, y: event.clientY });
@@ -1,21 +1,8 @@
 // src/components/UploadExcelModal.js
 import React, { useState } from "react";
-import * as XLSX from "xlsx";
-import { createDataBatch } from "../api";
+import { submitUploadJob, fetchJob, cancelJob } from "../api";
 
-function isExcelDate(value) {
-  return typeof value === "number" && value > 59 && value < 60000;
-}
-
-function excelDateToJSDate(serial) {
-  const utc_days = Math.floor(serial - 25569);
-  const utc_value = utc_days * 86400;
-  return new Date(utc_value * 1000);
-}
-
-function formatDate(date) {
-  return date.toISOString().split("T")[0];
-}
+const POLL_INTERVAL_MS = 1000;
 
 function UploadExcelModal({ nodeId, attributes, onClose, onReload }) {
   const [file, setFile] = useState(null);
@@ -24,6 +11,16 @@ function UploadExcelModal({ nodeId, attributes, onClose, onReload }) {
   const [totalRecords, setTotalRecords] = useState(0);
   const [processedRecords, setProcessedRecords] = useState(0);
   const [startTime, setStartTime] = useState(null);
+  const [job, setJob] = useState(null);
+  const [upsert, setUpsert] = useState(false);
+  // Reimportar sin duplicar sólo es posible si la clase tiene clave natural
+  const hasNaturalKey = (attributes || []).some((attr) =>
+    (attr.properties || []).some(
+      (prop) =>
+        prop.name === "natural_key" &&
+        ["true", "t", "1", "yes", "on", "sí", "si", "verdadero"].includes(String(prop.value).trim().toLowerCase())
+    )
+  );
 
   const handleFileChange = (e) => {
     setFile(e.target.files[0]);
@@ -40,60 +37,58 @@ function UploadExcelModal({ nodeId, attributes, onClose, onReload }) {
     setProcessedRecords(0);
     setStartTime(Date.now());
 
-    const reader = new FileReader();
-    reader.onload = async (e) => {
-      const data = new Uint8Array(e.target.result);
-      const workbook = XLSX.read(data, { type: "array" });
-      const sheetName = workbook.SheetNames[0];
-      const worksheet = workbook.Sheets[sheetName];
-      const jsonData = XLSX.utils.sheet_to_json(worksheet, { header: 1 });
-
-      const headers = jsonData[0];
-      const rows = jsonData.slice(1).filter((row) =>
-        row.some((cell) => cell !== undefined && cell !== "")
-      );
-      setTotalRecords(rows.length);
+    const reset = () => {
+      setUploading(false);
+      setProgress(0);
+      setProcessedRecords(0);
+      setTotalRecords(0);
+      setStartTime(null);
+      setJob(null);
+    };
 
-      const validAttributes = attributes.map((attr) => attr.name);
-      const allData = rows.map((row) => {
-        const content = {};
-        headers.forEach((header, index) => {
-          let cellValue = row[index];
-          if (validAttributes.includes(header)) {
-            if (isExcelDate(cellValue)) {
-              const dateObj = excelDateToJSDate(cellValue);
-              content[header] = formatDate(dateObj);
-            } else {
-              content[header] = cellValue !== undefined ? String(cellValue) : "";
-            }
-          }
-        });
-        return {
-          class_id: String(nodeId),
-          content,
-        };
-      });
+    try {
+      // El backend guarda el archivo y lo importa en segundo plano
+      let current = await submitUploadJob(nodeId, file, { upsert: upsert && hasNaturalKey });
+      setJob(current);
+      while (current.state === "queued" || current.state === "running") {
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        current = await fetchJob(current.id);
+        setJob(current);
+        setProgress(Math.round(current.progress * 100));
+        setProcessedRecords(current.rows_processed);
+        if (current.total_rows) setTotalRecords(current.total_rows);
+      }
 
-      try {
-        await createDataBatch(allData);
-        setProcessedRecords(rows.length);
-        setProgress(100);
-        alert("Datos cargados exitosamente");
+      if (current.state === "completed") {
+        const rejected = current.rows_rejected
+          ? `\n${current.rows_rejected} filas descartadas por valores no válidos:\n${current.errors.join("\n")}`
+          : "";
+        const updated = current.rows_updated || current.rows_unchanged
+          ? ` (${current.rows_updated} actualizados, ${current.rows_unchanged} sin cambios)`
+          : "";
+        alert(`${current.rows_processed} datos cargados exitosamente${updated}${rejected}`);
         onReload();
         onClose();
-      } catch (error) {
-        console.error("Error uploading data:", error);
-        alert(error.message || "No se pudieron guardar los datos.");
-      } finally {
-        setUploading(false);
-        setProgress(0);
-        setProcessedRecords(0);
-        setTotalRecords(0);
-        setStartTime(null);
+      } else if (current.state === "cancelled") {
+        alert(`Importación cancelada tras ${current.rows_processed} registros`);
+        onReload();
+      } else {
+        alert(current.errors.join("\n") || "No se pudieron guardar los datos.");
       }
-    };
+    } catch (error) {
+      console.error("Error uploading data:", error);
+      alert(error.message || "No se pudieron guardar los datos.");
+    } finally {
+      reset();
+    }
+  };
 
-    reader.readAsArrayBuffer(file);
+  const handleCancel = async () => {
+    if (job) {
+      await cancelJob(job.id);
+      return;
+    }
+    onClose();
   };
 
   const elapsedTime = startTime ? Math.floor((Date.now() - startTime) / 1000) : 0;
@@ -104,11 +99,22 @@ function UploadExcelModal({ nodeId, attributes, onClose, onReload }) {
         <h2 className="text-xl font-bold mb-4">Cargar Datos desde Excel</h2>
         <input
           type="file"
-          accept=".xlsx, .xls"
+          accept=".xlsx, .csv"
           onChange={handleFileChange}
           className="mb-4 w-full"
           disabled={uploading}
         />
+        {hasNaturalKey && (
+          <label className="flex items-center gap-2 mb-4 text-sm">
+            <input
+              type="checkbox"
+              checked={upsert}
+              onChange={(e) => setUpsert(e.target.checked)}
+              disabled={uploading}
+            />
+            Actualizar filas existentes por clave natural
+          </label>
+        )}
         {uploading && (
           <div className="mb-4">
             <div className="w-full bg-gray-200 rounded-full h-2.5">
@@ -118,10 +124,13 @@ function UploadExcelModal({ nodeId, attributes, onClose, onReload }) {
               ></div>
             </div>
             <p className="text-sm text-gray-600 mt-2">
-              Procesando {processedRecords} de {totalRecords} registros...
+              Procesando {processedRecords}
+              {totalRecords ? ` de ${totalRecords}` : ""} registros...
+              {job?.rows_per_second ? ` (${Math.round(job.rows_per_second)}/s)` : ""}
             </p>
             <p className="text-sm text-gray-600">
               Tiempo transcurrido: {elapsedTime} segundos
+              {job?.eta_seconds != null ? ` · restante ~${Math.ceil(job.eta_seconds)} s` : ""}
             </p>
           </div>
         )}
@@ -134,9 +143,9 @@ function UploadExcelModal({ nodeId, attributes, onClose, onReload }) {
             {uploading ? "Cargando..." : "Cargar"}
           </button>
           <button
-            onClick={onClose}
+            onClick={handleCancel}
             className="px-4 py-2 bg-gray-200 rounded hover:bg-gray-300"
-            disabled={uploading}
+            disabled={uploading && !job}
           >
             Cancelar
           </button>
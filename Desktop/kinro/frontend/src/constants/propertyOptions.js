@@ -4,4 +4,5 @@ export const propertyOptions = {
   min_length: "Mínimo de caracteres",
   no_special_chars: "Sin caracteres especiales",
   required: "Requerido",
+  natural_key: "Clave natural",
 };
\ No newline at end of file
@@ -0,0 +1,111 @@
+# tests/test_cache.py
+import asyncio
+import uuid
+
+import pytest
+
+from backend import cache
+from backend.cache import MetadataCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+def loader(value, calls: list):
+    async def load():
+        calls.append(value)
+        return value
+    return load
+
+def get(metadata_cache: MetadataCache, key: tuple, value, calls: list, **kwargs):
+    return asyncio.run(metadata_cache.get_or_load(key, loader(value, calls), **kwargs))
+
+# ✅ Aciertos, TTL y LRU
+
+def test_hit_after_miss(clock):
+    metadata_cache, calls = MetadataCache(10, 60), []
+    assert get(metadata_cache, ("classes",), "a", calls) == "a"
+    assert get(metadata_cache, ("classes",), "b", calls) == "a"
+    assert calls == ["a"]
+    assert metadata_cache.stats()["hits"] == 1
+    assert metadata_cache.stats()["misses"] == 1
+    assert metadata_cache.stats()["hit_ratio"] == 0.5
+
+def test_entries_expire(clock):
+    metadata_cache, calls = MetadataCache(10, 60), []
+    get(metadata_cache, ("classes",), "a", calls)
+    clock.now += 59.9
+    assert get(metadata_cache, ("classes",), "b", calls) == "a"
+    clock.now += 0.1
+    assert get(metadata_cache, ("classes",), "b", calls) == "b"
+
+def test_per_key_ttl(clock):
+    metadata_cache, calls = MetadataCache(10, 60), []
+    get(metadata_cache, ("aggregates", "c"), "a", calls, ttl_seconds=300)
+    clock.now += 120
+    assert get(metadata_cache, ("aggregates", "c"), "b", calls) == "a"
+
+def test_least_recently_used_is_evicted(clock):
+    metadata_cache, calls = MetadataCache(2, 60), []
+    get(metadata_cache, ("attributes", "1"), 1, calls)
+    get(metadata_cache, ("attributes", "2"), 2, calls)
+    get(metadata_cache, ("attributes", "1"), None, calls)  # 1 pasa a ser el más reciente
+    get(metadata_cache, ("attributes", "3"), 3, calls)
+    assert metadata_cache.stats()["evictions"] == 1
+    assert get(metadata_cache, ("attributes", "1"), None, calls) == 1
+    assert get(metadata_cache, ("attributes", "2"), "nuevo", calls) == "nuevo"
+
+# ✅ Invalidación
+
+def test_invalidate_by_prefix(clock):
+    metadata_cache, calls = MetadataCache(10, 60), []
+    for key in [("aggregates", "c1", "x"), ("aggregates", "c1", "y"), ("aggregates", "c2", "x"), ("classes",)]:
+        get(metadata_cache, key, key, calls)
+    metadata_cache.invalidate(("aggregates", "c1"))
+    assert metadata_cache.stats()["entries"] == 2
+    metadata_cache.invalidate(("aggregates",), ("classes",))
+    assert metadata_cache.stats()["entries"] == 0
+    assert metadata_cache.stats()["invalidations"] == 3
+
+def test_load_started_before_an_invalidation_is_not_stored(clock):
+    metadata_cache = MetadataCache(10, 60)
+
+    async def stale():
+        metadata_cache.invalidate(("classes",))
+        return "antiguo"
+
+    async def run():
+        assert await metadata_cache.get_or_load(("classes",), stale) == "antiguo"
+        return await metadata_cache.get_or_load(("classes",), loader("nuevo", []))
+
+    assert asyncio.run(run()) == "nuevo"
+
+def test_remote_invalidation_round_trip(clock, monkeypatch):
+    metadata_cache, calls = MetadataCache(10, 60), []
+    monkeypatch.setattr(cache, "metadata_cache", metadata_cache)
+    class_id = uuid.uuid4()
+    get(metadata_cache, ("attributes", str(class_id)), 1, calls)
+    get(metadata_cache, ("classes",), 2, calls)
+    # Las claves viajan como listas de texto en el NOTIFY
+    payload = {"keys": cache._keys_to_payload([("attributes", class_id)])}
+    cache._on_remote_invalidation(payload)
+    assert metadata_cache.stats()["entries"] == 1
+
+def test_publish_is_a_no_op_without_cache_notify(monkeypatch):
+    published = []
+    monkeypatch.setattr(cache.config, "CACHE_NOTIFY", False)
+    monkeypatch.setattr(cache.notifications, "publish", lambda *args: published.append(args))
+    cache.publish_invalidation([("classes",)], 1)
+    assert published == []
+    monkeypatch.setattr(cache.config, "CACHE_NOTIFY", True)
+    cache.publish_invalidation([("classes",)], 1)
+    assert published == [(cache.CACHE_CHANNEL, {"keys": [["classes"]], "version": 1})]
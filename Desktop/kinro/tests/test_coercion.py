@@ -0,0 +1,115 @@
+# tests/test_coercion.py
+from types import SimpleNamespace
+
+import pytest
+
+from backend import coercion
+from backend.coercion import ColumnSpec, ErrorReport
+
+SCHEMA = [
+    ColumnSpec("edad", "integer", required=True),
+    ColumnSpec("precio", "float"),
+    ColumnSpec("activo", "boolean"),
+    ColumnSpec("alta", "date"),
+    ColumnSpec("codigo", "text", max_length=4, no_special_chars=True),
+]
+
+# ✅ Conversores
+
+@pytest.mark.parametrize("data_type, value, expected", [
+    ("integer", " 42 ", 42),
+    ("integer", "7.0", 7),
+    ("integer", "12345678901234567890", 12345678901234567890),
+    ("float", "1,5", 1.5),
+    ("float", " -2e3 ", -2000.0),
+    ("boolean", "Sí", True),
+    ("boolean", " off ", False),
+    ("date", "31/12/2024", "2024-12-31"),
+    ("date", "2024-02-29T00:00:00", "2024-02-29"),
+    ("uuid", " 5F0C2A7E-1B3D-4C8E-9A6F-2D4B8E1C3A57 ", "5f0c2a7e-1b3d-4c8e-9a6f-2d4b8e1c3a57"),
+    ("json", '{"a": 1}', {"a": 1}),
+    ("json", "no es json", "no es json"),
+    ("text", 12, "12"),
+])
+def test_converters(data_type, value, expected):
+    assert coercion.CONVERTERS[data_type](value) == expected
+
+@pytest.mark.parametrize("data_type, value", [
+    ("integer", "7.5"),
+    ("integer", True),
+    ("float", "nan"),
+    ("float", float("inf")),
+    ("boolean", "quizás"),
+    ("date", "2024-02-30"),
+    ("date", "2024-02-29T10:30:00"),
+    ("uuid", "123"),
+    ("text", {"a": 1}),
+])
+def test_converter_errors(data_type, value):
+    with pytest.raises(coercion.CoercionError):
+        coercion.CONVERTERS[data_type](value)
+
+# ✅ Lotes
+
+def test_coerce_contents_types_valid_rows_and_keeps_extra_keys():
+    contents = [{"edad": "30", "precio": "9,99", "activo": "si", "alta": "01/02/2024", "codigo": "AB1", "otra": [1]}]
+    valid, errors, rejected = coercion.coerce_contents(contents, SCHEMA)
+    assert (errors, rejected) == ([], 0)
+    assert valid == [{"edad": 30, "precio": 9.99, "activo": True, "alta": "2024-02-01", "codigo": "AB1", "otra": [1]}]
+
+def test_coerce_contents_reports_every_error_and_drops_the_row():
+    contents = [
+        {"edad": "1"},
+        {"edad": "x", "precio": "caro"},
+        {"precio": "1"},
+        {"edad": "2", "codigo": "ABCDE"},
+        {"edad": "3", "codigo": "a-b"},
+    ]
+    valid, errors, rejected = coercion.coerce_contents(contents, SCHEMA, row_offset=10)
+    assert valid == [{"edad": 1}]
+    assert rejected == 4
+    assert [(e["row"], e["column"]) for e in errors] == [
+        (11, "edad"), (11, "precio"), (12, "edad"), (13, "codigo"), (14, "codigo"),
+    ]
+    assert errors[0] == {"row": 11, "column": "edad", "value": "x", "error": "No es un número"}
+    assert errors[2]["error"] == "Valor requerido"
+
+def test_empty_cells_are_null_except_in_text_columns():
+    contents = [{"edad": "5", "precio": " ", "codigo": ""}]
+    valid, errors, _ = coercion.coerce_contents(contents, SCHEMA)
+    assert errors == []
+    assert valid == [{"edad": 5, "precio": None, "codigo": ""}]
+
+def test_missing_optional_columns_are_not_added():
+    valid, _, _ = coercion.coerce_contents([{"edad": 1}, {"edad": 2, "activo": "no"}], SCHEMA)
+    assert valid == [{"edad": 1}, {"edad": 2, "activo": False}]
+
+def test_class_schema_reads_properties():
+    prop = lambda name, value: SimpleNamespace(name=name, value=value)
+    attributes = [
+        SimpleNamespace(name="codigo", data_type="text", properties=[
+            prop("min_length", " 2 "), prop("max_length", "x"), prop("no_special_chars", "Sí"),
+        ]),
+        SimpleNamespace(name="ref", data_type="uuid", properties=[prop("natural_key", "true")]),
+        SimpleNamespace(name="nota", data_type="text", properties=None),
+    ]
+    assert coercion.class_schema(attributes) == [
+        ColumnSpec("codigo", "text", min_length=2, no_special_chars=True),
+        ColumnSpec("ref", "uuid", required=True),
+        ColumnSpec("nota", "text"),
+    ]
+
+# ✅ ErrorReport
+
+def test_error_report_caps_reported_errors_but_counts_all(monkeypatch):
+    monkeypatch.setattr(coercion, "MAX_REPORTED_ERRORS", 3)
+    report = ErrorReport()
+    report.add([{"row": 1}, {"row": 2}], 2)
+    report.add([{"row": 3}, {"row": 4}], 5)
+    report.add([{"row": 5}], 1)
+    assert report.summary() == {"rejected": 8, "errors": [{"row": 1}, {"row": 2}, {"row": 3}]}
+
+def test_error_reports_are_independent():
+    first, second = ErrorReport(), ErrorReport()
+    first.add([{"row": 1}], 1)
+    assert second.summary() == {"rejected": 0, "errors": []}
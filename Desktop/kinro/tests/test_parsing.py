@@ -0,0 +1,74 @@
+# tests/test_parsing.py
+import csv
+
+import pytest
+
+from backend import parsing
+
+ROWS = [
+    ["1", "simple", "10"],
+    ["2", "con, coma", "20"],
+    ["3", "línea\ncon salto", "30"],
+    ["4", 'comillas ""dobles"" y\n\nvarios saltos', "40"],
+    ["5", "", ""],
+    ["6", "ñandú €", "60"],
+]
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "datos.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "nombre", "valor"])
+        for _ in range(50):
+            writer.writerows(ROWS)
+    return str(path)
+
+def parse_ranges(path: str, ranges) -> list[list[str]]:
+    rows = []
+    with open(path, "rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            rows.extend(csv.reader(f.read(end - start).decode("utf-8").splitlines(keepends=True)))
+    return rows
+
+@pytest.mark.parametrize("range_size", [1, 7, 64, 1000, 10 ** 9])
+def test_ranges_cover_the_data_contiguously(csv_path, range_size):
+    headers, data_start = parsing.read_csv_header(csv_path)
+    assert headers == ["id", "nombre", "valor"]
+    ranges = parsing.split_csv_ranges(csv_path, data_start, range_size)
+    assert ranges[0][0] == data_start
+    assert ranges[-1][1] == len(open(csv_path, "rb").read())
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(start < end for start, end in ranges)
+
+@pytest.mark.parametrize("range_size", [1, 7, 64, 1000])
+def test_ranges_never_split_a_quoted_record(csv_path, range_size):
+    _, data_start = parsing.read_csv_header(csv_path)
+    ranges = parsing.split_csv_ranges(csv_path, data_start, range_size)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        expected = list(csv.reader(f))[1:]
+    assert parse_ranges(csv_path, ranges) == expected
+
+def test_small_scan_blocks(csv_path, monkeypatch):
+    # Registros que cruzan el borde de un bloque de lectura
+    monkeypatch.setattr(parsing, "SCAN_BLOCK_SIZE", 5)
+    _, data_start = parsing.read_csv_header(csv_path)
+    ranges = parsing.split_csv_ranges(csv_path, data_start, 100)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        expected = list(csv.reader(f))[1:]
+    assert parse_ranges(csv_path, ranges) == expected
+
+def test_header_only_file_has_no_ranges(tmp_path):
+    path = tmp_path / "vacio.csv"
+    path.write_bytes(b"id,nombre\r\n")
+    _, data_start = parsing.read_csv_header(str(path))
+    assert parsing.split_csv_ranges(str(path), data_start, 10) == []
+
+def test_parse_csv_range_maps_headers(csv_path):
+    headers, data_start = parsing.read_csv_header(csv_path)
+    header_map = parsing.build_header_map(headers, ["nombre", "valor"])
+    start, end = parsing.split_csv_ranges(csv_path, data_start, 10 ** 9)[0]
+    contents = parsing.parse_csv_range(csv_path, start, end, header_map)
+    assert len(contents) == 50 * len(ROWS)
+    assert contents[3] == {"nombre": ROWS[3][1], "valor": "40"}
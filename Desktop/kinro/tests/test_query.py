@@ -0,0 +1,78 @@
+# tests/test_query.py
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql
+
+from backend import query
+from backend.models import Data
+
+LAST_ID = uuid.UUID("5f0c2a7e-1b3d-4c8e-9a6f-2d4b8e1c3a57")
+
+def sql(expression) -> str:
+    return str(expression.compile(dialect=postgresql.dialect()))
+
+# ✅ Cursores
+
+@pytest.mark.parametrize("sort_value", [None, 42, 2.5, "texto", True])
+def test_cursor_round_trip(sort_value):
+    cursor = query.encode_cursor(sort_value, LAST_ID)
+    assert query.decode_cursor(cursor) == (sort_value, LAST_ID)
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = query.encode_cursor("a/b+c?" * 7, LAST_ID)
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+def test_cursor_typed_values_travel_as_text():
+    # Columnas tipadas de materialize.py: Decimal, date y UUID
+    cursor = query.encode_cursor(Decimal("1.50"), LAST_ID)
+    assert query.decode_cursor(cursor) == ("1.50", LAST_ID)
+    cursor = query.encode_cursor(date(2024, 2, 29), str(LAST_ID))
+    assert query.decode_cursor(cursor) == ("2024-02-29", LAST_ID)
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "no es base64!",
+    query.encode_cursor(1, "no-es-un-uuid"),
+    "WzFd",  # [1]: falta el id
+    "bnVsbA",  # null
+])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        query.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+# ✅ Condición del keyset
+
+def test_keyset_without_sort_is_by_id():
+    assert sql(query.keyset_condition(None, None, LAST_ID, False)) == "data.id > %(id_1)s::UUID"
+    assert sql(query.keyset_condition(None, None, LAST_ID, True)) == "data.id < %(id_1)s::UUID"
+
+def test_keyset_after_null_sort_value_stays_in_nulls():
+    # Los nulos van al final: después de un nulo sólo quedan nulos con id mayor
+    condition = sql(query.keyset_condition(Data.content["n"], None, LAST_ID, False))
+    assert condition == "(data.content -> %(content_1)s) IS NULL AND data.id > %(id_1)s::UUID"
+
+@pytest.mark.parametrize("descending, operator", [(False, ">"), (True, "<")])
+def test_keyset_with_sort_value(descending, operator):
+    sort_expr = query.typed_value("n", "integer")
+    condition = query.keyset_condition(sort_expr, 10, LAST_ID, descending)
+    text = sql(condition)
+    # Valor posterior, mismo valor con id posterior, o nulo (nulls last)
+    assert text.count(" OR ") == 2
+    assert f"END {operator} %(param_" in text
+    assert f"data.id {operator} %(id_1)s::UUID" in text
+    assert text.endswith("IS NULL")
+    params = condition.compile(dialect=postgresql.dialect()).params
+    assert params["id_1"] == LAST_ID
+    assert 10 in params.values()
+
+def test_keyset_uses_given_id_column():
+    # Tablas materializadas: su propia columna id
+    id_column = column("id")
+    assert sql(query.keyset_condition(None, None, LAST_ID, False, id_column)).startswith("id > ")
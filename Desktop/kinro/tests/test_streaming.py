@@ -0,0 +1,85 @@
+# tests/test_streaming.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend import streaming
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def collect(records) -> list:
+    async def run():
+        return [record async for record in records]
+    return asyncio.run(run())
+
+def framed(*records: bytes) -> bytes:
+    return b"".join(len(r).to_bytes(streaming.LENGTH_PREFIX, "big") + r for r in records)
+
+# ✅ NDJSON
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_ndjson_lines_across_chunks(size):
+    body = b'{"a":1}\n\n  \n{"b":2}\r\n{"c":3}'
+    records = collect(streaming.ndjson_records(chunked(body, size), 100))
+    # Las líneas en blanco se saltan pero cuentan para la numeración
+    assert records == [(1, b'{"a":1}'), (4, b'{"b":2}\r'), (5, b'{"c":3}')]
+
+def test_ndjson_trailing_newline_adds_no_record():
+    assert collect(streaming.ndjson_records(chunked(b"1\n2\n", 2), 10)) == [(1, b"1"), (2, b"2")]
+
+@pytest.mark.parametrize("body, line", [(b"ok\n" + b"x" * 11 + b"\nok", 2), (b"ok\n" + b"x" * 11, 2)])
+def test_ndjson_line_too_long(body, line):
+    with pytest.raises(HTTPException) as error:
+        collect(streaming.ndjson_records(chunked(body, 4), 10))
+    assert error.value.status_code == 413
+    assert f"La línea {line}" in error.value.detail
+
+# ✅ msgpack con prefijo de longitud
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_msgpack_records_across_chunks(size):
+    body = framed(b"uno", b"", b"tres")
+    records = collect(streaming.msgpack_records(chunked(body, size), 100))
+    assert records == [(1, b"uno"), (2, b""), (3, b"tres")]
+
+def test_msgpack_record_too_large():
+    with pytest.raises(HTTPException) as error:
+        collect(streaming.msgpack_records(chunked(framed(b"ok", b"x" * 11), 3), 10))
+    assert error.value.status_code == 413
+    assert "El registro 2" in error.value.detail
+
+@pytest.mark.parametrize("tail", [b"\x00\x00", framed(b"abcd")[:-1]])
+def test_msgpack_incomplete_record(tail):
+    with pytest.raises(HTTPException) as error:
+        collect(streaming.msgpack_records(chunked(framed(b"ok") + tail, 2), 10))
+    assert error.value.status_code == 400
+    assert "El registro 2" in error.value.detail
+
+# ✅ Límites y tipos de contenido
+
+def test_body_limit(monkeypatch):
+    monkeypatch.setattr(streaming.config, "STREAM_MAX_BODY_BYTES", 5)
+    assert collect(streaming.limited(chunked(b"12345", 2))) == [b"12", b"34", b"5"]
+    with pytest.raises(HTTPException) as error:
+        collect(streaming.limited(chunked(b"123456", 2)))
+    assert error.value.status_code == 413
+    streaming.check_content_length("5")
+    with pytest.raises(HTTPException):
+        streaming.check_content_length("6")
+
+def test_reader_by_content_type():
+    assert streaming.reader("application/x-ndjson; charset=utf-8")[0] is streaming.ndjson_records
+    with pytest.raises(HTTPException) as error:
+        streaming.reader("application/json")
+    assert error.value.status_code == 415
+
+def test_msgpack_decoder_errors_are_value_errors():
+    msgpack = pytest.importorskip("msgpack")
+    split, decode = streaming.reader("application/x-msgpack")
+    assert split is streaming.msgpack_records
+    assert decode(msgpack.packb({"a": 1})) == {"a": 1}
+    with pytest.raises(ValueError):
+        decode(b"\xc1")